@@ -0,0 +1,67 @@
+"""add ai_messages table and backfill from ai_conversations.content
+
+Revision ID: add_ai_messages
+Revises: add_document_tables
+Create Date: 2026-02-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_ai_messages'
+down_revision = 'add_document_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ai_messages',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('conversation_id', sa.String(), nullable=False),
+    sa.Column('role', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('timestamp', sa.String(), nullable=True),
+    sa.Column('extra', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['conversation_id'], ['ai_conversations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_messages_conversation_id_id', 'ai_messages', ['conversation_id', 'id'], unique=False)
+
+    # 按对话创建时间和数组下标回填，保证自增ID与原消息顺序一致
+    op.execute("""
+        INSERT INTO ai_messages (conversation_id, role, content, timestamp, extra)
+        SELECT c.id,
+               COALESCE(m.elem->>'role', 'user'),
+               COALESCE(m.elem->>'content', ''),
+               m.elem->>'timestamp',
+               m.elem - 'role' - 'content' - 'timestamp'
+        FROM ai_conversations c
+        CROSS JOIN LATERAL jsonb_array_elements(c.content) WITH ORDINALITY AS m(elem, ord)
+        WHERE jsonb_typeof(c.content) = 'array'
+        ORDER BY c.created_at, c.id, m.ord
+    """)
+
+
+def downgrade():
+    # 将消息表写回 JSONB 数组，避免丢失升级后产生的消息
+    op.execute("""
+        UPDATE ai_conversations c
+        SET content = sub.messages
+        FROM (
+            SELECT conversation_id,
+                   jsonb_agg(
+                       COALESCE(extra, '{}'::jsonb)
+                       || jsonb_build_object('role', role, 'content', content, 'timestamp', timestamp)
+                       ORDER BY id
+                   ) AS messages
+            FROM ai_messages
+            GROUP BY conversation_id
+        ) sub
+        WHERE c.id = sub.conversation_id
+    """)
+    op.drop_index('ix_ai_messages_conversation_id_id', table_name='ai_messages')
+    op.drop_table('ai_messages')
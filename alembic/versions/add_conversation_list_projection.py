@@ -0,0 +1,49 @@
+"""add denormalized list columns to ai_conversations (message_count, last message preview)
+
+Revision ID: add_conversation_list_projection
+Revises: add_keyset_pagination_indexes
+Create Date: 2026-02-28
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_conversation_list_projection'
+down_revision = 'add_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+# 与 settings.CONVERSATION_PREVIEW_CHARS 默认值一致
+PREVIEW_CHARS = 100
+
+
+def upgrade():
+    op.add_column('ai_conversations', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('ai_conversations', sa.Column('last_message_preview', sa.String(), nullable=True))
+    op.add_column('ai_conversations', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True))
+
+    # 按 ai_messages 回填消息数和最后一条消息（走 ix_ai_messages_conversation_id_id）
+    op.execute(f"""
+        UPDATE ai_conversations c
+        SET message_count = s.message_count,
+            last_message_preview = s.preview,
+            last_message_at = s.created_at
+        FROM (
+            SELECT DISTINCT ON (m.conversation_id)
+                   m.conversation_id,
+                   COUNT(*) OVER (PARTITION BY m.conversation_id) AS message_count,
+                   LEFT(BTRIM(REGEXP_REPLACE(m.content, '\\s+', ' ', 'g')), {PREVIEW_CHARS}) AS preview,
+                   m.created_at
+            FROM ai_messages m
+            ORDER BY m.conversation_id, m.id DESC
+        ) s
+        WHERE c.id = s.conversation_id
+    """)
+
+
+def downgrade():
+    op.drop_column('ai_conversations', 'last_message_at')
+    op.drop_column('ai_conversations', 'last_message_preview')
+    op.drop_column('ai_conversations', 'message_count')
@@ -0,0 +1,28 @@
+"""add rolling summary columns to ai_conversations
+
+Revision ID: add_conversation_summary
+Revises: add_ai_messages
+Create Date: 2026-02-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_conversation_summary'
+down_revision = 'add_ai_messages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ai_conversations', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('ai_conversations', sa.Column('summary_message_id', sa.BigInteger(), nullable=True))
+    op.add_column('ai_conversations', sa.Column('summary_message_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('ai_conversations', 'summary_message_count')
+    op.drop_column('ai_conversations', 'summary_message_id')
+    op.drop_column('ai_conversations', 'summary')
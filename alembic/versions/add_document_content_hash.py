@@ -0,0 +1,26 @@
+"""add documents.content_hash
+
+Revision ID: add_document_content_hash
+Revises: add_document_jobs
+Create Date: 2026-02-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_content_hash'
+down_revision = 'add_document_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_documents_content_hash'), 'documents', ['content_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_documents_content_hash'), table_name='documents')
+    op.drop_column('documents', 'content_hash')
@@ -0,0 +1,28 @@
+"""add lease_until to document_jobs
+
+Revision ID: add_document_job_lease
+Revises: add_conversation_list_projection
+Create Date: 2026-03-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_job_lease'
+down_revision = 'add_conversation_list_projection'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('document_jobs', sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_document_jobs_status_lease_until', 'document_jobs', ['status', 'lease_until'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_document_jobs_status_lease_until', table_name='document_jobs')
+    op.drop_column('document_jobs', 'lease_until')
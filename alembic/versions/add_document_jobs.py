@@ -0,0 +1,47 @@
+"""add document_jobs table and documents.progress
+
+Revision ID: add_document_jobs
+Revises: add_conversation_summary
+Create Date: 2026-02-14
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_jobs'
+down_revision = 'add_conversation_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('documents', sa.Column('progress', sa.Integer(), nullable=True, server_default='0'))
+
+    op.create_table('document_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('document_id', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False, server_default='queued'),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_document_jobs_id'), 'document_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_document_jobs_document_id'), 'document_jobs', ['document_id'], unique=False)
+    op.create_index('ix_document_jobs_status_run_after', 'document_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_document_jobs_status_run_after', table_name='document_jobs')
+    op.drop_index(op.f('ix_document_jobs_document_id'), table_name='document_jobs')
+    op.drop_index(op.f('ix_document_jobs_id'), table_name='document_jobs')
+    op.drop_table('document_jobs')
+    op.drop_column('documents', 'progress')
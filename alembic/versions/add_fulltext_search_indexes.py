@@ -0,0 +1,55 @@
+"""add full-text search indexes (paragraphs.search_vector, documents.filename trigram)
+
+Revision ID: add_fulltext_search_indexes
+Revises: add_paragraph_vector_id
+Create Date: 2026-02-23
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.common.core.segmenter import segment_for_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_fulltext_search_indexes'
+down_revision = 'add_paragraph_vector_id'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_documents_filename_trgm', 'documents', ['filename'],
+        postgresql_using='gin', postgresql_ops={'filename': 'gin_trgm_ops'}
+    )
+
+    op.add_column('paragraphs', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # 中文分词在Python中完成（与 DocumentService 写入段落时一致），按主键分批回填
+    conn = op.get_bind()
+    select_batch = sa.text(
+        "SELECT id, content FROM paragraphs WHERE id > :last_id ORDER BY id LIMIT :limit"
+    )
+    update_row = sa.text(
+        "UPDATE paragraphs SET search_vector = to_tsvector('simple', :search_text) WHERE id = :id"
+    )
+    last_id = ''
+    while True:
+        rows = conn.execute(select_batch, {'last_id': last_id, 'limit': BACKFILL_BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(update_row, [{'id': row.id, 'search_text': segment_for_index(row.content)} for row in rows])
+        last_id = rows[-1].id
+
+    op.create_index('ix_paragraphs_search_vector', 'paragraphs', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_paragraphs_search_vector', table_name='paragraphs')
+    op.drop_column('paragraphs', 'search_vector')
+    op.drop_index('ix_documents_filename_trgm', table_name='documents')
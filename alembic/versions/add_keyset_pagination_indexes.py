@@ -0,0 +1,42 @@
+"""add composite indexes for keyset (cursor) pagination
+
+Revision ID: add_keyset_pagination_indexes
+Revises: add_fulltext_search_indexes
+Create Date: 2026-02-27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_pagination_indexes'
+down_revision = 'add_fulltext_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 列顺序与列表查询的 WHERE user_id = ? ORDER BY ... DESC 一致，
+    # 游标条件 (created_at, id) < (?, ?) 在索引上反向范围扫描，无需排序
+    op.create_index(
+        'ix_ai_conversations_user_created_id', 'ai_conversations', ['user_id', 'created_at', 'id'], unique=False
+    )
+    # 红对话按 COALESCE(updated_at, created_at) 排序，需要表达式索引
+    op.create_index(
+        'ix_ai_conversations_user_activity_id', 'ai_conversations',
+        ['user_id', sa.text('COALESCE(updated_at, created_at)'), 'id'], unique=False
+    )
+    op.create_index('ix_sessions_user_created_id', 'sessions', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_documents_user_created_id', 'documents', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_paragraphs_document_paragraph_index', 'paragraphs', ['document_id', 'paragraph_index'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_paragraphs_document_paragraph_index', table_name='paragraphs')
+    op.drop_index('ix_documents_user_created_id', table_name='documents')
+    op.drop_index('ix_sessions_user_created_id', table_name='sessions')
+    op.drop_index('ix_ai_conversations_user_activity_id', table_name='ai_conversations')
+    op.drop_index('ix_ai_conversations_user_created_id', table_name='ai_conversations')
@@ -0,0 +1,31 @@
+"""add paragraphs.vector_id
+
+Revision ID: add_paragraph_vector_id
+Revises: add_document_content_hash
+Create Date: 2026-02-21
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_paragraph_vector_id'
+down_revision = 'add_document_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('paragraphs', sa.Column('vector_id', sa.BigInteger(), nullable=True))
+    # 与 document_service.paragraph_vector_id 一致：段落UUID前64位去掉符号位
+    op.execute(
+        "UPDATE paragraphs SET vector_id = "
+        "('x' || substr(replace(id, '-', ''), 1, 16))::bit(64)::bigint & 9223372036854775807"
+    )
+    op.create_index(op.f('ix_paragraphs_vector_id'), 'paragraphs', ['vector_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_paragraphs_vector_id'), table_name='paragraphs')
+    op.drop_column('paragraphs', 'vector_id')
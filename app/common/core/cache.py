@@ -0,0 +1,84 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: cache
+    @date: 2026/2/12
+    @desc: 进程内LRU缓存（可选TTL，带命中率统计）
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """线程安全的容量受限LRU缓存（可选按条目过期）"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        :param maxsize: 最大条目数
+        :param ttl: 默认过期时间（秒），为空时不过期
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (value, 过期时刻)，过期时刻为 None 表示不过期
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        :param key: 键
+        :param value: 值
+        :param ttl: 本条目的过期时间（秒），默认使用缓存的 ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+            return default if item is _MISSING else item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存大小和命中率"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
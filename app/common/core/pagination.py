@@ -0,0 +1,114 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: pagination
+    @date: 2026/2/27
+    @desc: 键集（游标）分页
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+from app.common.core.result import AppApiException
+
+# 下一页游标通过响应头返回，保持原有响应体格式不变
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    排序键 -> 不透明游标
+    :param values: 上一页最后一行的排序键
+    :return: base64url 字符串
+    """
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    不透明游标 -> 排序键
+    :param cursor: encode_cursor 生成的游标
+    :return: 排序键列表
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list):
+            raise ValueError("cursor is not a list")
+        return [_decode_value(value) for value in values]
+    except (binascii.Error, ValueError, TypeError):
+        raise AppApiException(400, "无效的分页游标")
+
+
+class Keyset:
+    """
+    键集分页定义
+
+    按 columns 排序（最后一列须唯一，保证顺序确定），游标记录上一页最后一行的排序键，
+    下一页用行值比较 (c1, c2) < (v1, v2) 定位。配合同列顺序的复合索引，
+    任意深度的页都是一次索引范围扫描，耗时与页码无关。
+    """
+
+    def __init__(self, columns: Tuple[Any, ...], key: Callable[[Any], Tuple[Any, ...]], descending: bool = True):
+        """
+        :param columns: 排序列（SQL表达式）
+        :param key: 从结果行取出与 columns 对应的排序键
+        :param descending: 是否降序
+        """
+        self.columns = columns
+        self.key = key
+        self.descending = descending
+
+    def order_by(self) -> List[Any]:
+        return [column.desc() if self.descending else column.asc() for column in self.columns]
+
+    def after(self, cursor: str):
+        """
+        游标之后的行的过滤条件
+        :param cursor: 上一页返回的游标
+        :return: SQL条件
+        """
+        values = decode_cursor(cursor)
+        if len(values) != len(self.columns):
+            raise AppApiException(400, "无效的分页游标")
+        if len(self.columns) == 1:
+            column, value = self.columns[0], values[0]
+        else:
+            column, value = tuple_(*self.columns), tuple_(*values)
+        return column < value if self.descending else column > value
+
+    def next_cursor(self, items: Sequence[Any], limit: int) -> Optional[str]:
+        """
+        下一页游标（本页不满 limit 条时说明已到末尾，返回None）
+        :param items: 本页结果
+        :param limit: 每页条数
+        :return: 游标或None
+        """
+        if not items or len(items) < limit:
+            return None
+        return encode_cursor(self.key(items[-1]))
+
+
+def set_next_cursor(response, keyset: Keyset, items: Sequence[Any], limit: int) -> None:
+    """在响应头中写入下一页游标"""
+    cursor = keyset.next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -6,12 +6,17 @@
     @desc:
 """
 
+import asyncio
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.common.core.result import AppApiException
 from config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -25,6 +30,116 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """
+    密码哈希线程池
+
+    bcrypt 单次哈希/校验约几百毫秒CPU（计算期间释放GIL），放到专用线程池执行，
+    不阻塞事件循环；运行中和排队的任务总数超过 workers + max_queue 时直接拒绝（503），
+    登录风暴时不会无限堆积请求。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queue = settings.PASSWORD_HASH_MAX_QUEUE if max_queue is None else max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """首次使用时创建线程池"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    @property
+    def dummy_hash(self) -> str:
+        """随机密码的哈希，用于不存在的用户（与真实校验耗时一致）"""
+        if self._dummy_hash is None:
+            self._dummy_hash = pwd_context.hash(secrets.token_urlsafe(16))
+        return self._dummy_hash
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def _run(self, fn, *args) -> Any:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise AppApiException(503, "请求过多，请稍后重试")
+            self._pending += 1
+        # 名额在线程中的任务真正结束后才释放，客户端断开取消等待时也不会少算
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        """
+        计算密码哈希
+        :param password: 明文密码
+        :return: 哈希
+        """
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        校验密码
+        :param plain_password: 明文密码
+        :param hashed_password: 哈希
+        :return: 是否匹配
+        """
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    async def dummy_verify(self, plain_password: str) -> bool:
+        """
+        对不存在的用户做一次同等耗时的校验，避免通过响应时间探测用户名
+        :param plain_password: 明文密码
+        :return: 始终为False
+        """
+        await self._run(pwd_context.verify, plain_password, self.dummy_hash)
+        return False
+
+    def warmup(self) -> None:
+        """预先计算占位哈希"""
+        _ = self.dummy_hash
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回线程池容量、在途任务数和拒绝次数"""
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+# 全局密码哈希线程池
+password_hasher = PasswordHasher()
+
+
+def dummy_verify_password(plain_password: str) -> bool:
+    """同步版本的占位校验（不存在的用户）"""
+    pwd_context.verify(plain_password, password_hasher.dummy_hash)
+    return False
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -42,7 +157,8 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=3)
-    to_encode.update({"exp": expire})
+    # type 用于区分刷新令牌和访问令牌，两者不能互相冒用
+    to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
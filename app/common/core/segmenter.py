@@ -0,0 +1,89 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: segmenter
+    @date: 2026/2/23
+    @desc: 全文检索用的jieba中文分词与命中高亮
+"""
+
+import html
+import logging
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from config import settings
+
+# 只保留含字母/数字/汉字的词，丢弃纯标点和空白
+_WORD_RE = re.compile(r'\w')
+
+
+@lru_cache(maxsize=None)
+def get_segmenter():
+    """
+    获取（并缓存）jieba分词器，进程内只加载一次词典
+    :return: jieba.Tokenizer
+    """
+    import jieba
+    jieba.setLogLevel(logging.WARNING)
+    segmenter = jieba.Tokenizer()
+    segmenter.initialize()
+    return segmenter
+
+
+def segment_for_index(text: str) -> str:
+    """
+    索引分词（搜索引擎模式，长词同时产出其中的短词，提高召回）
+    :param text: 段落内容
+    :return: 空格分隔的小写词序列，供 to_tsvector('simple', ...) 使用
+    """
+    if not text:
+        return ''
+    return ' '.join(word.lower() for word in get_segmenter().cut_for_search(text) if _WORD_RE.search(word))
+
+
+def segment_query(query: str) -> List[str]:
+    """
+    查询分词（精确模式，去重保序）
+    :param query: 查询文本
+    :return: 小写词列表
+    """
+    if not query:
+        return []
+    words = (word.strip().lower() for word in get_segmenter().cut(query))
+    return list(dict.fromkeys(word for word in words if _WORD_RE.search(word)))
+
+
+def highlight(text: str, terms: List[str], max_chars: Optional[int] = None) -> str:
+    """
+    截取第一个命中附近的片段，并用 <mark> 标出命中词（其余内容做HTML转义）
+    :param text: 段落内容
+    :param terms: 查询词
+    :param max_chars: 片段最大字符数，默认 FULLTEXT_HIGHLIGHT_CHARS
+    :return: 高亮后的HTML片段
+    """
+    max_chars = max_chars or settings.FULLTEXT_HIGHLIGHT_CHARS
+    pattern = None
+    if terms:
+        # 长词优先，避免短词抢先匹配长词的一部分
+        alternatives = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        pattern = re.compile(alternatives, re.IGNORECASE)
+
+    start = 0
+    first = pattern.search(text) if pattern else None
+    if first and len(text) > max_chars:
+        # 命中词前保留约1/4片段长度的上下文
+        start = max(0, min(first.start() - max_chars // 4, len(text) - max_chars))
+    fragment = text[start:start + max_chars]
+
+    parts = ['…'] if start > 0 else []
+    last = 0
+    if pattern:
+        for match in pattern.finditer(fragment):
+            parts.append(html.escape(fragment[last:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            last = match.end()
+    parts.append(html.escape(fragment[last:]))
+    if start + max_chars < len(text):
+        parts.append('…')
+    return ''.join(parts)
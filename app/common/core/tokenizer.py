@@ -0,0 +1,50 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: tokenizer
+    @date: 2026/2/12
+    @desc: 共享的tiktoken分词器
+"""
+
+from functools import lru_cache
+
+import tiktoken
+
+from config import settings
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = None):
+    """
+    获取（并缓存）tiktoken编码器，进程内只加载一次
+    :param encoding_name: 编码名称，默认使用 LLM_TOKENIZER_ENCODING
+    :return: tiktoken.Encoding
+    """
+    return tiktoken.get_encoding(encoding_name or settings.LLM_TOKENIZER_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    """
+    统计文本的token数
+    :param text: 文本
+    :return: token数
+    """
+    if not text:
+        return 0
+    return len(get_tokenizer().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    截断文本到指定token数以内
+    :param text: 文本
+    :param max_tokens: 最大token数
+    :return: 截断后的文本（未超出时原样返回）
+    """
+    if not text or max_tokens <= 0:
+        return ''
+    tokens = get_tokenizer().encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # 截断点可能落在多字节字符中间，decode 会把残缺字节替换为U+FFFD，去掉即可
+    return get_tokenizer().decode(tokens[:max_tokens]).rstrip('\ufffd')
@@ -7,6 +7,7 @@
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -21,6 +22,22 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎（asyncpg），供 async 路由使用，避免阻塞事件循环
+async_engine = create_async_engine(
+    settings.ASYNC_DB_URL,
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_pre_ping=True
+)
+
+# expire_on_commit=False：提交后仍可直接序列化ORM对象，不触发异步懒加载
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -32,3 +49,7 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -7,7 +7,8 @@
 """
 from .user import User
 from .session import Session
-from .conversation import AIConversation
+from .conversation import AIConversation, ConversationMessage
 from .document import Document, Paragraph
+from .document_job import DocumentJob
 
-__all__ = ["User", "Session", "AIConversation", "Document", "Paragraph"]
+__all__ = ["User", "Session", "AIConversation", "ConversationMessage", "Document", "Paragraph", "DocumentJob"]
@@ -6,22 +6,61 @@
     @desc: AI对话模型
 """
 
-from sqlalchemy import Boolean, Column, String, DateTime, Integer, Text
+from sqlalchemy import BigInteger, Boolean, Column, String, DateTime, ForeignKey, Index, Integer, Text
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database.base import Base
 
 
 class AIConversation(Base):
     __tablename__ = "ai_conversations"
+    __table_args__ = (
+        # 对话列表的游标分页（按创建时间倒序）
+        Index("ix_ai_conversations_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, index=True, nullable=False)
     title = Column(String, nullable=False)
-    content = Column(JSONB, nullable=False)
+    # 历史遗留的消息数组，新消息写入 ai_messages 表，该列不再追加；延迟加载，查询对话时不读取
+    content = deferred(Column(JSONB, nullable=False))
     model = Column(String)
     total_tokens = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
     is_pinned = Column(Boolean, default=False)
+    # 滚动总结：summary 覆盖到 summary_message_id（含）为止的消息
+    summary = Column(Text)
+    summary_message_id = Column(BigInteger)
+    summary_message_count = Column(Integer, default=0)
+    # 列表投影用的冗余字段，追加消息时同步更新，侧边栏无需读取消息历史
+    message_count = Column(Integer, default=0)
+    last_message_preview = Column(String)
+    last_message_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# 红对话列表的游标分页（按最近活跃时间倒序，未更新过的对话取创建时间）
+Index(
+    "ix_ai_conversations_user_activity_id",
+    AIConversation.user_id,
+    func.coalesce(AIConversation.updated_at, AIConversation.created_at),
+    AIConversation.id
+)
+
+
+class ConversationMessage(Base):
+    """对话消息（追加写，一条消息一行）"""
+    __tablename__ = "ai_messages"
+    __table_args__ = (
+        Index("ix_ai_messages_conversation_id_id", "conversation_id", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    conversation_id = Column(String, ForeignKey("ai_conversations.id"), nullable=False)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    timestamp = Column(String)
+    extra = Column(JSONB, default=dict)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -6,14 +6,24 @@
     @desc: Document and Paragraph models for document management
 """
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, JSON, Boolean
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, Text, JSON, Boolean, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.database.base import Base
 
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # 文件名模糊搜索（ILIKE '%...%'）走 pg_trgm 三元组索引
+        Index(
+            "ix_documents_filename_trgm", "filename",
+            postgresql_using="gin", postgresql_ops={"filename": "gin_trgm_ops"}
+        ),
+        # 文档列表的游标分页（按创建时间倒序）
+        Index("ix_documents_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
@@ -27,6 +37,8 @@ class Document(Base):
     chunk_overlap = Column(Integer)
     splitter_type = Column(String)
     status = Column(String, default="processing")
+    progress = Column(Integer, default=0)
+    content_hash = Column(String(64), index=True)
     error_message = Column(Text)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -37,6 +49,11 @@ class Document(Base):
 
 class Paragraph(Base):
     __tablename__ = "paragraphs"
+    __table_args__ = (
+        Index("ix_paragraphs_search_vector", "search_vector", postgresql_using="gin"),
+        # 文档内按段落序号分页
+        Index("ix_paragraphs_document_paragraph_index", "document_id", "paragraph_index"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     document_id = Column(String, ForeignKey("documents.id"), nullable=False, index=True)
@@ -44,6 +61,8 @@ class Paragraph(Base):
     content = Column(Text, nullable=False)
     character_count = Column(Integer, default=0)
     para_metadata = Column(JSON, default=dict)
+    vector_id = Column(BigInteger, unique=True, index=True)  # 向量索引中的ID（由段落ID派生）
+    search_vector = deferred(Column(TSVECTOR))  # jieba分词后的全文检索向量（只在检索条件中使用，默认不加载）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     document = relationship("Document", back_populates="paragraphs")
@@ -0,0 +1,34 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: document_job
+    @date: 2026/2/14
+    @desc: 文档后台处理任务模型
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Index
+from sqlalchemy.sql import func
+from app.database.base import Base
+
+
+class DocumentJob(Base):
+    __tablename__ = "document_jobs"
+    __table_args__ = (
+        Index("ix_document_jobs_status_run_after", "status", "run_after"),
+        Index("ix_document_jobs_status_lease_until", "status", "lease_until"),
+    )
+
+    id = Column(String, primary_key=True, index=True)
+    document_id = Column(String, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    # queued / running / completed / failed
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    error_message = Column(Text)
+    run_after = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    # 执行中的任务租约到期时间，由工作线程定期续约
+    lease_until = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
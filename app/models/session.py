@@ -6,13 +6,17 @@
     @desc: 会话模型
 """
 
-from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.database.base import Base
 
 
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # 会话列表的游标分页（按创建时间倒序）
+        Index("ix_sessions_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), index=True, nullable=False)
@@ -5,83 +5,101 @@
     @date: 2025/7/9 15:19
     @desc:
 """
+import time
+from datetime import timedelta
+
 from fastapi import APIRouter, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from app.database.base import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.base import get_async_db
 from app.schemas.token import TokenBase
-from app.services.auth_service import authenticate_user
-from app.common.core.result import AppApiException
+from app.services.auth_service import authenticate_user_async
+from app.services.refresh_session_service import refresh_session_store
+from app.common.core.result import AppApiException, Result
 from app.common.core.security import create_access_token, create_refresh_token
 from config import settings
-from app.models import User
 
 router = APIRouter(tags=["auth"])
 
 
-@router.post("/login", response_model=TokenBase)
-async def login_for_access_token(
-        form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_db)
-):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
-        raise AppApiException(status.HTTP_401_UNAUTHORIZED, message="用户名或密码错误",)
+async def _issue_tokens(user_id: str, email: str, is_superuser: bool) -> dict:
+    """签发访问令牌和刷新令牌，并登记刷新令牌会话"""
     # 生成短期token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email}, expires_delta=access_token_expires
     )
 
-    # 生成 refresh_token（长期）
+    # 生成 refresh_token（长期），jti 对应服务端会话
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    jti = await run_in_threadpool(
+        refresh_session_store.create, user_id, email, is_superuser, refresh_token_expires.total_seconds()
+    )
     refresh_token = create_refresh_token(
-        data={"sub": user.email}, expires_delta=refresh_token_expires
+        data={"sub": email, "jti": jti}, expires_delta=refresh_token_expires
     )
 
-    return {"is_superuser": user.is_superuser, "access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer",
-            "access_expires_in": access_token_expires.seconds, "refresh_expires_in": int(refresh_token_expires.total_seconds())}
+    return {"is_superuser": is_superuser, "access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer",
+            "access_expires_in": int(access_token_expires.total_seconds()), "refresh_expires_in": int(refresh_token_expires.total_seconds())}
 
 
-@router.post("/token/refresh", response_model=TokenBase)
-async def refresh_access_token(
-        refresh_token: str,  # 客户端传入过期的 refresh_token
-        db: Session = Depends(get_db)
-):
+def _decode_refresh_token(refresh_token: str, verify_exp: bool = True) -> dict:
     try:
         # 验证 refresh_token
         payload = jwt.decode(
-            refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM],
+            options={"verify_exp": verify_exp}
         )
-        # 检查令牌类型（防止用 access_token 冒充）
-        if payload.get("type") != "refresh":
-            raise AppApiException(401, message="刷新令牌无效")
-        user_email: str = payload.get("sub")
-        if user_email is None:
-            raise AppApiException(401, message="刷新令牌无效")
     except jwt.ExpiredSignatureError:
         raise AppApiException(401, message="刷新令牌已过期，请重新登录")
     except jwt.JWTError:
         raise AppApiException(401, message="刷新令牌无效")
 
-    # 验证用户是否存在
-    user = db.query(User).filter(User.email == user_email).first()
+    # 检查令牌类型（防止用 access_token 冒充）
+    if payload.get("type") != "refresh" or not payload.get("sub") or not payload.get("jti"):
+        raise AppApiException(401, message="刷新令牌无效")
+    return payload
+
+
+@router.post("/login", response_model=TokenBase)
+async def login_for_access_token(
+        form_data: OAuth2PasswordRequestForm = Depends(),
+        db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
-        raise AppApiException(status_code=401, detail="未找到用户")
+        raise AppApiException(status.HTTP_401_UNAUTHORIZED, message="用户名或密码错误",)
+    if not user.is_active:
+        raise AppApiException(status.HTTP_403_FORBIDDEN, message="用户已被禁用")
+    return await _issue_tokens(user.id, user.email, user.is_superuser)
 
-    # 生成新的 access_token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
 
-    # 同时刷新 refresh_token（滑动窗口，延长有效期）
-    refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
-    refresh_token = create_refresh_token(
-        data={"sub": user.email}, expires_delta=refresh_token_expires
-    )
+@router.post("/token/refresh", response_model=TokenBase)
+async def refresh_access_token(
+        refresh_token: str,  # 客户端传入的 refresh_token
+):
+    """
+    刷新访问令牌
 
-    return {"is_superuser": user.is_superuser, "access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer",
-            "access_expires_in": access_token_expires.seconds, "refresh_expires_in": int(refresh_token_expires.total_seconds())}
+    只校验令牌签名和服务端会话（不查询 users 表）；每个刷新令牌只能使用一次，
+    同时签发新的 refresh_token（滑动窗口，延长有效期）。
+    """
+    payload = _decode_refresh_token(refresh_token)
+    remaining = payload["exp"] - time.time()
+    session = await run_in_threadpool(refresh_session_store.rotate, payload["jti"], remaining)
+    if session is None:
+        raise AppApiException(401, message="刷新令牌已失效，请重新登录")
+
+    return await _issue_tokens(session["user_id"], session["email"], session["is_superuser"])
+
+
+@router.post("/logout")
+async def logout(
+        refresh_token: str,
+):
+    """退出登录（撤销刷新令牌会话，已过期的令牌也可以撤销）"""
+    payload = _decode_refresh_token(refresh_token, verify_exp=False)
+    await run_in_threadpool(refresh_session_store.revoke, payload["jti"])
+    return Result.success().to_dict()
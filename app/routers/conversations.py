@@ -6,14 +6,26 @@
     @desc: AI对话管理接口
 """
 
-from fastapi import APIRouter, Depends
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 
-from app.database.base import get_db
-from app.schemas.conversation import ConversationCreate, ConversationResponse, ConversationDetailResponse, MessageCreate, StreamMessageCreate, ConversationUpdate
-from app.services.conversation_service import get_conversation, get_conversations, create_conversation, delete_conversation, add_message, get_messages, add_stream_message, save_stream_message, get_red_conversations, generate_ai_response_with_langchain, summarize_conversation_with_langchain, get_conversation_context, is_langchain_initialized, update_conversation
+from app.database.base import get_async_db, AsyncSessionLocal
+from app.schemas.conversation import ConversationCreate, ConversationResponse, ConversationDetailResponse, ConversationInfo, MessageCreate, StreamMessageCreate, ConversationUpdate
+from app.services.conversation_service import (
+    get_conversation_async, get_conversations_async, create_conversation_async, delete_conversation_async,
+    update_conversation_async, add_message_async, get_messages_async, get_conversation_history_async,
+    add_stream_message_async, save_stream_message_async, get_red_conversations_async,
+    get_summary_memory_async, get_conversation_summary_async, schedule_summary_refresh, save_assistant_reply_task, get_conversation_list_item_async,
+    generate_ai_response_with_langchain, stream_ai_response_with_langchain, build_conversation_context,
+    get_conversation_context, is_langchain_initialized, CONVERSATION_KEYSET, RED_CONVERSATION_KEYSET
+)
+from app.services.rag_service import retrieve_document_context_async
+from app.common.core.pagination import set_next_cursor
 from app.common.core.result import Result, AppApiException
 from app.models.user import User
 from app.services.auth_service import get_current_user
@@ -22,45 +34,46 @@ router = APIRouter()
 
 
 @router.post("/")
-def create_conversation_endpoint(
+async def create_conversation_endpoint(
     conversation_create: ConversationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     创建新对话
     """
-    return Result.success(create_conversation(db=db, user_id=current_user.id, conversation_create=conversation_create)).to_dict()
+    conversation = await create_conversation_async(db=db, user_id=current_user.id, conversation_create=conversation_create)
+    return Result.success(ConversationInfo.model_validate(conversation)).to_dict()
 
 
 @router.delete("/{conversation_id}")
-def delete_conversation_endpoint(
+async def delete_conversation_endpoint(
     conversation_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     删除对话
     """
-    return Result.success(delete_conversation(db=db, conversation_id=conversation_id, user_id=current_user.id)).to_dict()
+    return Result.success(await delete_conversation_async(db=db, conversation_id=conversation_id, user_id=current_user.id)).to_dict()
 
 
 @router.put("/{conversation_id}")
-def update_conversation_endpoint(
+async def update_conversation_endpoint(
     conversation_id: str,
     conversation_update: ConversationUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     更新对话
     """
-    conversation = update_conversation(db=db, conversation_id=conversation_id, user_id=current_user.id, conversation_update=conversation_update)
-    return Result.success(conversation).to_dict()
+    conversation = await update_conversation_async(db=db, conversation_id=conversation_id, user_id=current_user.id, conversation_update=conversation_update)
+    return Result.success(ConversationInfo.model_validate(conversation)).to_dict()
 
 
 @router.get("/langchain/status")
-def get_langchain_status_endpoint(
+async def get_langchain_status_endpoint(
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -73,76 +86,86 @@ def get_langchain_status_endpoint(
 
 
 @router.get("/red")
-def get_red_conversations_endpoint(
+async def get_red_conversations_endpoint(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取红对话列表（多轮会话）
+    传入上一页响应头 X-Next-Cursor 中的游标翻页（忽略 skip），没有该响应头说明已到最后一页
     """
-    conversations = get_red_conversations(db=db, user_id=current_user.id, skip=skip, limit=limit)
+    conversations = await get_red_conversations_async(db=db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, RED_CONVERSATION_KEYSET, conversations, limit)
     return Result.success(conversations).to_dict()
 
 
 @router.get("/")
-def get_conversations_endpoint(
+async def get_conversations_endpoint(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取对话列表
+    传入上一页响应头 X-Next-Cursor 中的游标翻页（忽略 skip），没有该响应头说明已到最后一页
     """
-    conversations = get_conversations(db=db, user_id=current_user.id, skip=skip, limit=limit)
+    conversations = await get_conversations_async(db=db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, CONVERSATION_KEYSET, conversations, limit)
     return Result.success(conversations).to_dict()
 
 
 @router.get("/{conversation_id}")
-def get_conversation_endpoint(
+async def get_conversation_endpoint(
     conversation_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取对话详情
     """
-    conversation = get_conversation(db=db, conversation_id=conversation_id)
+    conversation = await get_conversation_async(db=db, conversation_id=conversation_id)
     if not conversation:
         raise AppApiException(404, "对话不存在")
     
     if conversation.user_id != current_user.id:
         raise AppApiException(403, "没有权限查看其他用户的对话")
     
-    return Result.success(conversation).to_dict()
+    return Result.success(ConversationInfo.model_validate(conversation)).to_dict()
 
 
 @router.post("/{conversation_id}/messages")
-def add_message_endpoint(
+async def add_message_endpoint(
     conversation_id: str,
     message_create: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     向对话添加消息
     """
-    conversation = add_message(db=db, conversation_id=conversation_id, user_id=current_user.id, message_create=message_create)
+    conversation = await add_message_async(db=db, conversation_id=conversation_id, user_id=current_user.id, message_create=message_create)
     return Result.success(conversation).to_dict()
 
 
 @router.get("/{conversation_id}/messages")
-def get_messages_endpoint(
+async def get_messages_endpoint(
     conversation_id: str,
-    db: Session = Depends(get_db),
+    before_id: Optional[int] = Query(None, description="游标：只返回ID小于该值的消息"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="返回最近的消息条数"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    获取对话的消息列表
+    获取对话的消息列表（支持按消息ID的键集分页）
     """
-    messages = get_messages(db=db, conversation_id=conversation_id, user_id=current_user.id)
+    messages = await get_messages_async(db=db, conversation_id=conversation_id, user_id=current_user.id, before_id=before_id, limit=limit)
     return Result.success(messages).to_dict()
 
 
@@ -150,117 +173,167 @@ def get_messages_endpoint(
 async def stream_message_endpoint(
     conversation_id: str,
     message_create: StreamMessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     流式问答接口
     """
-    message_result = add_stream_message(db=db, conversation_id=conversation_id, user_id=current_user.id, message_create=message_create.dict())
+    message_result = await add_stream_message_async(db=db, conversation_id=conversation_id, user_id=current_user.id, message_create=message_create.dict())
     
     async def generate():
         if isinstance(message_result, dict) and "type" in message_result:
             yield json.dumps(message_result).encode('utf-8') + b'\n\n'
-        else:
-            yield json.dumps({
-                "type": "message",
-                "data": message_result
-            }).encode('utf-8') + b'\n\n'
+            return
         
-        # 生成AI回复
-        conversation = get_conversation(db=db, conversation_id=conversation_id)
-        if conversation:
-            # 获取对话历史
-            conversation_history = conversation.content or []
+        yield json.dumps({
+            "type": "message",
+            "data": message_result
+        }).encode('utf-8') + b'\n\n'
+        
+        # 响应体在依赖清理之后才开始发送，流式阶段使用独立的会话
+        async with AsyncSessionLocal() as stream_db:
+            # 获取总结记忆：滚动总结 + 本条用户消息之前、检查点之后的原文消息
+            conversation = await get_conversation_async(db=stream_db, conversation_id=conversation_id)
+            memory = await get_summary_memory_async(db=stream_db, db_conversation=conversation, before_id=message_result["id"])
+            conversation_history = memory["messages"]
             
-            # 使用LangChain生成AI回复
-            ai_result = await generate_ai_response_with_langchain(
-                conversation_history=conversation_history,
-                user_message=message_create.content
-            )
+            # 开启文档检索时，在延迟预算内检索用户文档，引用先于回复内容发给前端
+            document_context = None
+            if message_create.use_documents:
+                document_context = await retrieve_document_context_async(
+                    db=stream_db,
+                    user_id=current_user.id,
+                    query=message_create.content,
+                    top_k=message_create.top_k,
+                    document_ids=message_create.document_ids
+                )
+                yield json.dumps({
+                    "type": "citations",
+                    "data": document_context["citations"]
+                }).encode('utf-8') + b'\n\n'
             
-            if ai_result["success"]:
-                ai_response = ai_result["response"]
-                
-                # 模拟流式返回
-                for i in range(0, len(ai_response), 50):
-                    chunk = ai_response[i:i+50]
+            # 使用LangChain流式生成AI回复，模型每返回一段增量就立即转发
+            chunks = []
+            usage = {}
+            save_task = None
+            try:
+                try:
+                    context_window = build_conversation_context(
+                        conversation_history=conversation_history,
+                        user_message=message_create.content,
+                        summary=memory["summary"],
+                        knowledge=document_context["knowledge"] if document_context else None
+                    )
+                    async for delta in stream_ai_response_with_langchain(
+                        conversation_history=conversation_history,
+                        user_message=message_create.content,
+                        context_window=context_window,
+                        usage=usage
+                    ):
+                        chunks.append(delta)
+                        yield json.dumps({
+                            "type": "message",
+                            "data": {
+                                "role": "assistant",
+                                "content": delta
+                            }
+                        }).encode('utf-8') + b'\n\n'
+                except Exception as e:
                     yield json.dumps({
-                        "type": "message",
+                        "type": "error",
                         "data": {
-                            "role": "assistant",
-                            "content": chunk
+                            "code": 500,
+                            "message": str(e) or "生成AI回复失败"
                         }
                     }).encode('utf-8') + b'\n\n'
+                    return
+                
+                # 流结束后保存完整的AI回复
+                ai_response = "".join(chunks)
+                save_task = save_assistant_reply_task(conversation_id, current_user.id, ai_response)
+                assistant_message = await asyncio.shield(save_task)
                 
+                done = {
+                    "message": "流式响应结束",
+                    "content": ai_response,
+                    "message_id": assistant_message.get("id"),
+                    "memory_used": context_window["message_count"],
+                    "context_tokens": context_window["token_count"]
+                }
+                # 实际提示词token数以模型返回的用量为准，模型未返回时不提供
+                if usage.get("input_tokens") is not None:
+                    done["prompt_tokens"] = usage["input_tokens"]
+                # 侧边栏直接使用服务端维护的消息数和预览，不在前端推算
+                list_item = await get_conversation_list_item_async(db=stream_db, conversation_id=conversation_id)
+                if list_item is not None:
+                    done.update(list_item.model_dump(mode="json", include={"message_count", "last_message_preview", "last_message_at"}))
+                if document_context is not None:
+                    done.update({
+                        "citations": document_context["citations"],
+                        "knowledge_tokens": document_context["knowledge_tokens"],
+                        "retrieval_ms": document_context["retrieval_ms"],
+                        "retrieval_timed_out": document_context["timed_out"]
+                    })
                 yield json.dumps({
                     "type": "done",
-                    "data": {
-                        "message": "流式响应结束",
-                        "content": ai_response
-                    }
+                    "data": done
                 }).encode('utf-8') + b'\n\n'
-            else:
-                yield json.dumps({
-                    "type": "error",
-                    "data": {
-                        "code": 500,
-                        "message": ai_result["error"] or "生成AI回复失败"
-                    }
-                }).encode('utf-8') + b'\n\n'
-        else:
-            yield json.dumps({
-                "type": "error",
-                "data": {
-                    "code": 404,
-                    "message": "对话不存在"
-                }
-            }).encode('utf-8') + b'\n\n'
+            finally:
+                # 模型出错或客户端断开时，保存已生成的部分回复并标记为中断，避免用户消息没有对应的回复
+                if save_task is None and chunks:
+                    save_task = save_assistant_reply_task(conversation_id, current_user.id, "".join(chunks), aborted=True)
+                    await asyncio.shield(save_task)
+            
+        # 未总结的消息积累到阈值时，在后台把较早的部分折叠进滚动总结
+        schedule_summary_refresh(conversation_id)
     
     return StreamingResponse(generate(), media_type="text/event-stream")
 
 
 @router.post("/{conversation_id}/stream/save")
-def save_stream_message_endpoint(
+async def save_stream_message_endpoint(
     conversation_id: str,
     message: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     保存流式消息到数据库
     """
-    return Result.success(save_stream_message(db=db, conversation_id=conversation_id, user_id=current_user.id, message=message)).to_dict()
+    return Result.success(await save_stream_message_async(db=db, conversation_id=conversation_id, user_id=current_user.id, message=message)).to_dict()
 
 
 @router.post("/{conversation_id}/ai-response")
 async def generate_ai_response_endpoint(
     conversation_id: str,
     message_create: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     使用LangChain生成AI回复（基于对话历史）
     """
-    conversation = get_conversation(db=db, conversation_id=conversation_id)
+    conversation = await get_conversation_async(db=db, conversation_id=conversation_id)
     if not conversation:
         raise AppApiException(404, "对话不存在")
     
     if conversation.user_id != current_user.id:
         raise AppApiException(403, "没有权限查看其他用户的对话")
     
-    conversation_history = conversation.content or []
+    memory = await get_summary_memory_async(db=db, db_conversation=conversation)
     
     result = await generate_ai_response_with_langchain(
-        conversation_history=conversation_history,
-        user_message=message_create.content
+        conversation_history=memory["messages"],
+        user_message=message_create.content,
+        summary=memory["summary"]
     )
     
     if result["success"]:
         return Result.success({
             "response": result["response"],
-            "memory_used": result["memory_used"]
+            "memory_used": result["memory_used"],
+            "context_tokens": result["context_tokens"]
         }).to_dict()
     else:
         raise AppApiException(500, f"AI回复生成失败: {result['error']}")
@@ -269,50 +342,40 @@ async def generate_ai_response_endpoint(
 @router.get("/{conversation_id}/summary")
 async def get_conversation_summary_endpoint(
     conversation_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    获取对话总结（使用LangChain）
+    获取对话总结（不修改对话：滚动总结在回复完成后由后台增量折叠，尚未折叠时按需总结）
     """
-    conversation = get_conversation(db=db, conversation_id=conversation_id)
+    conversation = await get_conversation_async(db=db, conversation_id=conversation_id)
     if not conversation:
         raise AppApiException(404, "对话不存在")
     
     if conversation.user_id != current_user.id:
         raise AppApiException(403, "没有权限查看其他用户的对话")
     
-    conversation_history = conversation.content or []
-    
-    summary_result = await summarize_conversation_with_langchain(conversation_history=conversation_history)
-    
-    if summary_result["success"]:
-        return Result.success({
-            "summary": summary_result["summary"],
-            "message_count": summary_result["message_count"]
-        }).to_dict()
-    else:
-        raise AppApiException(500, f"对话总结失败: {summary_result['error']}")
+    return Result.success(await get_conversation_summary_async(db=db, db_conversation=conversation)).to_dict()
 
 
 @router.get("/{conversation_id}/context")
 async def get_conversation_context_endpoint(
     conversation_id: str,
     max_context_length: int = 10,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取对话上下文（使用LangChain）
     """
-    conversation = get_conversation(db=db, conversation_id=conversation_id)
+    conversation = await get_conversation_async(db=db, conversation_id=conversation_id)
     if not conversation:
         raise AppApiException(404, "对话不存在")
     
     if conversation.user_id != current_user.id:
         raise AppApiException(403, "没有权限查看其他用户的对话")
     
-    conversation_history = conversation.content or []
+    conversation_history = await get_conversation_history_async(db=db, conversation_id=conversation_id)
     
     context_result = await get_conversation_context(
         conversation_history=conversation_history,
@@ -330,7 +393,7 @@ async def get_conversation_context_endpoint(
 
 
 @router.get("/langchain/status")
-def get_langchain_status_endpoint(
+async def get_langchain_status_endpoint(
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -7,33 +7,45 @@
 """
 
 import os
+import time
 import uuid
 from pathlib import Path
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.database.base import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.base import get_async_db
 from app.schemas.document import (
     DocumentCreate, DocumentUpdate, DocumentResponse, DocumentListResponse,
-    ParagraphResponse, DocumentDetailResponse, DocumentUploadResponse
+    ParagraphResponse, DocumentDetailResponse, DocumentUploadResponse, DocumentStatusResponse,
+    SemanticSearchResponse, FullTextSearchResponse, HybridSearchResponse
 )
-from app.services.document_service import DocumentService
+from app.common.core.pagination import set_next_cursor
+from app.services.document_service import AsyncDocumentService, DOCUMENT_KEYSET, PARAGRAPH_KEYSET
+from app.services.document_parser_service import document_parser_service
+from app.services.document_job_service import document_job_queue, get_latest_job_async
+from app.services.document_cache_service import document_cache
+from app.services.hybrid_search_service import hybrid_search_async
 from app.services.auth_service import get_current_user
 from app.services.minio_service import minio_service
 from app.models.user import User
+from config import settings
 
 router = APIRouter()
 
 
-@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
+    splitter_type: Optional[str] = Form(None, description="分段方法（recursive_char/token/markdown_header/code_syntax）"),
+    chunk_size: Optional[int] = Form(None, ge=1, description="分段大小（token 分段时为token数）"),
+    chunk_overlap: Optional[int] = Form(None, ge=0, description="分段重叠"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """上传文档并自动解析"""
-    document_service = DocumentService(db)
+    """上传文档，解析/分段/存储由后台任务队列异步完成（通过 /{document_id}/status 查询进度）"""
+    document_service = AsyncDocumentService(db)
     
     # 验证文件类型
     allowed_extensions = {'.pdf', '.doc', '.docx', '.txt', '.md', '.xls', '.xlsx'}
@@ -45,6 +57,21 @@ async def upload_document(
             detail=f"不支持的文件类型。支持的类型: {', '.join(allowed_extensions)}"
         )
     
+    # 验证分段参数
+    available_splitters = document_parser_service.get_available_splitters()
+    if splitter_type and splitter_type not in available_splitters:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的分段方法。支持的方法: {', '.join(available_splitters)}"
+        )
+    effective_size = chunk_size or 1000
+    effective_overlap = chunk_overlap if chunk_overlap is not None else 200
+    if effective_overlap >= effective_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="分段重叠必须小于分段大小"
+        )
+    
     # 生成唯一文件名
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     
@@ -58,86 +85,229 @@ async def upload_document(
             detail=f"文件读取失败: {str(e)}"
         )
     
+    # 按内容哈希去重：相同文件已上传过时复用MinIO对象
+    content_hash = await run_in_threadpool(document_cache.compute_hash, content)
+    minio_object_name = await run_in_threadpool(document_cache.get_object, content_hash)
+    if minio_object_name and not await run_in_threadpool(minio_service.file_exists, minio_object_name):
+        minio_object_name = None
+    
     # 上传到MinIO
-    try:
-        minio_object_name = minio_service.upload_bytes(
-            data=content,
-            object_name=unique_filename,
-            content_type=file.content_type,
-            length=file_size
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"文件上传到MinIO失败: {str(e)}"
-        )
+    if not minio_object_name:
+        try:
+            minio_object_name = await run_in_threadpool(
+                minio_service.upload_bytes,
+                data=content,
+                object_name=unique_filename,
+                content_type=file.content_type,
+                length=file_size
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"文件上传到MinIO失败: {str(e)}"
+            )
+        await run_in_threadpool(document_cache.set_object, content_hash, minio_object_name)
     
     # 创建文档记录（存储MinIO对象名）
-    document = document_service.create_document(
+    document = await document_service.create_document(
         user_id=current_user.id,
         filename=file.filename,
         file_path=minio_object_name,  # 存储MinIO对象名
         file_type=file_extension[1:],  # 去掉点号
         file_size=file_size,
-        content_type=file.content_type
+        content_type=file.content_type,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        splitter_type=splitter_type,
+        content_hash=content_hash
     )
     
-    # 处理文档（解析、分段、存储）
-    process_result = document_service.process_document(document.id, content)
-    
-    if not process_result.get("success"):
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"文档处理失败: {process_result.get('error')}"
-        )
+    # 创建后台处理任务，由任务队列的工作线程完成解析、分段、存储
+    job = await document_job_queue.enqueue_async(db, document.id)
     
     return DocumentUploadResponse(
         document_id=document.id,
-        message="文档上传成功",
-        total_paragraphs=process_result["total_paragraphs"],
-        total_characters=process_result["total_characters"]
+        message="文档上传成功，正在后台处理",
+        status=document.status,
+        job_id=job.id
     )
 
 
 @router.get("", response_model=List[DocumentListResponse])
-def list_documents(
+async def list_documents(
+    response: Response,
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(100, ge=1, le=100, description="返回记录数"),
-    status: str = Query(None, description="文档状态过滤"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标（传入时忽略 skip）"),
+    status_filter: str = Query(None, alias="status", description="文档状态过滤"),
     file_type: str = Query(None, description="文件类型过滤"),
     search: str = Query(None, description="文件名搜索"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取文档列表（支持分页和筛选）"""
-    document_service = DocumentService(db)
-    documents = document_service.get_documents(
+    """获取文档列表（支持分页和筛选；不搜索时可按游标翻页）"""
+    if cursor and search:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="搜索结果按相关度排序，不支持游标分页，请使用 skip"
+        )
+
+    document_service = AsyncDocumentService(db)
+    documents = await document_service.get_documents(
         user_id=current_user.id,
         skip=skip,
         limit=limit,
-        status=status,
+        status=status_filter,
         file_type=file_type,
-        search=search
+        search=search,
+        cursor=cursor
     )
+    if not search:
+        set_next_cursor(response, DOCUMENT_KEYSET, documents, limit)
     return documents
 
 
+@router.get("/cache/stats")
+async def get_document_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """获取文档去重缓存统计（命中/未命中次数、占用空间，仅超级管理员）"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="没有权限查看缓存统计"
+        )
+    return await run_in_threadpool(document_cache.get_stats)
+
+
+@router.get("/semantic-search", response_model=SemanticSearchResponse)
+async def semantic_search(
+    q: str = Query(..., min_length=1, max_length=1000, description="查询文本"),
+    top_k: int = Query(10, ge=1, le=100, description="返回段落数"),
+    document_id: Optional[List[str]] = Query(None, description="只在指定文档中检索（可多个）"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """语义检索当前用户文档中的段落（按向量相似度排序）"""
+    if not settings.EMBEDDING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="语义检索未启用"
+        )
+    
+    document_service = AsyncDocumentService(db)
+    started = time.perf_counter()
+    results = await document_service.semantic_search(
+        current_user.id, q, top_k=top_k, document_ids=document_id
+    )
+    
+    return SemanticSearchResponse(
+        query=q,
+        results=results,
+        took_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+
+
+@router.get("/fulltext-search", response_model=FullTextSearchResponse)
+async def fulltext_search(
+    q: str = Query(..., min_length=1, max_length=200, description="查询文本"),
+    document_id: Optional[List[str]] = Query(None, description="只在指定文档中检索（可多个）"),
+    skip: int = Query(0, ge=0, description="跳过记录数"),
+    limit: int = Query(20, ge=1, le=100, description="返回记录数"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """全文检索当前用户文档中的段落（按相关度排序，返回高亮片段）"""
+    document_service = AsyncDocumentService(db)
+    started = time.perf_counter()
+    results = await document_service.fulltext_search(
+        current_user.id, q, document_ids=document_id, skip=skip, limit=limit
+    )
+    
+    return FullTextSearchResponse(
+        query=q,
+        results=results,
+        took_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+
+
+@router.get("/search", response_model=HybridSearchResponse)
+async def hybrid_search(
+    q: str = Query(..., min_length=1, max_length=1000, description="查询文本"),
+    top_k: int = Query(10, ge=1, le=50, description="返回段落数"),
+    document_id: Optional[List[str]] = Query(None, description="只在指定文档中检索（可多个）"),
+    fusion: str = Query("rrf", pattern="^(rrf|weighted)$", description="融合方式：rrf 倒数排名融合 / weighted 加权"),
+    vector_weight: Optional[float] = Query(None, ge=0, le=1, description="加权融合时向量相似度的权重"),
+    rerank: bool = Query(False, description="是否用交叉编码器重排"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """混合检索当前用户文档中的段落（BM25 与向量相似度融合，可选重排）"""
+    started = time.perf_counter()
+    searched = await hybrid_search_async(
+        db,
+        current_user.id,
+        q,
+        top_k=top_k,
+        document_ids=document_id,
+        fusion=fusion,
+        vector_weight=vector_weight,
+        rerank=rerank
+    )
+    
+    return HybridSearchResponse(
+        query=q,
+        fusion=fusion,
+        reranked=rerank,
+        results=searched["results"],
+        timings=searched["timings"],
+        took_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+
+
+@router.get("/{document_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """查询文档处理状态与进度"""
+    document_service = AsyncDocumentService(db)
+    document = await document_service.get_document(document_id, current_user.id)
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文档不存在"
+        )
+    
+    job = await get_latest_job_async(db, document_id)
+    
+    return DocumentStatusResponse(
+        document_id=document.id,
+        status=document.status,
+        progress=document.progress or 0,
+        total_paragraphs=document.total_paragraphs or 0,
+        error_message=document.error_message or None,
+        job=job
+    )
+
+
 @router.get("/{document_id}", response_model=DocumentDetailResponse)
-def get_document(
+async def get_document(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取文档详情（包含段落）"""
-    document_service = DocumentService(db)
-    document = document_service.get_document(document_id, current_user.id)
+    document_service = AsyncDocumentService(db)
+    document = await document_service.get_document(document_id, current_user.id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="文档不存在"
         )
     
-    paragraphs = document_service.get_paragraphs(document_id)
+    paragraphs = await document_service.get_paragraphs(document_id)
     
     return DocumentDetailResponse(
         id=document.id,
@@ -152,6 +322,7 @@ def get_document(
         splitter_type=document.splitter_type,
         total_paragraphs=document.total_paragraphs,
         status=document.status,
+        progress=document.progress or 0,
         error_message=document.error_message,
         is_active=document.is_active,
         created_at=document.created_at,
@@ -161,14 +332,14 @@ def get_document(
 
 
 @router.get("/{document_id}/download")
-def download_document(
+async def download_document(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """下载文档（从MinIO）"""
-    document_service = DocumentService(db)
-    document = document_service.get_document(document_id, current_user.id)
+    document_service = AsyncDocumentService(db)
+    document = await document_service.get_document(document_id, current_user.id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -176,7 +347,7 @@ def download_document(
         )
     
     try:
-        file_data = minio_service.download_file(document.file_path)
+        file_data = await run_in_threadpool(minio_service.download_file, document.file_path)
         
         return StreamingResponse(
             iter([file_data]),
@@ -193,15 +364,15 @@ def download_document(
 
 
 @router.put("/{document_id}", response_model=DocumentResponse)
-def update_document(
+async def update_document(
     document_id: str,
     document_update: DocumentUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新文档信息"""
-    document_service = DocumentService(db)
-    document = document_service.update_document(document_id, current_user.id, document_update)
+    document_service = AsyncDocumentService(db)
+    document = await document_service.update_document(document_id, current_user.id, document_update)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -211,14 +382,14 @@ def update_document(
 
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_document(
+async def delete_document(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除文档"""
-    document_service = DocumentService(db)
-    success = document_service.delete_document(document_id, current_user.id)
+    document_service = AsyncDocumentService(db)
+    success = await document_service.delete_document(document_id, current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -228,41 +399,52 @@ def delete_document(
 
 
 @router.get("/{document_id}/paragraphs", response_model=List[ParagraphResponse])
-def get_document_paragraphs(
+async def get_document_paragraphs(
     document_id: str,
+    response: Response,
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(100, ge=1, le=100, description="返回记录数"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标（传入时忽略 skip）"),
     search: str = Query(None, description="段落内容搜索"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取文档的所有段落（支持分页和搜索）"""
-    document_service = DocumentService(db)
-    document = document_service.get_document(document_id, current_user.id)
+    """获取文档的所有段落（支持分页和搜索；不搜索时可按游标翻页）"""
+    if cursor and search:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="搜索结果按相关度排序，不支持游标分页，请使用 skip"
+        )
+
+    document_service = AsyncDocumentService(db)
+    document = await document_service.get_document(document_id, current_user.id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="文档不存在"
         )
     
-    paragraphs = document_service.get_paragraphs(
+    paragraphs = await document_service.get_paragraphs(
         document_id=document_id,
         skip=skip,
         limit=limit,
-        search=search
+        search=search,
+        cursor=cursor
     )
+    if not search:
+        set_next_cursor(response, PARAGRAPH_KEYSET, paragraphs, limit)
     return paragraphs
 
 
 @router.get("/paragraphs/{paragraph_id}", response_model=ParagraphResponse)
-def get_paragraph(
+async def get_paragraph(
     paragraph_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取单个段落"""
-    document_service = DocumentService(db)
-    paragraph = document_service.get_paragraph(paragraph_id)
+    document_service = AsyncDocumentService(db)
+    paragraph = await document_service.get_paragraph(paragraph_id)
     if not paragraph:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -270,7 +452,7 @@ def get_paragraph(
         )
     
     # 验证段落所属文档是否属于当前用户
-    document = document_service.get_document(paragraph.document_id, current_user.id)
+    document = await document_service.get_document(paragraph.document_id, current_user.id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
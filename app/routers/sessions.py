@@ -6,14 +6,17 @@
     @desc: 会话管理接口
 """
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.base import get_db
+from app.database.base import get_async_db
 from app.schemas.session import SessionCreate, SessionResponse
-from app.services.session_service import get_session, get_sessions, create_session, delete_session
+from app.services.session_service import (
+    get_session_async, get_sessions_async, create_session_async, delete_session_async, SESSION_KEYSET
+)
+from app.common.core.pagination import set_next_cursor
 from app.common.core.result import Result, AppApiException
 from app.models.user import User
 from app.services.auth_service import get_current_user
@@ -22,53 +25,57 @@ router = APIRouter()
 
 
 @router.post("/")
-def create_session_endpoint(
+async def create_session_endpoint(
     session_create: SessionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     创建新会话
     """
-    return Result.success(create_session(db=db, user_id=current_user.id, session_create=session_create)).to_dict()
+    return Result.success(await create_session_async(db=db, user_id=current_user.id, session_create=session_create)).to_dict()
 
 
 @router.delete("/{session_id}")
-def delete_session_endpoint(
+async def delete_session_endpoint(
     session_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     删除会话
     """
-    return Result.success(delete_session(db=db, session_id=session_id, user_id=current_user.id)).to_dict()
+    return Result.success(await delete_session_async(db=db, session_id=session_id, user_id=current_user.id)).to_dict()
 
 
 @router.get("/")
-def get_sessions_endpoint(
+async def get_sessions_endpoint(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取会话历史
+    传入上一页响应头 X-Next-Cursor 中的游标翻页（忽略 skip），没有该响应头说明已到最后一页
     """
-    sessions = get_sessions(db=db, user_id=current_user.id, skip=skip, limit=limit)
+    sessions = await get_sessions_async(db=db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, SESSION_KEYSET, sessions, limit)
     return Result.success(sessions).to_dict()
 
 
 @router.get("/{session_id}")
-def get_session_endpoint(
+async def get_session_endpoint(
     session_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取会话详情
     """
-    session = get_session(db=db, session_id=session_id)
+    session = await get_session_async(db=db, session_id=session_id)
     if not session:
         raise AppApiException(404, "会话不存在")
     
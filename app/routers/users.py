@@ -7,12 +7,13 @@
 """
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.base import get_db
+from app.database.base import get_async_db
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
-from app.services.user_service import get_user, create_user, update_user, get_users
+from app.services.user_service import get_user_async, create_user_async, update_user_async, get_users_async, set_user_active_async
+from app.services.auth_cache_service import get_auth_cache_stats
 from app.common.core.result import Result, AppApiException
 from app.models.user import User
 from app.services.auth_service import get_current_user
@@ -21,39 +22,62 @@ router = APIRouter()
 
 
 @router.post("/register")
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    return Result.success(create_user(db=db, user=user)).to_dict()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return Result.success(await create_user_async(db=db, user=user)).to_dict()
 
 
 @router.get("/me")
-def read_current_user(current_user: User = Depends(get_current_user)):
+async def read_current_user(current_user: User = Depends(get_current_user)):
     return Result.success(current_user).to_dict()
 
 
+@router.get("/auth-cache/stats")
+async def read_auth_cache_stats(current_user: User = Depends(get_current_user)):
+    """认证缓存（令牌、用户快照）的大小与命中率（仅超级管理员）"""
+    if not current_user.is_superuser:
+        raise AppApiException(403, "没有权限查看缓存统计")
+
+    return Result.success(get_auth_cache_stats()).to_dict()
+
+
+@router.put("/{user_id}/active")
+async def set_user_active_endpoint(
+    user_id: str,
+    is_active: bool = Body(..., embed=True),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """启用/禁用用户（仅超级管理员）"""
+    if not current_user.is_superuser:
+        raise AppApiException(403, "没有权限修改用户状态")
+
+    return Result.success(await set_user_active_async(db=db, user_id=user_id, is_active=is_active)).to_dict()
+
+
 @router.put("/{user_id}")
-def update_user_endpoint(
+async def update_user_endpoint(
     user_id: str,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.id != user_id and not current_user.is_superuser:
         raise AppApiException(403, "没有权限修改其他用户信息")
 
-    return Result.success(update_user(db=db, user_id=user_id, user_update=user_update)).to_dict()
+    return Result.success(await update_user_async(db=db, user_id=user_id, user_update=user_update)).to_dict()
 
 
 @router.get("/{user_id}")
-def read_user(user_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_user = get_user(db, user_id=user_id)
+async def read_user(user_id: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    db_user = await get_user_async(db, user_id=user_id)
     if db_user is None:
         raise AppApiException(404, message="用户不存在")
     return Result.success(db_user).to_dict()
 
 
 @router.get("/")
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    users = get_users(db, skip=skip, limit=limit)
+async def read_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    users = await get_users_async(db, skip=skip, limit=limit)
     return Result.success(users).to_dict()
 
 
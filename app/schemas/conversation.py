@@ -13,6 +13,7 @@ from datetime import datetime
 
 class Message(BaseModel):
     """消息模型"""
+    id: Optional[int] = None
     role: str = Field(..., examples=["user", "assistant"])
     content: str = Field(..., examples=["你好，请问有什么可以帮助您的？"])
     timestamp: Optional[str] = None
@@ -20,6 +21,7 @@ class Message(BaseModel):
     class Config:
         json_schema_extra = {
             "example": {
+                "id": 1,
                 "role": "user",
                 "content": "你好，请问有什么可以帮助您的？",
                 "timestamp": "2026-01-27T12:00:00.000000+00:00"
@@ -74,13 +76,17 @@ class StreamMessageCreate(BaseModel):
     content: str = Field(min_length=1, max_length=5000, examples=["你好，请问有什么可以帮助您的？"])
     role: str = Field(default="user", examples=["user", "assistant"])
     stream: bool = Field(default=True, examples=[True, False])
+    use_documents: bool = Field(default=False, description="是否检索用户文档作为参考资料")
+    document_ids: Optional[List[str]] = Field(default=None, description="只在这些文档中检索，为空时检索全部文档")
+    top_k: Optional[int] = Field(default=None, ge=1, le=20, description="检索段落数")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "content": "你好，请问有什么可以帮助您的？",
                 "role": "user",
-                "stream": True
+                "stream": True,
+                "use_documents": False
             }
         }
 
@@ -101,6 +107,42 @@ class ConversationResponse(BaseModel):
         from_attributes = True
 
 
+class ConversationListItem(BaseModel):
+    """对话列表项（侧边栏投影，不包含消息内容）"""
+    id: str
+    title: str
+    model: Optional[str] = None
+    is_pinned: bool = False
+    total_tokens: int = 0
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationInfo(BaseModel):
+    """对话信息（不包含历史遗留的 content 消息数组，消息通过 /messages 接口分页获取）"""
+    id: str
+    user_id: str
+    title: str
+    model: Optional[str] = None
+    is_active: bool = True
+    is_pinned: bool = False
+    total_tokens: int = 0
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ConversationDetailResponse(BaseModel):
     """对话详情响应模型（包含消息列表）"""
     id: str
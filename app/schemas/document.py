@@ -36,6 +36,7 @@ class DocumentResponse(DocumentBase):
     file_path: str
     total_paragraphs: int
     status: str
+    progress: Optional[int] = 0
     error_message: Optional[str] = None
     is_active: bool
     created_at: datetime
@@ -53,6 +54,7 @@ class DocumentListResponse(BaseModel):
     file_size: int
     total_paragraphs: int
     status: str
+    progress: Optional[int] = 0
     is_active: bool
     created_at: datetime
 
@@ -91,5 +93,81 @@ class DocumentDetailResponse(DocumentResponse):
 class DocumentUploadResponse(BaseModel):
     document_id: str
     message: str = "文档上传成功"
-    total_paragraphs: int
-    total_characters: int
+    status: str = "processing"
+    job_id: Optional[str] = None
+    total_paragraphs: int = 0
+    total_characters: int = 0
+
+
+class DocumentJobResponse(BaseModel):
+    id: str
+    status: str
+    attempts: int
+    max_attempts: int
+    error_message: Optional[str] = None
+    run_after: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SemanticSearchResult(BaseModel):
+    paragraph_id: str
+    document_id: str
+    filename: str
+    paragraph_index: int
+    content: str
+    score: float = Field(..., description="余弦相似度")
+
+
+class SemanticSearchResponse(BaseModel):
+    query: str
+    results: List[SemanticSearchResult] = Field(default_factory=list)
+    took_ms: float = 0.0
+
+
+class FullTextSearchResult(BaseModel):
+    paragraph_id: str
+    document_id: str
+    filename: str
+    paragraph_index: int
+    highlight: str = Field(..., description="命中片段（HTML，命中词用<mark>标出）")
+    score: float = Field(..., description="相关度")
+
+
+class FullTextSearchResponse(BaseModel):
+    query: str
+    results: List[FullTextSearchResult] = Field(default_factory=list)
+    took_ms: float = 0.0
+
+
+class HybridSearchResult(BaseModel):
+    paragraph_id: str
+    document_id: str
+    filename: str
+    paragraph_index: int
+    content: str
+    score: float = Field(..., description="融合分数")
+    bm25: Optional[float] = Field(None, description="BM25分数（未命中查询词时为空）")
+    vector_score: Optional[float] = Field(None, description="余弦相似度（未被向量召回时为空）")
+    rerank_score: Optional[float] = Field(None, description="交叉编码器分数（未重排时为空）")
+
+
+class HybridSearchResponse(BaseModel):
+    query: str
+    fusion: str
+    reranked: bool = False
+    results: List[HybridSearchResult] = Field(default_factory=list)
+    timings: Dict[str, float] = Field(default_factory=dict, description="各阶段耗时(ms)")
+    took_ms: float = 0.0
+
+
+class DocumentStatusResponse(BaseModel):
+    document_id: str
+    status: str
+    progress: int = 0
+    total_paragraphs: int = 0
+    error_message: Optional[str] = None
+    job: Optional[DocumentJobResponse] = None
@@ -8,11 +8,11 @@
 from .user_service import get_user, get_user_by_email, get_user_by_username, get_users, create_user, update_user
 from .auth_service import authenticate_user, auth_token, get_current_user
 from .session_service import get_session, get_sessions, create_session, delete_session
-from .conversation_service import get_conversation, get_conversations, create_conversation, delete_conversation, add_message, get_messages, add_stream_message, save_stream_message, get_red_conversations
+from .conversation_service import get_conversation, get_conversations, create_conversation, delete_conversation, add_message, get_messages, get_conversation_history, add_stream_message, save_stream_message, get_red_conversations
 
 __all__ = [
     "get_user", "get_user_by_email", "get_user_by_username", "get_users", "create_user", "update_user",
     "authenticate_user", "auth_token", "get_current_user",
     "get_session", "get_sessions", "create_session", "delete_session",
-    "get_conversation", "get_conversations", "create_conversation", "delete_conversation", "add_message", "get_messages", "add_stream_message", "save_stream_message", "get_red_conversations"
+    "get_conversation", "get_conversations", "create_conversation", "delete_conversation", "add_message", "get_messages", "get_conversation_history", "add_stream_message", "save_stream_message", "get_red_conversations"
 ]
@@ -0,0 +1,75 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: auth_cache_service
+    @date: 2026/2/25
+    @desc: 认证缓存（已解码的令牌 -> 邮箱、邮箱 -> 用户快照），进程内TTL LRU
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from app.common.core.cache import LRUCache
+from config import settings
+
+# 令牌 -> 邮箱，条目不晚于令牌自身的过期时间失效
+token_cache = LRUCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# 邮箱 -> 用户快照（脱离会话的 User 对象，只读）
+user_cache = LRUCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def get_cached_email(token: str) -> Optional[str]:
+    """
+    获取令牌对应的邮箱（命中时不再解码JWT）
+    :param token: JWT
+    :return: 邮箱，未缓存时返回None
+    """
+    return token_cache.get(token)
+
+
+def cache_token(token: str, email: str, expires_at: Optional[float] = None) -> None:
+    """
+    缓存已验证的令牌
+    :param token: JWT
+    :param email: 令牌中的 sub
+    :param expires_at: 令牌的 exp（Unix时间戳）
+    """
+    ttl = settings.AUTH_CACHE_TTL_SECONDS
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        token_cache.set(token, email, ttl=ttl)
+
+
+def get_cached_user(email: str):
+    """
+    获取用户快照
+    :param email: 邮箱
+    :return: User 对象，未缓存时返回None
+    """
+    return user_cache.get(email)
+
+
+def cache_user(user) -> None:
+    """
+    缓存用户快照
+    :param user: 已加载的 User 对象（会话关闭后仍可读取属性）
+    """
+    user_cache.set(user.email, user)
+
+
+def invalidate_user(email: str) -> None:
+    """
+    用户信息变更或禁用后清除快照（只影响当前进程，其他进程在TTL内过期）
+    :param email: 邮箱
+    """
+    user_cache.pop(email)
+
+
+def get_auth_cache_stats() -> Dict[str, Any]:
+    """获取令牌缓存和用户缓存的大小与命中率"""
+    return {
+        "ttl_seconds": settings.AUTH_CACHE_TTL_SECONDS,
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats()
+    }
@@ -10,13 +10,15 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.common.core.security import verify_password
+from app.common.core.security import verify_password, dummy_verify_password, password_hasher
 from config import settings
-from app.database.base import get_db
+from app.database.base import get_async_db
 from app.schemas.token import TokenData
-from app.services.user_service import get_user_by_email, get_user_by_username
+from app.services.auth_cache_service import get_cached_email, cache_token, get_cached_user, cache_user
+from app.services.user_service import get_user_by_email, get_user_by_username, get_user_by_email_async, get_user_by_username_async
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -31,38 +33,81 @@ def authenticate_user(db: Session, username: str, password: str):
     """
     user = get_user_by_username(db, username=username)
     if not user:
-        return False
+        return dummy_verify_password(password)
     if not verify_password(password, user.hashed_password):
         return False
     return user
 
 
-def auth_token(token: str, db: Session):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无法验证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """
+    验证用户凭据（AsyncSession 版本，bcrypt 校验在密码哈希线程池中执行）
+    :param db: 异步数据库会话
+    :param username: 用户名
+    :param password: 明文密码
+    :return: 用户对象或False
+    """
+    user = await get_user_by_username_async(db, username=username)
+    if not user:
+        return await password_hasher.dummy_verify(password)
+    if not await password_hasher.verify(password, user.hashed_password):
+        return False
+    return user
+
+
+def _decode_token_email(token: str, credentials_exception: HTTPException) -> str:
+    """
+    验证JWT并取出邮箱（已验证过的令牌直接从缓存返回）
+    :param token: JWT
+    :param credentials_exception: 验证失败时抛出的异常
+    :return: 邮箱
+    """
+    email = get_cached_email(token)
+    if email is not None:
+        return email
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("type") == "refresh":
             raise credentials_exception
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
+    cache_token(token, token_data.email, payload.get("exp"))
+    return token_data.email
+
+
+def _check_active(user):
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="用户已被禁用")
     return user
 
 
+def auth_token(token: str, db: Session):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="无法验证凭据",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    email = _decode_token_email(token, credentials_exception)
+    user = get_cached_user(email)
+    if user is None:
+        user = get_user_by_email(db, email=email)
+        if user is None:
+            raise credentials_exception
+        db.expunge(user)
+        cache_user(user)
+    return _check_active(user)
+
+
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     基本验证（只需登录）
+
+    令牌和用户快照命中缓存时不解码JWT、不查询数据库。
     :param token:
     :param db:
     :return:
@@ -72,16 +117,14 @@ async def get_current_user(
         detail="无法验证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
+    email = _decode_token_email(token, credentials_exception)
 
-    user = get_user_by_email(db, email=token_data.email)
+    user = get_cached_user(email)
     if user is None:
-        raise credentials_exception
-    return user
+        user = await get_user_by_email_async(db, email=email)
+        if user is None:
+            raise credentials_exception
+        # 从会话中移出后在请求间共享，不会被其他会话的提交过期
+        db.expunge(user)
+        cache_user(user)
+    return _check_active(user)
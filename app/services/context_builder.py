@@ -0,0 +1,107 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: context_builder
+    @date: 2026/2/12
+    @desc: 按token预算构建对话上下文窗口
+"""
+
+from typing import List, Dict, Any, Hashable
+
+from app.common.core.cache import LRUCache
+from app.common.core.tokenizer import count_tokens
+from config import settings
+
+# 每条消息在chat格式中额外占用的token（角色标记、分隔符）
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# 总结、参考资料在发给模型时包在系统消息里，计数时连同这些说明文字一起计算
+SUMMARY_PROMPT = "以下是此前对话的总结，请结合它理解后续对话：\n"
+KNOWLEDGE_PROMPT = (
+    "以下是从用户上传的文档中检索到的参考资料。回答时请优先依据这些资料，"
+    "引用时用 [编号] 标注来源；资料与问题无关时忽略它们：\n"
+)
+
+
+class ContextWindowBuilder:
+    """
+    从最新消息开始向前填充，直到用完token预算；
+    单条消息的token数按消息缓存，避免每轮重复分词
+    """
+
+    def __init__(self, max_tokens: int = None, cache_size: int = None):
+        """
+        :param max_tokens: 上下文token预算（含当前用户消息）
+        :param cache_size: 单条消息token数缓存容量
+        """
+        self.max_tokens = max_tokens or settings.LLM_CONTEXT_MAX_TOKENS
+        self.token_cache = LRUCache(maxsize=cache_size or settings.LLM_TOKEN_CACHE_SIZE)
+
+    def _cache_key(self, message: Dict[str, Any]) -> Hashable:
+        # 持久化的消息有自增ID，直接作为键；其余按角色和内容哈希
+        if message.get('id') is not None:
+            return ('id', message['id'])
+        return ('hash', hash((message.get('role'), message.get('content', ''))))
+
+    def count_message_tokens(self, message: Dict[str, Any]) -> int:
+        """
+        统计单条消息的token数（带缓存）
+        :param message: 消息字典
+        :return: token数
+        """
+        key = self._cache_key(message)
+        tokens = self.token_cache.get(key)
+        if tokens is None:
+            tokens = count_tokens(message.get('content', '')) + MESSAGE_TOKEN_OVERHEAD
+            self.token_cache.set(key, tokens)
+        return tokens
+
+    def build(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        max_tokens: int = None,
+        summary: str = None,
+        knowledge: str = None
+    ) -> Dict[str, Any]:
+        """
+        构建上下文窗口
+        
+        :param user_message: 当前用户消息（始终保留）
+        :param conversation_history: 按时间正序排列的对话历史
+        :param max_tokens: 本次调用的token预算，为空时使用默认预算
+        :param summary: 早期对话的滚动总结（始终保留）
+        :param knowledge: 从用户文档检索到的参考资料（始终保留，调用方已按上限截断）
+        :return: 包含选中消息、消息数和token数的字典
+        """
+        budget = max_tokens or self.max_tokens
+        used = count_tokens(user_message) + MESSAGE_TOKEN_OVERHEAD
+        if summary:
+            used += self.count_message_tokens({'role': 'system', 'content': SUMMARY_PROMPT + summary})
+        if knowledge:
+            # 每次检索结果都不同，不进缓存
+            used += count_tokens(KNOWLEDGE_PROMPT + knowledge) + MESSAGE_TOKEN_OVERHEAD
+        selected = []
+
+        for message in reversed(conversation_history or []):
+            if message.get('role') not in ('user', 'assistant'):
+                continue
+            tokens = self.count_message_tokens(message)
+            if used + tokens > budget:
+                break
+            selected.append(message)
+            used += tokens
+
+        selected.reverse()
+        return {
+            "summary": summary,
+            "knowledge": knowledge,
+            "messages": selected,
+            "message_count": len(selected),
+            "token_count": used,
+            "max_tokens": budget
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取token缓存统计"""
+        return self.token_cache.stats()
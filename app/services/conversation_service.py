@@ -6,15 +6,51 @@
     @desc: AI对话管理服务
 """
 
+import asyncio
+import logging
 import uuid
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Set
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 
+from app.common.core.pagination import Keyset
+from app.database.base import AsyncSessionLocal
 from app.common.core.result import AppApiException
-from app.models import AIConversation
-from app.schemas.conversation import ConversationCreate, MessageCreate
+from app.models import AIConversation, ConversationMessage
+from app.schemas.conversation import ConversationCreate, ConversationListItem, MessageCreate
 from app.services.langchain_service import langchain_service
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 对话列表按 (created_at, id) 倒序，对应索引 ix_ai_conversations_user_created_id
+CONVERSATION_KEYSET = Keyset(
+    (AIConversation.created_at, AIConversation.id),
+    key=lambda conversation: (conversation.created_at, conversation.id)
+)
+# 红对话按最近活跃时间倒序；updated_at 只在更新时写入，未更新过的对话取 created_at，
+# 对应表达式索引 ix_ai_conversations_user_activity_id
+CONVERSATION_ACTIVITY = func.coalesce(AIConversation.updated_at, AIConversation.created_at)
+RED_CONVERSATION_KEYSET = Keyset(
+    (CONVERSATION_ACTIVITY, AIConversation.id),
+    key=lambda conversation: (conversation.updated_at or conversation.created_at, conversation.id)
+)
+# 列表只查询摘要列，不读取 content（历史消息数组）
+CONVERSATION_LIST_COLUMNS = (
+    AIConversation.id,
+    AIConversation.title,
+    AIConversation.model,
+    AIConversation.is_pinned,
+    AIConversation.total_tokens,
+    AIConversation.message_count,
+    AIConversation.last_message_preview,
+    AIConversation.last_message_at,
+    AIConversation.created_at,
+    AIConversation.updated_at
+)
 
 
 def get_conversation(db: Session, conversation_id: str):
@@ -27,19 +63,26 @@ def get_conversation(db: Session, conversation_id: str):
     return db.query(AIConversation).filter(AIConversation.id == conversation_id).first()
 
 
-def get_conversations(db: Session, user_id: str, skip: int = 0, limit: int = 100):
+def get_conversations(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """
     获取用户的对话列表
     :param db: 数据库会话
     :param user_id: 用户ID
     :param skip: 跳过记录数
     :param limit: 限制返回记录数
-    :return: 对话列表
+    :param cursor: 上一页返回的游标（传入时忽略 skip）
+    :return: 对话列表（摘要投影）
     """
-    return db.query(AIConversation).filter(
+    query = db.query(*CONVERSATION_LIST_COLUMNS).filter(
         AIConversation.user_id == user_id,
         AIConversation.is_active == True
-    ).order_by(AIConversation.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    if cursor:
+        query = query.filter(CONVERSATION_KEYSET.after(cursor))
+    else:
+        query = query.offset(skip)
+    rows = query.order_by(*CONVERSATION_KEYSET.order_by()).limit(limit).all()
+    return [ConversationListItem.model_validate(row) for row in rows]
 
 
 def create_conversation(db: Session, user_id: str, conversation_create: ConversationCreate):
@@ -104,6 +147,9 @@ def update_conversation(db: Session, conversation_id: str, user_id: str, convers
     if db_conversation.user_id != user_id:
         raise AppApiException(403, "没有权限更新其他用户的对话")
     
+    if not isinstance(conversation_update, dict):
+        conversation_update = conversation_update.model_dump(exclude_unset=True)
+    
     if 'title' in conversation_update:
         db_conversation.title = conversation_update['title']
     
@@ -116,6 +162,94 @@ def update_conversation(db: Session, conversation_id: str, user_id: str, convers
     return db_conversation
 
 
+def _message_to_dict(db_message: ConversationMessage) -> Dict[str, Any]:
+    """
+    将消息行转换为接口返回的消息字典
+    :param db_message: 消息对象
+    :return: 消息字典
+    """
+    message = dict(db_message.extra or {})
+    message.update({
+        "id": db_message.id,
+        "role": db_message.role,
+        "content": db_message.content,
+        "timestamp": db_message.timestamp
+    })
+    return message
+
+
+def _message_list_fields(content: str) -> Dict[Any, Any]:
+    """
+    追加消息时对话表需要同步的列（单条UPDATE内自增，并发追加不会丢计数）
+    :param content: 消息内容
+    :return: 列 -> 值
+    """
+    preview = " ".join((content or "").split())[:settings.CONVERSATION_PREVIEW_CHARS]
+    return {
+        AIConversation.updated_at: func.now(),
+        AIConversation.message_count: func.coalesce(AIConversation.message_count, 0) + 1,
+        AIConversation.last_message_preview: preview,
+        AIConversation.last_message_at: func.now()
+    }
+
+
+def _append_message(db: Session, conversation_id: str, message: dict) -> ConversationMessage:
+    """
+    追加一条消息（单行插入，不重写历史消息）
+    :param db: 数据库会话
+    :param conversation_id: 对话ID
+    :param message: 消息字典，role/content/timestamp 之外的字段存入 extra
+    :return: 消息对象
+    """
+    extra = {k: v for k, v in message.items() if k not in ("id", "role", "content", "timestamp")}
+    db_message = ConversationMessage(
+        conversation_id=conversation_id,
+        role=message.get("role", "user"),
+        content=message.get("content", ""),
+        timestamp=message.get("timestamp") or datetime.utcnow().isoformat(),
+        extra=extra
+    )
+    db.add(db_message)
+    # 只更新对话的时间戳和列表冗余字段，保持红对话列表按最近活跃排序
+    db.query(AIConversation).filter(AIConversation.id == conversation_id).update(
+        _message_list_fields(db_message.content), synchronize_session=False
+    )
+    db.commit()
+    db.refresh(db_message)
+    return db_message
+
+
+def get_conversation_history(
+    db: Session,
+    conversation_id: str,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    按消息ID做键集分页读取对话历史
+    :param db: 数据库会话
+    :param conversation_id: 对话ID
+    :param before_id: 只返回ID小于该值的消息（游标）
+    :param limit: 返回最近的消息条数，为空时返回全部
+    :param after_id: 只返回ID大于该值的消息
+    :return: 按时间正序排列的消息列表
+    """
+    query = db.query(ConversationMessage).filter(ConversationMessage.conversation_id == conversation_id)
+    if before_id is not None:
+        query = query.filter(ConversationMessage.id < before_id)
+    if after_id is not None:
+        query = query.filter(ConversationMessage.id > after_id)
+
+    if limit is None:
+        rows = query.order_by(ConversationMessage.id.asc()).all()
+    else:
+        rows = query.order_by(ConversationMessage.id.desc()).limit(limit).all()
+        rows.reverse()
+
+    return [_message_to_dict(row) for row in rows]
+
+
 def add_message(db: Session, conversation_id: str, user_id: str, message_create: MessageCreate):
     """
     向对话添加消息
@@ -138,21 +272,25 @@ def add_message(db: Session, conversation_id: str, user_id: str, message_create:
         "timestamp": datetime.utcnow().isoformat()
     }
     
-    if db_conversation.content is None:
-        db_conversation.content = []
-    
-    db_conversation.content.append(message)
-    db.commit()
+    _append_message(db, conversation_id, message)
     db.refresh(db_conversation)
     return db_conversation
 
 
-def get_messages(db: Session, conversation_id: str, user_id: str):
+def get_messages(
+    db: Session,
+    conversation_id: str,
+    user_id: str,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None
+):
     """
     获取对话的消息列表
     :param db: 数据库会话
     :param conversation_id: 对话ID
     :param user_id: 用户ID
+    :param before_id: 游标，只返回ID小于该值的消息
+    :param limit: 返回最近的消息条数，为空时返回全部
     :return: 消息列表
     """
     db_conversation = get_conversation(db, conversation_id)
@@ -162,7 +300,7 @@ def get_messages(db: Session, conversation_id: str, user_id: str):
     if db_conversation.user_id != user_id:
         raise AppApiException(403, "没有权限查看其他用户的对话消息")
     
-    return db_conversation.content or []
+    return get_conversation_history(db, conversation_id, before_id=before_id, limit=limit)
 
 
 def add_stream_message(db: Session, conversation_id: str, user_id: str, message_create: dict):
@@ -174,8 +312,6 @@ def add_stream_message(db: Session, conversation_id: str, user_id: str, message_
     :param message_create: 消息创建数据
     :return: 消息对象或错误信息
     """
-    from sqlalchemy.orm.attributes import flag_modified
-    
     db_conversation = get_conversation(db, conversation_id)
     if not db_conversation:
         return {
@@ -201,15 +337,9 @@ def add_stream_message(db: Session, conversation_id: str, user_id: str, message_
         "timestamp": datetime.utcnow().isoformat()
     }
     
-    if db_conversation.content is None:
-        db_conversation.content = []
+    db_message = _append_message(db, conversation_id, message)
     
-    db_conversation.content.append(message)
-    flag_modified(db_conversation, "content")
-    db.commit()
-    db.refresh(db_conversation)
-    
-    return message
+    return _message_to_dict(db_message)
 
 
 def save_stream_message(db: Session, conversation_id: str, user_id: str, message: dict):
@@ -221,8 +351,6 @@ def save_stream_message(db: Session, conversation_id: str, user_id: str, message
     :param message: 消息对象
     :return: 更新后的对话对象
     """
-    from sqlalchemy.orm.attributes import flag_modified
-    
     db_conversation = get_conversation(db, conversation_id)
     if not db_conversation:
         raise AppApiException(404, "对话不存在")
@@ -230,58 +358,164 @@ def save_stream_message(db: Session, conversation_id: str, user_id: str, message
     if db_conversation.user_id != user_id:
         raise AppApiException(403, "没有权限向其他用户的对话添加消息")
     
-    if db_conversation.content is None:
-        db_conversation.content = []
-    
-    db_conversation.content.append(message)
-    flag_modified(db_conversation, "content")
-    db.commit()
+    _append_message(db, conversation_id, message)
     db.refresh(db_conversation)
     return db_conversation
 
 
-def get_red_conversations(db: Session, user_id: str, skip: int = 0, limit: int = 100):
+def get_summary_memory(db: Session, db_conversation: AIConversation, before_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    获取对话的总结记忆：滚动总结 + 总结检查点之后的原文消息
+    :param db: 数据库会话
+    :param db_conversation: 对话对象
+    :param before_id: 只取ID小于该值的消息
+    :return: 包含 summary 和 messages 的字典
+    """
+    return {
+        "summary": db_conversation.summary,
+        "messages": get_conversation_history(
+            db,
+            db_conversation.id,
+            before_id=before_id,
+            after_id=db_conversation.summary_message_id
+        )
+    }
+
+
+async def refresh_conversation_summary(db: Session, conversation_id: str, force: bool = False) -> Dict[str, Any]:
+    """
+    增量更新对话的滚动总结，只折叠检查点之后新增的消息
+    :param db: 数据库会话
+    :param conversation_id: 对话ID
+    :param force: 为True时折叠全部新增消息（包括最近保留的原文）
+    :return: 包含总结、已总结消息数和是否更新的字典
+    """
+    db_conversation = get_conversation(db, conversation_id)
+    if not db_conversation:
+        raise AppApiException(404, "对话不存在")
+
+    pending = get_conversation_history(db, conversation_id, after_id=db_conversation.summary_message_id)
+    if not force:
+        if len(pending) < settings.SUMMARY_TRIGGER_MESSAGES:
+            pending = []
+        else:
+            pending = pending[:-settings.SUMMARY_KEEP_RECENT] if settings.SUMMARY_KEEP_RECENT else pending
+
+    result = {
+        "success": True,
+        "summary": db_conversation.summary,
+        "message_count": db_conversation.summary_message_count or 0,
+        "updated": False,
+        "error": None
+    }
+    if not pending:
+        return result
+
+    fold_result = await langchain_service.fold_summary(db_conversation.summary, pending)
+    if not fold_result["success"]:
+        result.update({"success": False, "error": fold_result["error"]})
+        return result
+
+    db_conversation.summary = fold_result["summary"]
+    db_conversation.summary_message_id = pending[-1]["id"]
+    db_conversation.summary_message_count = (db_conversation.summary_message_count or 0) + len(pending)
+    db.commit()
+    db.refresh(db_conversation)
+
+    result.update({
+        "summary": db_conversation.summary,
+        "message_count": db_conversation.summary_message_count,
+        "updated": True
+    })
+    return result
+
+
+def get_red_conversations(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """
     获取用户的红对话列表（多轮会话）
     :param db: 数据库会话
     :param user_id: 用户ID
     :param skip: 跳过记录数
     :param limit: 限制返回记录数
-    :return: 对话列表
+    :param cursor: 上一页返回的游标（传入时忽略 skip）
+    :return: 对话列表（摘要投影）
     """
-    return db.query(AIConversation).filter(
+    query = db.query(*CONVERSATION_LIST_COLUMNS).filter(
         AIConversation.user_id == user_id,
         AIConversation.is_active == True
-    ).order_by(AIConversation.updated_at.desc()).offset(skip).limit(limit).all()
+    )
+    if cursor:
+        query = query.filter(RED_CONVERSATION_KEYSET.after(cursor))
+    else:
+        query = query.offset(skip)
+    rows = query.order_by(*RED_CONVERSATION_KEYSET.order_by()).limit(limit).all()
+    return [ConversationListItem.model_validate(row) for row in rows]
 
 
 def generate_ai_response_with_langchain(
     conversation_history: List[Dict[str, Any]],
-    user_message: str
+    user_message: str,
+    summary: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    使用LangChain生成AI回复（基于对话历史）
+    使用LangChain生成AI回复（基于总结和对话历史）
     
     :param conversation_history: 对话历史
     :param user_message: 用户消息
+    :param summary: 早期对话的滚动总结
     :return: 包含AI回复和元数据的字典
     """
     return langchain_service.generate_response(
         user_message=user_message,
-        conversation_history=conversation_history
+        conversation_history=conversation_history,
+        summary=summary
     )
 
 
-async def summarize_conversation_with_langchain(
-    conversation_history: List[Dict[str, Any]]
-) -> str:
+def build_conversation_context(
+    conversation_history: List[Dict[str, Any]],
+    user_message: str,
+    summary: Optional[str] = None,
+    knowledge: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    按token预算构建对话上下文窗口
+    
+    :param conversation_history: 对话历史
+    :param user_message: 用户消息
+    :param summary: 早期对话的滚动总结
+    :param knowledge: 从用户文档检索到的参考资料
+    :return: 上下文窗口（summary/knowledge/messages/message_count/token_count/max_tokens）
+    """
+    return langchain_service.build_context(
+        user_message=user_message,
+        conversation_history=conversation_history,
+        summary=summary,
+        knowledge=knowledge
+    )
+
+
+def stream_ai_response_with_langchain(
+    conversation_history: List[Dict[str, Any]],
+    user_message: str,
+    context_window: Optional[Dict[str, Any]] = None,
+    usage: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
     """
-    使用LangChain总结对话历史
+    使用LangChain流式生成AI回复（基于对话历史）
     
     :param conversation_history: 对话历史
-    :return: 对话总结
+    :param user_message: 用户消息
+    :param context_window: 已构建的上下文窗口
+    :param usage: 可选字典，流结束后写入模型返回的token用量
+    :return: 回复文本增量的异步迭代器
     """
-    return await langchain_service.summarize_conversation(conversation_history)
+    return langchain_service.stream_response(
+        user_message=user_message,
+        conversation_history=conversation_history,
+        context_window=context_window,
+        usage=usage
+    )
 
 
 async def get_conversation_context(
@@ -308,3 +542,473 @@ def is_langchain_initialized() -> bool:
     :return: 是否已初始化
     """
     return langchain_service.is_initialized()
+
+
+# ---------------- AsyncSession 版本（供 async 路由使用） ----------------
+
+async def get_conversation_async(db: AsyncSession, conversation_id: str):
+    """
+    获取指定对话
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :return: 对话对象或None
+    """
+    result = await db.execute(select(AIConversation).where(AIConversation.id == conversation_id))
+    return result.scalars().first()
+
+
+async def get_conversation_list_item_async(db: AsyncSession, conversation_id: str) -> Optional[ConversationListItem]:
+    """
+    获取单个对话的列表投影（追加消息后回传给前端刷新侧边栏）
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :return: 对话列表项或None
+    """
+    result = await db.execute(select(*CONVERSATION_LIST_COLUMNS).where(AIConversation.id == conversation_id))
+    row = result.first()
+    return ConversationListItem.model_validate(row) if row else None
+
+
+async def get_conversations_async(
+    db: AsyncSession,
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """
+    获取用户的对话列表
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param skip: 跳过记录数
+    :param limit: 限制返回记录数
+    :param cursor: 上一页返回的游标（传入时忽略 skip）
+    :return: 对话列表（摘要投影）
+    """
+    stmt = select(*CONVERSATION_LIST_COLUMNS).where(
+        AIConversation.user_id == user_id,
+        AIConversation.is_active == True
+    )
+    if cursor:
+        stmt = stmt.where(CONVERSATION_KEYSET.after(cursor))
+    else:
+        stmt = stmt.offset(skip)
+    result = await db.execute(stmt.order_by(*CONVERSATION_KEYSET.order_by()).limit(limit))
+    return [ConversationListItem.model_validate(row) for row in result.all()]
+
+
+async def get_red_conversations_async(
+    db: AsyncSession,
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """
+    获取用户的红对话列表（多轮会话）
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param skip: 跳过记录数
+    :param limit: 限制返回记录数
+    :param cursor: 上一页返回的游标（传入时忽略 skip）
+    :return: 对话列表（摘要投影）
+    """
+    stmt = select(*CONVERSATION_LIST_COLUMNS).where(
+        AIConversation.user_id == user_id,
+        AIConversation.is_active == True
+    )
+    if cursor:
+        stmt = stmt.where(RED_CONVERSATION_KEYSET.after(cursor))
+    else:
+        stmt = stmt.offset(skip)
+    result = await db.execute(stmt.order_by(*RED_CONVERSATION_KEYSET.order_by()).limit(limit))
+    return [ConversationListItem.model_validate(row) for row in result.all()]
+
+
+async def create_conversation_async(db: AsyncSession, user_id: str, conversation_create: ConversationCreate):
+    """
+    创建新对话
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param conversation_create: 对话创建数据
+    :return: 创建的对话对象
+    """
+    db_conversation = AIConversation(
+        id=str(uuid.uuid1()),
+        user_id=user_id,
+        title=conversation_create.title,
+        model=conversation_create.model,
+        content=[],
+        total_tokens=0,
+        is_active=True
+    )
+    db.add(db_conversation)
+    await db.commit()
+    await db.refresh(db_conversation)
+    return db_conversation
+
+
+async def _get_owned_conversation_async(db: AsyncSession, conversation_id: str, user_id: str, action: str):
+    """
+    获取对话并校验归属
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param action: 用于错误提示的操作描述
+    :return: 对话对象
+    """
+    db_conversation = await get_conversation_async(db, conversation_id)
+    if not db_conversation:
+        raise AppApiException(404, "对话不存在")
+    
+    if db_conversation.user_id != user_id:
+        raise AppApiException(403, f"没有权限{action}")
+    return db_conversation
+
+
+async def delete_conversation_async(db: AsyncSession, conversation_id: str, user_id: str):
+    """
+    删除对话
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :return: 删除的对话对象
+    """
+    db_conversation = await _get_owned_conversation_async(db, conversation_id, user_id, "删除其他用户的对话")
+    
+    db_conversation.is_active = False
+    await db.commit()
+    await db.refresh(db_conversation)
+    return db_conversation
+
+
+async def update_conversation_async(db: AsyncSession, conversation_id: str, user_id: str, conversation_update):
+    """
+    更新对话
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param conversation_update: 对话更新数据（ConversationUpdate 或 dict）
+    :return: 更新后的对话对象
+    """
+    db_conversation = await _get_owned_conversation_async(db, conversation_id, user_id, "更新其他用户的对话")
+    
+    if not isinstance(conversation_update, dict):
+        conversation_update = conversation_update.model_dump(exclude_unset=True)
+    
+    if 'title' in conversation_update:
+        db_conversation.title = conversation_update['title']
+    
+    if 'is_pinned' in conversation_update:
+        db_conversation.is_pinned = conversation_update['is_pinned']
+    
+    await db.commit()
+    await db.refresh(db_conversation)
+    return db_conversation
+
+
+async def _append_message_async(db: AsyncSession, conversation_id: str, message: dict) -> ConversationMessage:
+    """
+    追加一条消息（单行插入，不重写历史消息）
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param message: 消息字典，role/content/timestamp 之外的字段存入 extra
+    :return: 消息对象
+    """
+    extra = {k: v for k, v in message.items() if k not in ("id", "role", "content", "timestamp")}
+    db_message = ConversationMessage(
+        conversation_id=conversation_id,
+        role=message.get("role", "user"),
+        content=message.get("content", ""),
+        timestamp=message.get("timestamp") or datetime.utcnow().isoformat(),
+        extra=extra
+    )
+    db.add(db_message)
+    await db.execute(
+        update(AIConversation)
+        .where(AIConversation.id == conversation_id)
+        .values(_message_list_fields(db_message.content))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+
+async def get_conversation_history_async(
+    db: AsyncSession,
+    conversation_id: str,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    按消息ID做键集分页读取对话历史
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param before_id: 只返回ID小于该值的消息（游标）
+    :param limit: 返回最近的消息条数，为空时返回全部
+    :param after_id: 只返回ID大于该值的消息
+    :return: 按时间正序排列的消息列表
+    """
+    stmt = select(ConversationMessage).where(ConversationMessage.conversation_id == conversation_id)
+    if before_id is not None:
+        stmt = stmt.where(ConversationMessage.id < before_id)
+    if after_id is not None:
+        stmt = stmt.where(ConversationMessage.id > after_id)
+
+    if limit is None:
+        rows = (await db.execute(stmt.order_by(ConversationMessage.id.asc()))).scalars().all()
+    else:
+        rows = (await db.execute(stmt.order_by(ConversationMessage.id.desc()).limit(limit))).scalars().all()
+        rows = list(reversed(rows))
+
+    return [_message_to_dict(row) for row in rows]
+
+
+async def add_message_async(db: AsyncSession, conversation_id: str, user_id: str, message_create: MessageCreate):
+    """
+    向对话添加消息
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param message_create: 消息创建数据
+    :return: 更新后的对话对象
+    """
+    db_conversation = await _get_owned_conversation_async(db, conversation_id, user_id, "向其他用户的对话添加消息")
+    
+    message = {
+        "role": message_create.role,
+        "content": message_create.content,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    
+    await _append_message_async(db, conversation_id, message)
+    await db.refresh(db_conversation)
+    return db_conversation
+
+
+async def get_messages_async(
+    db: AsyncSession,
+    conversation_id: str,
+    user_id: str,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """
+    获取对话的消息列表
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param before_id: 游标，只返回ID小于该值的消息
+    :param limit: 返回最近的消息条数，为空时返回全部
+    :return: 消息列表
+    """
+    await _get_owned_conversation_async(db, conversation_id, user_id, "查看其他用户的对话消息")
+    return await get_conversation_history_async(db, conversation_id, before_id=before_id, limit=limit)
+
+
+async def add_stream_message_async(db: AsyncSession, conversation_id: str, user_id: str, message_create: dict):
+    """
+    向对话添加流式消息（立即保存到数据库）
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param message_create: 消息创建数据
+    :return: 消息对象或错误信息
+    """
+    db_conversation = await get_conversation_async(db, conversation_id)
+    if not db_conversation:
+        return {
+            "type": "error",
+            "data": {
+                "code": 404,
+                "message": "对话不存在"
+            }
+        }
+    
+    if db_conversation.user_id != user_id:
+        return {
+            "type": "error",
+            "data": {
+                "code": 403,
+                "message": "没有权限向其他用户的对话添加消息"
+            }
+        }
+    
+    message = {
+        "role": message_create.get("role", "user"),
+        "content": message_create.get("content", ""),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    if message_create.get("aborted"):
+        message["aborted"] = True
+    
+    db_message = await _append_message_async(db, conversation_id, message)
+    
+    return _message_to_dict(db_message)
+
+
+# 正在保存的流式AI回复（保存任务不随请求取消，并保持对任务的引用）
+_reply_tasks: Set[asyncio.Task] = set()
+
+
+async def _save_assistant_reply(conversation_id: str, user_id: str, content: str, aborted: bool):
+    async with AsyncSessionLocal() as db:
+        message_create = {"role": "assistant", "content": content}
+        if aborted:
+            message_create["aborted"] = True
+        return await add_stream_message_async(db=db, conversation_id=conversation_id, user_id=user_id, message_create=message_create)
+
+
+def save_assistant_reply_task(conversation_id: str, user_id: str, content: str, aborted: bool = False) -> asyncio.Task:
+    """
+    在独立的数据库会话中保存流式AI回复，客户端断开导致请求被取消时保存仍会完成
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param content: 回复内容（中断时为已生成的部分）
+    :param aborted: 回复是否因出错或客户端断开而中断
+    :return: 保存任务，结果为消息对象或错误信息
+    """
+    task = asyncio.create_task(_save_assistant_reply(conversation_id, user_id, content, aborted))
+    _reply_tasks.add(task)
+    task.add_done_callback(_reply_tasks.discard)
+    return task
+
+
+async def save_stream_message_async(db: AsyncSession, conversation_id: str, user_id: str, message: dict):
+    """
+    保存流式消息到数据库
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param user_id: 用户ID
+    :param message: 消息对象
+    :return: 更新后的对话对象
+    """
+    db_conversation = await _get_owned_conversation_async(db, conversation_id, user_id, "向其他用户的对话添加消息")
+    
+    await _append_message_async(db, conversation_id, message)
+    await db.refresh(db_conversation)
+    return db_conversation
+
+
+async def get_summary_memory_async(
+    db: AsyncSession,
+    db_conversation: AIConversation,
+    before_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    获取对话的总结记忆：滚动总结 + 总结检查点之后的原文消息
+    :param db: 异步数据库会话
+    :param db_conversation: 对话对象
+    :param before_id: 只取ID小于该值的消息
+    :return: 包含 summary 和 messages 的字典
+    """
+    return {
+        "summary": db_conversation.summary,
+        "messages": await get_conversation_history_async(
+            db,
+            db_conversation.id,
+            before_id=before_id,
+            after_id=db_conversation.summary_message_id
+        )
+    }
+
+
+async def refresh_conversation_summary_async(db: AsyncSession, conversation_id: str, force: bool = False) -> Dict[str, Any]:
+    """
+    增量更新对话的滚动总结，只折叠检查点之后新增的消息
+    :param db: 异步数据库会话
+    :param conversation_id: 对话ID
+    :param force: 为True时折叠全部新增消息（包括最近保留的原文）
+    :return: 包含总结、已总结消息数和是否更新的字典
+    """
+    db_conversation = await get_conversation_async(db, conversation_id)
+    if not db_conversation:
+        raise AppApiException(404, "对话不存在")
+
+    pending = await get_conversation_history_async(db, conversation_id, after_id=db_conversation.summary_message_id)
+    if not force:
+        if len(pending) < settings.SUMMARY_TRIGGER_MESSAGES:
+            pending = []
+        else:
+            pending = pending[:-settings.SUMMARY_KEEP_RECENT] if settings.SUMMARY_KEEP_RECENT else pending
+
+    result = {
+        "success": True,
+        "summary": db_conversation.summary,
+        "message_count": db_conversation.summary_message_count or 0,
+        "updated": False,
+        "error": None
+    }
+    if not pending:
+        return result
+
+    fold_result = await langchain_service.fold_summary(db_conversation.summary, pending)
+    if not fold_result["success"]:
+        result.update({"success": False, "error": fold_result["error"]})
+        return result
+
+    db_conversation.summary = fold_result["summary"]
+    db_conversation.summary_message_id = pending[-1]["id"]
+    db_conversation.summary_message_count = (db_conversation.summary_message_count or 0) + len(pending)
+    await db.commit()
+    await db.refresh(db_conversation)
+
+    result.update({
+        "summary": db_conversation.summary,
+        "message_count": db_conversation.summary_message_count,
+        "updated": True
+    })
+    return result
+
+
+async def get_conversation_summary_async(db: AsyncSession, db_conversation: AIConversation) -> Dict[str, Any]:
+    """
+    获取对话总结（不修改对话）
+    已有滚动总结时直接返回；还没有折叠过（新对话、短对话）时按需总结全部消息，结果不写库，
+    滚动总结仍由回复完成后的后台任务增量折叠
+    :param db: 异步数据库会话
+    :param db_conversation: 对话对象
+    :return: 包含总结、对话消息数和已折叠消息数的字典
+    """
+    summary = db_conversation.summary
+    if not summary:
+        messages = await get_conversation_history_async(db, db_conversation.id)
+        if messages:
+            fold_result = await langchain_service.fold_summary(None, messages)
+            if not fold_result["success"]:
+                raise AppApiException(500, f"对话总结失败: {fold_result['error']}")
+            summary = fold_result["summary"]
+
+    return {
+        "summary": summary,
+        "message_count": db_conversation.message_count or 0,
+        "summarized_message_count": db_conversation.summary_message_count or 0
+    }
+
+
+# 正在后台折叠总结的对话（同一对话同时只有一个折叠任务，并保持对任务的引用）
+_summary_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _refresh_summary_in_background(conversation_id: str) -> None:
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await refresh_conversation_summary_async(db, conversation_id)
+            if not result["success"]:
+                logger.warning(f"对话总结失败: {conversation_id}，{result['error']}")
+        except Exception as e:
+            logger.warning(f"对话总结失败: {conversation_id}，{str(e)}")
+
+
+def schedule_summary_refresh(conversation_id: str) -> None:
+    """
+    在后台检查并折叠滚动总结（使用独立的数据库会话，不占用请求的响应和连接）
+    :param conversation_id: 对话ID
+    """
+    if conversation_id in _summary_tasks:
+        return
+    task = asyncio.create_task(_refresh_summary_in_background(conversation_id))
+    _summary_tasks[conversation_id] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(conversation_id, None))
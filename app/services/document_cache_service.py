@@ -0,0 +1,169 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: document_cache_service
+    @date: 2026/2/18
+    @desc: 文档内容去重缓存（按文件内容哈希复用MinIO对象和解析分段结果）
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCache:
+    """
+    文档内容寻址缓存
+
+    以文件字节的 blake3 哈希为键（未安装 blake3 时退回 blake2b）：
+    - object:<hash> -> 已上传的MinIO对象名，重复上传时不再写MinIO
+    - chunks:<hash>:<文件类型>:<分段参数>:<版本> -> 分段结果，重复上传时不再解析
+
+    底层使用 diskcache，按 DOCUMENT_CACHE_SIZE_LIMIT_MB 做LRU淘汰，多进程共享，
+    命中/未命中计数也由 diskcache 持久化统计。
+    """
+
+    def __init__(self, directory: Optional[str] = None, size_limit_mb: Optional[int] = None):
+        self.directory = directory or settings.DOCUMENT_CACHE_DIR
+        self.size_limit = (size_limit_mb or settings.DOCUMENT_CACHE_SIZE_LIMIT_MB) * 1024 * 1024
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        """首次使用时打开缓存目录"""
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    import diskcache
+                    cache = diskcache.Cache(
+                        self.directory,
+                        size_limit=self.size_limit,
+                        eviction_policy='least-recently-used'
+                    )
+                    cache.stats(enable=True)
+                    self._cache = cache
+        return self._cache
+
+    @staticmethod
+    def compute_hash(content: bytes) -> str:
+        """
+        计算文件内容哈希（跨用户复用结果，必须使用抗碰撞的哈希）
+        :param content: 文件字节数据
+        :return: 十六进制哈希
+        """
+        try:
+            import blake3
+            return blake3.blake3(content).hexdigest()
+        except ImportError:
+            return hashlib.blake2b(content, digest_size=32).hexdigest()
+
+    @staticmethod
+    def _chunks_key(
+        content_hash: str,
+        file_type: str,
+        splitter_type: str,
+        chunk_size: int,
+        chunk_overlap: int
+    ) -> str:
+        return (
+            f"chunks:{content_hash}:{file_type.lower()}:{splitter_type}:"
+            f"{chunk_size}:{chunk_overlap}:{settings.DOCUMENT_CACHE_VERSION}"
+        )
+
+    def get_object(self, content_hash: str) -> Optional[str]:
+        """
+        获取相同内容已上传的MinIO对象名
+        :param content_hash: 内容哈希
+        :return: 对象名，未命中返回None
+        """
+        try:
+            return self.cache.get(f"object:{content_hash}")
+        except Exception as e:
+            logger.warning(f"读取文档缓存失败: {str(e)}")
+            return None
+
+    def set_object(self, content_hash: str, object_name: str):
+        """
+        记录内容对应的MinIO对象名
+        :param content_hash: 内容哈希
+        :param object_name: MinIO对象名
+        """
+        try:
+            self.cache.set(f"object:{content_hash}", object_name)
+        except Exception as e:
+            logger.warning(f"写入文档缓存失败: {str(e)}")
+
+    def get_chunks(
+        self,
+        content_hash: str,
+        file_type: str,
+        splitter_type: str,
+        chunk_size: int,
+        chunk_overlap: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取相同内容、相同分段参数下的分段结果
+        :return: {'chunks': [...], 'total_characters': int, 'metadata': {...}}，未命中返回None
+        """
+        try:
+            return self.cache.get(self._chunks_key(content_hash, file_type, splitter_type, chunk_size, chunk_overlap))
+        except Exception as e:
+            logger.warning(f"读取文档缓存失败: {str(e)}")
+            return None
+
+    def set_chunks(
+        self,
+        content_hash: str,
+        file_type: str,
+        splitter_type: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunks: List[Dict[str, Any]],
+        total_characters: int,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        缓存分段结果
+        :param chunks: 分段列表，每项包含 content 和 metadata
+        :param total_characters: 文档总字符数
+        :param metadata: 文档元数据
+        """
+        try:
+            self.cache.set(
+                self._chunks_key(content_hash, file_type, splitter_type, chunk_size, chunk_overlap),
+                {
+                    'chunks': chunks,
+                    'total_characters': total_characters,
+                    'metadata': metadata or {}
+                }
+            )
+        except Exception as e:
+            logger.warning(f"写入文档缓存失败: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        cache = self.cache
+        hits, misses = cache.stats()
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'entries': len(cache),
+            'size_bytes': cache.volume(),
+            'size_limit_bytes': self.size_limit
+        }
+
+    def clear(self):
+        """清空缓存"""
+        self.cache.clear()
+
+
+# 全局文档缓存实例
+document_cache = DocumentCache()
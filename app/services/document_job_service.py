@@ -0,0 +1,364 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: document_job_service
+    @date: 2026/2/14
+    @desc: 文档后台处理任务队列（基于数据库任务表 + 工作线程）
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Optional, List
+
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.base import SessionLocal
+from app.models.document import Document
+from app.models.document_job import DocumentJob
+from app.services.document_service import DocumentService
+from app.services.minio_service import minio_service
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentJobQueue:
+    """
+    文档处理任务队列
+
+    任务持久化在 document_jobs 表中，工作线程用 FOR UPDATE SKIP LOCKED 抢占任务，
+    多个进程/实例同时运行时不会重复处理同一任务；失败的任务按退避时间重新排队，
+    超过最大次数后标记为 failed。
+
+    执行中的任务持有租约（lease_until），由心跳线程定期续约；工作线程定期把租约过期
+    （执行进程崩溃或被重新部署）的 running 任务重新排队，长时间运行但仍在续约的任务不受影响。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.workers = workers or settings.DOCUMENT_JOB_WORKERS
+        self.max_attempts = max_attempts or settings.DOCUMENT_JOB_MAX_ATTEMPTS
+        self.retry_delay = retry_delay if retry_delay is not None else settings.DOCUMENT_JOB_RETRY_DELAY_SECONDS
+        self.poll_interval = poll_interval or settings.DOCUMENT_JOB_POLL_INTERVAL
+        self.lease_seconds = settings.DOCUMENT_JOB_LEASE_SECONDS
+        self.heartbeat_interval = settings.DOCUMENT_JOB_HEARTBEAT_SECONDS
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._reap_lock = threading.Lock()
+        self._next_reap_at = 0.0
+
+    def _new_job(self, document_id: str) -> DocumentJob:
+        return DocumentJob(
+            id=str(uuid.uuid4()),
+            document_id=document_id,
+            status="queued",
+            attempts=0,
+            max_attempts=self.max_attempts
+        )
+
+    def enqueue(self, db, document_id: str) -> DocumentJob:
+        """
+        为文档创建处理任务
+        :param db: 同步数据库会话
+        :param document_id: 文档ID
+        :return: 任务记录
+        """
+        job = self._new_job(document_id)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self.notify()
+        return job
+
+    async def enqueue_async(self, db: AsyncSession, document_id: str) -> DocumentJob:
+        """
+        为文档创建处理任务（AsyncSession 版本）
+        :param db: 异步数据库会话
+        :param document_id: 文档ID
+        :return: 任务记录
+        """
+        job = self._new_job(document_id)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        self.notify()
+        return job
+
+    def notify(self):
+        """唤醒空闲的工作线程（同进程内入队时无需等待轮询间隔）"""
+        self._wakeup.set()
+
+    def start(self):
+        """启动工作线程"""
+        if self._threads:
+            return
+        self._stop_event.clear()
+        self._requeue_expired_jobs()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"document-job-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"文档处理任务队列已启动，工作线程数: {self.workers}")
+
+    def stop(self, timeout: float = 10.0):
+        """停止工作线程（正在处理的任务会在完成后退出）"""
+        self._stop_event.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        logger.info("文档处理任务队列已停止")
+
+    def _lease_expiry(self):
+        return func.now() + timedelta(seconds=self.lease_seconds)
+
+    def _requeue_expired_jobs(self):
+        """将租约过期的 running 任务重新排队；重试次数已用完的标记为失败"""
+        db = SessionLocal()
+        try:
+            jobs = db.query(DocumentJob).filter(
+                and_(
+                    DocumentJob.status == "running",
+                    or_(DocumentJob.lease_until.is_(None), DocumentJob.lease_until < func.now())
+                )
+            ).with_for_update(skip_locked=True).all()
+
+            for job in jobs:
+                job.lease_until = None
+                if job.attempts >= job.max_attempts:
+                    job.status = "failed"
+                    job.error_message = "任务执行中断（租约过期）"
+                    job.finished_at = func.now()
+                    db.query(Document).filter(Document.id == job.document_id).update(
+                        {Document.status: "failed", Document.error_message: job.error_message},
+                        synchronize_session=False
+                    )
+                else:
+                    job.status = "queued"
+                    job.run_after = func.now()
+            db.commit()
+            if jobs:
+                logger.warning(f"租约过期的文档处理任务: {len(jobs)} 个，已重新排队或标记失败")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"回收租约过期的任务失败: {str(e)}")
+        finally:
+            db.close()
+
+    def _maybe_requeue_expired_jobs(self):
+        """各工作线程共用检查时间，每个心跳间隔最多检查一次"""
+        now = time.monotonic()
+        with self._reap_lock:
+            if now < self._next_reap_at:
+                return
+            self._next_reap_at = now + self.heartbeat_interval
+        self._requeue_expired_jobs()
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        """任务执行期间定期续约，直到 stop 被设置"""
+        while not stop.wait(self.heartbeat_interval):
+            db = SessionLocal()
+            try:
+                db.query(DocumentJob).filter(
+                    and_(DocumentJob.id == job_id, DocumentJob.status == "running")
+                ).update({DocumentJob.lease_until: self._lease_expiry()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"文档处理任务续约失败: {job_id}，{str(e)}")
+            finally:
+                db.close()
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            self._maybe_requeue_expired_jobs()
+            try:
+                job_id = self._claim_job()
+            except Exception as e:
+                logger.error(f"抢占文档处理任务失败: {str(e)}")
+                job_id = None
+
+            if job_id:
+                self._run_job(job_id)
+                continue
+
+            # 无任务时等待入队通知或轮询超时
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_job(self) -> Optional[str]:
+        """抢占一个到期的排队任务，返回任务ID"""
+        db = SessionLocal()
+        try:
+            job = db.query(DocumentJob).filter(
+                and_(
+                    DocumentJob.status == "queued",
+                    or_(DocumentJob.run_after.is_(None), DocumentJob.run_after <= func.now())
+                )
+            ).order_by(DocumentJob.created_at).with_for_update(skip_locked=True).first()
+
+            if not job:
+                db.rollback()
+                return None
+
+            job_id = job.id
+            job.status = "running"
+            job.attempts = (job.attempts or 0) + 1
+            job.started_at = func.now()
+            job.lease_until = self._lease_expiry()
+            db.commit()
+            return job_id
+        finally:
+            db.close()
+
+    def _run_job(self, job_id: str):
+        """执行任务，执行期间由心跳线程续约"""
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job_id, stop),
+            name=f"document-job-heartbeat-{job_id[:8]}",
+            daemon=True
+        )
+        heartbeat.start()
+        try:
+            self._execute_job(job_id)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def _execute_job(self, job_id: str):
+        """从MinIO读取原文件，解析、分段、存储；文档状态的变更都在这里完成"""
+        db = SessionLocal()
+        try:
+            job = db.query(DocumentJob).filter(DocumentJob.id == job_id).first()
+            if not job:
+                return
+            document = db.query(Document).filter(Document.id == job.document_id).first()
+            if not document:
+                job.status = "failed"
+                job.error_message = "文档不存在"
+                job.finished_at = func.now()
+                job.lease_until = None
+                db.commit()
+                return
+
+            document_service = DocumentService(db)
+            document_service.update_document_status(document.id, "processing", progress=0)
+
+            try:
+                # 相同内容已处理过时直接复用分段结果，无需下载和解析
+                result = document_service.process_document_from_cache(document.id)
+                if result is None:
+                    file_content = minio_service.download_file(document.file_path)
+                    result = document_service.process_document(document.id, file_content)
+            except Exception as e:
+                db.rollback()
+                result = {"success": False, "error": str(e)}
+
+            if result.get("success"):
+                # 段落在处理时尚未提交，与文档状态一起提交
+                document_service.update_document_status(
+                    document.id,
+                    "completed",
+                    total_paragraphs=result.get("total_paragraphs"),
+                    error_message="",
+                    progress=100
+                )
+                if settings.EMBEDDING_ENABLED:
+                    self._index_vectors(document_service, document.id)
+                job.status = "completed"
+                job.error_message = None
+                job.finished_at = func.now()
+                job.lease_until = None
+                db.commit()
+                logger.info(
+                    f"文档处理完成: {document.id}，段落数: {result.get('total_paragraphs')}"
+                    f"{'（命中去重缓存）' if result.get('from_cache') else ''}"
+                )
+                return
+
+            error = result.get("error") or "文档处理失败"
+            if job.attempts < job.max_attempts:
+                # 线性退避后重新排队，文档保持 processing 状态
+                delay = self.retry_delay * job.attempts
+                job.status = "queued"
+                job.error_message = error
+                job.run_after = func.now() + timedelta(seconds=delay)
+                job.lease_until = None
+                db.commit()
+                document_service.update_document_status(document.id, "processing", error_message=error, progress=0)
+                logger.warning(
+                    f"文档处理失败，{delay}秒后重试({job.attempts}/{job.max_attempts}): {document.id}，{error}"
+                )
+            else:
+                job.status = "failed"
+                job.error_message = error
+                job.finished_at = func.now()
+                job.lease_until = None
+                db.commit()
+                document_service.update_document_status(document.id, "failed", error_message=error)
+                logger.error(f"文档处理最终失败: {document.id}，{error}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"执行文档处理任务失败: {job_id}，{str(e)}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _index_vectors(document_service: DocumentService, document_id: str):
+        """为处理完成的文档生成段落向量（失败只影响语义检索，不影响文档状态）"""
+        try:
+            indexed = document_service.index_document_vectors(document_id)
+            logger.info(f"文档向量索引完成: {document_id}，向量数: {indexed}")
+        except Exception as e:
+            document_service.db.rollback()
+            logger.error(f"文档向量索引失败: {document_id}，{str(e)}")
+
+
+def get_latest_job(db, document_id: str) -> Optional[DocumentJob]:
+    """
+    获取文档最近一次处理任务
+    :param db: 同步数据库会话
+    :param document_id: 文档ID
+    :return: 任务记录
+    """
+    return db.query(DocumentJob).filter(
+        DocumentJob.document_id == document_id
+    ).order_by(DocumentJob.created_at.desc()).first()
+
+
+# ---------------- AsyncSession 版本（供 async 路由使用） ----------------
+
+async def get_latest_job_async(db: AsyncSession, document_id: str) -> Optional[DocumentJob]:
+    """
+    获取文档最近一次处理任务（AsyncSession 版本）
+    :param db: 异步数据库会话
+    :param document_id: 文档ID
+    :return: 任务记录
+    """
+    result = await db.execute(
+        select(DocumentJob)
+        .where(DocumentJob.document_id == document_id)
+        .order_by(DocumentJob.created_at.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+# 全局任务队列实例
+document_job_queue = DocumentJobQueue()
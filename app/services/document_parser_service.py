@@ -6,7 +6,7 @@
     @desc: 文档解析服务
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator
 from pathlib import Path
 import os
 
@@ -17,10 +17,46 @@ from .document_parsers.pdf_parser import PDFParser
 from .document_parsers.unstructured_parser import UnstructuredParser
 from .document_parsers.text_splitter import (
     RecursiveCharacterSplitter,
+    TokenTextSplitter,
     MarkdownHeaderSplitter,
     CodeSyntaxSplitter,
     BaseTextSplitter
 )
+from .document_parsers.parser_executor import ParserExecutor
+from .document_parsers.image_sink import ImageSink
+from .document_parsers.ocr_pipeline import OCRPipeline
+from config import settings
+
+
+# 文件类型 -> 解析器名称
+TYPE_PARSER_MAP = {
+    'pdf': 'pdf',
+    'doc': 'word',
+    'docx': 'word',
+    'xls': 'excel',
+    'xlsx': 'excel',
+    'txt': 'unstructured',
+    'md': 'unstructured'
+}
+
+
+def create_parsers() -> Dict[str, BaseDocumentParser]:
+    """创建解析器实例（主进程和每个解析进程各调用一次）"""
+    return {
+        'word': WordParser(),
+        'excel': ExcelParser(),
+        'pdf': PDFParser(
+            pages_per_shard=settings.PDF_PAGES_PER_SHARD,
+            ocr_pipeline=OCRPipeline(
+                dpi=settings.OCR_DPI,
+                pages_per_window=settings.OCR_PAGES_PER_WINDOW,
+                lang=settings.OCR_LANG,
+                cpu_threads=settings.OCR_CPU_THREADS
+            ),
+            warmup_ocr=settings.OCR_WARMUP
+        ),
+        'unstructured': UnstructuredParser()
+    }
 
 
 class DocumentParserService:
@@ -28,15 +64,22 @@ class DocumentParserService:
     
     def __init__(self):
         """初始化文档解析服务"""
-        self.parsers: Dict[str, BaseDocumentParser] = {
-            'word': WordParser(),
-            'excel': ExcelParser(),
-            'pdf': PDFParser(),
-            'unstructured': UnstructuredParser()
-        }
+        self.parsers: Dict[str, BaseDocumentParser] = create_parsers()
+        
+        # CPU密集的字节解析交给进程池执行
+        self.executor: Optional[ParserExecutor] = None
+        if settings.PARSER_USE_PROCESS_POOL:
+            self.executor = ParserExecutor(
+                parser_factory=create_parsers,
+                max_workers=settings.PARSER_MAX_WORKERS,
+                timeout=settings.PARSER_TIMEOUT_SECONDS or None,
+                memory_limit_mb=settings.PARSER_MEMORY_LIMIT_MB,
+                start_method=settings.PARSER_MP_START_METHOD or None
+            )
         
         self.splitters: Dict[str, BaseTextSplitter] = {
             'recursive_char': RecursiveCharacterSplitter(),
+            'token': TokenTextSplitter(),
             'markdown_header': MarkdownHeaderSplitter(),
             'code_syntax': CodeSyntaxSplitter()
         }
@@ -97,19 +140,25 @@ class DocumentParserService:
             'chunks': []
         }
     
-    def parse_document_from_bytes(self, file_content: bytes, file_type: str) -> Dict[str, Any]:
+    def parse_document_from_bytes(
+        self,
+        file_content: bytes,
+        file_type: str,
+        image_sink: Optional[ImageSink] = None
+    ) -> Dict[str, Any]:
         """从字节数据解析文档
         
         Args:
             file_content: 文件字节数据
             file_type: 文件类型
+            image_sink: 图片输出，传入时把图片写出，结果中的 images 只包含引用
             
         Returns:
-            包含解析结果、分段结果的字典
+            包含解析结果、分段结果、图片引用的字典
         """
-        parser = self.get_parser_by_type(file_type)
+        parser_name = TYPE_PARSER_MAP.get(file_type.lower())
         
-        if not parser:
+        if not parser_name or parser_name not in self.parsers:
             return {
                 'success': False,
                 'error': f'不支持的文件类型: {file_type}',
@@ -118,7 +167,15 @@ class DocumentParserService:
                 'chunks': []
             }
         
-        parse_result = parser.parse_from_bytes(file_content, file_type)
+        if self.executor is not None and parser_name == 'pdf':
+            # 大PDF在当前进程打开后按页段分片，分发到多个解析进程并行提取
+            parse_result = self.parsers['pdf'].parse_from_bytes(
+                file_content, file_type, image_sink=image_sink, executor=self.executor
+            )
+        elif self.executor is not None:
+            parse_result = self.executor.parse_from_bytes(parser_name, file_content, file_type, image_sink=image_sink)
+        else:
+            parse_result = self.parsers[parser_name].parse_from_bytes(file_content, file_type, image_sink=image_sink)
         
         if not parse_result.get('success', False):
             return {
@@ -134,6 +191,7 @@ class DocumentParserService:
             'error': None,
             'content': parse_result.get('content', ''),
             'metadata': parse_result.get('metadata', {}),
+            'images': parse_result.get('images', []),
             'chunks': []
         }
     
@@ -146,17 +204,7 @@ class DocumentParserService:
         Returns:
             文档解析器实例，如果不支持则返回None
         """
-        type_parser_map = {
-            'pdf': 'pdf',
-            'doc': 'word',
-            'docx': 'word',
-            'xls': 'excel',
-            'xlsx': 'excel',
-            'txt': 'unstructured',
-            'md': 'unstructured'
-        }
-        
-        parser_name = type_parser_map.get(file_type.lower())
+        parser_name = TYPE_PARSER_MAP.get(file_type.lower())
         if parser_name:
             return self.parsers.get(parser_name)
         
@@ -175,9 +223,9 @@ class DocumentParserService:
         Args:
             content: 文档内容
             metadata: 文档元数据
-            split_method: 分段方法（recursive_char/markdown_header/code_syntax）
-            chunk_size: 每段最大字符数
-            chunk_overlap: 段落重叠字符数
+            split_method: 分段方法（recursive_char/token/markdown_header/code_syntax）
+            chunk_size: 每段最大字符数（token 分段时为token数）
+            chunk_overlap: 段落重叠字符数（token 分段时为token数）
             
         Returns:
             分段后的文本列表
@@ -187,7 +235,94 @@ class DocumentParserService:
         if not splitter:
             return []
         
-        return splitter.split_text(content, metadata)
+        return splitter.with_sizes(chunk_size, chunk_overlap).split_text(content, metadata)
+    
+    def stream_split_document(
+        self,
+        file_content: bytes,
+        file_type: str,
+        split_method: str = 'recursive_char',
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        metadata: Optional[Dict[str, Any]] = None,
+        image_sink: Optional[ImageSink] = None
+    ) -> Optional[Iterator[Dict[str, Any]]]:
+        """流式解析并分段：逐页提取、直接送入分段器、逐块产出（目前支持PDF）
+        
+        Args:
+            file_content: 文件字节数据
+            file_type: 文件类型
+            split_method: 分段方法
+            chunk_size: 每段最大字符数
+            chunk_overlap: 段落重叠字符数
+            metadata: 可选字典，迭代过程中 page_count/pages_done 为已解析页数，
+                迭代结束后包含文档元数据（页数、字符数、图片数等）
+            image_sink: 图片输出，传入时把图片写出，metadata['images'] 为图片引用列表
+            
+        Returns:
+            分段结果迭代器；文件类型或分段方法不支持流式处理时返回None
+        """
+        if TYPE_PARSER_MAP.get(file_type.lower()) != 'pdf':
+            return None
+        
+        splitter = self.splitters.get(split_method)
+        if not splitter:
+            return None
+        
+        return self._stream_pdf_chunks(
+            file_content, splitter.with_sizes(chunk_size, chunk_overlap), metadata if metadata is not None else {}, image_sink
+        )
+    
+    def _stream_pdf_chunks(
+        self,
+        file_content: bytes,
+        splitter: BaseTextSplitter,
+        metadata: Dict[str, Any],
+        image_sink: Optional[ImageSink] = None
+    ) -> Iterator[Dict[str, Any]]:
+        parser = self.parsers['pdf']
+        # 文档级元数据在第一页产出前填好，作为每个分段的公共元数据
+        doc_metadata: Dict[str, Any] = {}
+        totals = {'char_count': 0, 'image_count': 0}
+        ocr_timings = []
+        image_refs = []
+        
+        def page_texts():
+            first = True
+            for page in parser.iter_pages_from_bytes(
+                file_content, executor=self.executor, stats=doc_metadata, image_sink=image_sink
+            ):
+                totals['image_count'] += len(page['images'])
+                if image_sink is not None:
+                    image_refs.extend(page['images'])
+                if page.get('timing'):
+                    ocr_timings.append(page['timing'])
+                # 处理进度：调用方按 pages_done / page_count 汇报
+                metadata['page_count'] = doc_metadata.get('page_count')
+                metadata['pages_done'] = page['page_num'] + 1
+                if not page['text'].strip():
+                    continue
+                # 与整篇解析一致：每页加页码标记后清理空白，页与页之间以单个空格相连
+                text = parser.clean_text(f"--- 第 {page['page_num'] + 1} 页 ---\n{page['text']}")
+                if not first:
+                    text = ' ' + text
+                first = False
+                totals['char_count'] += len(text)
+                yield text
+        
+        yield from splitter.split_stream(page_texts(), doc_metadata)
+        
+        metadata.pop('pages_done', None)
+        metadata.update(doc_metadata)
+        metadata.update({
+            'char_count': totals['char_count'],
+            'image_count': totals['image_count'],
+            'has_images': totals['image_count'] > 0
+        })
+        if ocr_timings:
+            metadata['ocr_page_timings'] = ocr_timings
+        if image_refs:
+            metadata['images'] = image_refs
     
     def parse_and_split(
         self,
@@ -245,6 +380,16 @@ class DocumentParserService:
     def get_available_splitters(self) -> List[str]:
         """获取所有可用的分段器名称"""
         return list(self.splitters.keys())
+    
+    def start(self):
+        """启动解析进程池（应用启动时调用，提前完成进程创建和解析器预热）"""
+        if self.executor is not None:
+            self.executor.start()
+    
+    def shutdown(self):
+        """关闭解析进程池"""
+        if self.executor is not None:
+            self.executor.shutdown()
 
 
 document_parser_service = DocumentParserService()
@@ -7,8 +7,34 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator
+import os
 import re
+import tempfile
+
+
+@contextmanager
+def shared_temp_file(file_content: bytes, suffix: str = '') -> Iterator[str]:
+    """把文件字节写入临时文件一次，分片/窗口任务只向解析进程传路径
+    
+    Args:
+        file_content: 文件字节数据
+        suffix: 临时文件后缀
+        
+    Returns:
+        临时文件路径（退出上下文时删除）
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(file_content)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
 class BaseDocumentParser(ABC):
@@ -27,12 +53,14 @@ class BaseDocumentParser(ABC):
         pass
     
     @abstractmethod
-    def parse_from_bytes(self, file_content: bytes, file_type: str) -> Dict[str, Any]:
+    def parse_from_bytes(self, file_content: bytes, file_type: str, image_sink=None) -> Dict[str, Any]:
         """从字节数据解析文档
         
         Args:
             file_content: 文件字节数据
             file_type: 文件类型
+            image_sink: 图片输出（ImageSink），传入时把提取到的图片写出；
+                结果中的 images 只包含引用（object_key、位置、size、format），不含图片数据
             
         Returns:
             包含文档内容和元数据的字典
@@ -48,6 +76,10 @@ class BaseDocumentParser(ABC):
         """
         pass
     
+    def warmup(self) -> None:
+        """预加载解析依赖（在解析进程启动时调用一次，避免首个任务承担导入开销）"""
+        pass
+    
     def clean_text(self, text: str) -> str:
         """清理文本，去除多余空格和特殊字符
         
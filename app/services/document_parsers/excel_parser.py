@@ -6,22 +6,43 @@
     @desc: Excel文档解析器
 """
 
-from typing import Dict, Any, List
-import base64
-import os
-import tempfile
+from typing import Dict, Any, List, Optional
+from io import BytesIO
+from pathlib import Path
 from .base_parser import BaseDocumentParser
+from .image_sink import ImageSink, make_image_ref
 
 
 class ExcelParser(BaseDocumentParser):
     """Excel文档解析器"""
     
+    def warmup(self) -> None:
+        """预加载pandas和openpyxl"""
+        try:
+            import pandas
+            import openpyxl
+        except ImportError:
+            pass
+    
     def parse(self, file_path: str) -> Dict[str, Any]:
         """解析Excel文档
         
         Args:
             file_path: Excel文档路径
             
+        Returns:
+            包含文档内容和元数据的字典
+        """
+        return self._parse_source(file_path, Path(file_path).suffix.lstrip('.'))
+    
+    def _parse_source(self, source, file_type: str, image_sink: Optional[ImageSink] = None) -> Dict[str, Any]:
+        """解析Excel文档（工作簿只打开一次，pandas与图片提取共用）
+        
+        Args:
+            source: 文件路径或file-like对象
+            file_type: 文件类型（xlsx/xls）
+            image_sink: 图片输出，传入时把图片写出
+            
         Returns:
             包含文档内容和元数据的字典
         """
@@ -29,10 +50,22 @@ class ExcelParser(BaseDocumentParser):
             import pandas as pd
             from openpyxl import load_workbook
             
-            df = pd.read_excel(file_path)
-            content = []
             images = []
             
+            if file_type.lower() == 'xls':
+                # openpyxl 不支持xls，交给pandas默认引擎（xlrd），xls中的图片不提取
+                excel_file = pd.ExcelFile(source)
+                sheet_count = len(excel_file.sheet_names)
+                image_count = 0
+            else:
+                wb = load_workbook(source, data_only=True)
+                excel_file = pd.ExcelFile(wb, engine='openpyxl')
+                sheet_count = len(wb.sheetnames)
+                image_count = self._extract_images(wb, images, image_sink)
+            
+            df = excel_file.parse(0)
+            content = []
+            
             for column in df.columns:
                 column_data = df[column].dropna().astype(str).tolist()
                 content.append(f"{column}:\n" + "\n".join(column_data))
@@ -41,11 +74,9 @@ class ExcelParser(BaseDocumentParser):
             full_text = '\n'.join(content)
             cleaned_text = self.clean_text(full_text)
             
-            image_count = self._extract_images(file_path, images)
-            
             metadata = self.extract_metadata(cleaned_text)
             metadata.update({
-                'sheet_count': len(df.sheet_names),
+                'sheet_count': sheet_count,
                 'column_count': len(df.columns),
                 'row_count': len(df),
                 'image_count': image_count,
@@ -77,20 +108,18 @@ class ExcelParser(BaseDocumentParser):
                 'error': f'解析Excel文档失败: {str(e)}'
             }
     
-    def _extract_images(self, file_path: str, images: List[Dict[str, Any]]) -> int:
-        """提取Excel文档中的图片
+    def _extract_images(self, wb, images: List[Dict[str, Any]], image_sink: Optional[ImageSink] = None) -> int:
+        """提取Excel文档中的图片引用
         
         Args:
-            file_path: 文件路径
-            images: 图片列表
+            wb: 已打开的openpyxl Workbook对象
+            images: 图片引用列表
+            image_sink: 图片输出，传入时把图片写出
             
         Returns:
             图片数量
         """
         try:
-            from openpyxl import load_workbook
-            
-            wb = load_workbook(file_path)
             image_count = 0
             
             for sheet_name in wb.sheetnames:
@@ -101,13 +130,14 @@ class ExcelParser(BaseDocumentParser):
                         try:
                             image_data = image._data()
                             if image_data:
-                                image_info = {
-                                    'index': image_count,
-                                    'sheet': sheet_name,
-                                    'extension': image.format.lower(),
-                                    'size': len(image_data),
-                                    'data': base64.b64encode(image_data).decode('utf-8')
-                                }
+                                image_info = make_image_ref(
+                                    image_data,
+                                    f"{sheet_name}_{image_count}",
+                                    image.format.lower(),
+                                    image_sink,
+                                    sheet=sheet_name
+                                )
+                                image_info['index'] = image_count
                                 images.append(image_info)
                                 image_count += 1
                         except Exception as e:
@@ -123,75 +153,20 @@ class ExcelParser(BaseDocumentParser):
         """获取支持的文件扩展名"""
         return ['.xlsx', '.xls', '.csv']
     
-    def parse_from_bytes(self, file_content: bytes, file_type: str) -> Dict[str, Any]:
-        """从字节数据解析Excel文档
+    def parse_from_bytes(
+        self,
+        file_content: bytes,
+        file_type: str,
+        image_sink: Optional[ImageSink] = None
+    ) -> Dict[str, Any]:
+        """从字节数据解析Excel文档（直接从内存读取，不落临时文件）
         
         Args:
             file_content: 文件字节数据
             file_type: 文件类型
+            image_sink: 图片输出，传入时把图片写出
             
         Returns:
             包含文档内容和元数据的字典
         """
-        try:
-            import pandas as pd
-            from openpyxl import load_workbook
-            from io import BytesIO
-            
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_type}') as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
-            try:
-                df = pd.read_excel(temp_file_path)
-                content = []
-                images = []
-                
-                for column in df.columns:
-                    column_data = df[column].dropna().astype(str).tolist()
-                    content.append(f"{column}:\n" + "\n".join(column_data))
-                    content.append("\n")
-                
-                full_text = '\n'.join(content)
-                cleaned_text = self.clean_text(full_text)
-                
-                image_count = self._extract_images(temp_file_path, images)
-                
-                metadata = self.extract_metadata(cleaned_text)
-                metadata.update({
-                    'sheet_count': len(df.sheet_names),
-                    'column_count': len(df.columns),
-                    'row_count': len(df),
-                    'image_count': image_count,
-                    'has_images': image_count > 0,
-                    'file_type': 'excel'
-                })
-                
-                return {
-                    'content': cleaned_text,
-                    'metadata': metadata,
-                    'images': images,
-                    'success': True
-                }
-            finally:
-                # 删除临时文件
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                
-        except ImportError:
-            return {
-                'content': '',
-                'metadata': {},
-                'images': [],
-                'success': False,
-                'error': 'pandas或openpyxl库未安装，请运行: pip install pandas openpyxl'
-            }
-        except Exception as e:
-            return {
-                'content': '',
-                'metadata': {},
-                'images': [],
-                'success': False,
-                'error': f'解析Excel文档失败: {str(e)}'
-            }
+        return self._parse_source(BytesIO(file_content), file_type, image_sink)
@@ -0,0 +1,61 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: image_sink
+    @date: 2026/2/19
+    @desc: 文档图片输出接口（图片字节直接写出，解析结果只保留引用）
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional
+
+
+class ImageSink(ABC):
+    """图片输出接口
+
+    解析器提取到图片后把原始字节交给 sink 写出，解析结果中只保留对象键、位置、
+    大小、格式等轻量引用。实现需可被pickle（会随解析任务传给解析进程）。
+    """
+
+    @abstractmethod
+    def put(self, data: bytes, name: str, extension: str) -> str:
+        """写出一张图片
+
+        Args:
+            data: 图片原始字节
+            name: 图片在文档内的唯一名称（同一文档重复处理时名称不变，便于覆盖）
+            extension: 图片格式扩展名
+
+        Returns:
+            对象键
+        """
+        pass
+
+
+def make_image_ref(
+    data: bytes,
+    name: str,
+    extension: str,
+    image_sink: Optional[ImageSink] = None,
+    **location: Any
+) -> Dict[str, Any]:
+    """生成图片引用，传入 image_sink 时同时写出图片
+
+    Args:
+        data: 图片原始字节
+        name: 图片在文档内的唯一名称
+        extension: 图片格式扩展名
+        image_sink: 图片输出，None 表示只记录引用不写出
+        **location: 图片位置（如 page、sheet）
+
+    Returns:
+        {'object_key', 'size', 'format', ...位置}，未写出时 object_key 为 None
+    """
+    object_key = image_sink.put(data, name, extension) if image_sink is not None else None
+    ref = {
+        'object_key': object_key,
+        'size': len(data),
+        'format': extension
+    }
+    ref.update(location)
+    return ref
@@ -0,0 +1,205 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: ocr_pipeline
+    @date: 2026/2/17
+    @desc: 扫描版PDF的OCR管线（按页窗口懒栅格化，多进程PaddleOCR识别）
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Iterator, Tuple
+
+from .base_parser import shared_temp_file
+
+logger = logging.getLogger(__name__)
+
+
+# 每个进程一个OCR引擎，按 (lang, cpu_threads) 缓存，首次识别时创建
+_engines: Dict[Tuple[str, int], Any] = {}
+
+
+def _get_engine(lang: str, cpu_threads: int):
+    """获取当前进程的PaddleOCR引擎"""
+    key = (lang, cpu_threads)
+    engine = _engines.get(key)
+    if engine is None:
+        from paddleocr import PaddleOCR
+        engine = PaddleOCR(use_angle_cls=True, lang=lang, cpu_threads=cpu_threads)
+        _engines[key] = engine
+    return engine
+
+
+def _ocr_page_window(
+    pdf_path: str,
+    first_page: int,
+    last_page: int,
+    dpi: int,
+    lang: str,
+    cpu_threads: int
+) -> List[Dict[str, Any]]:
+    """栅格化并识别一个页窗口（供进程池调用，也可在当前进程直接调用）
+
+    Args:
+        pdf_path: PDF临时文件路径（各窗口共享，进程间只传路径）
+        first_page: 起始页（从1开始，包含）
+        last_page: 结束页（包含）
+        dpi: 栅格化分辨率
+        lang: OCR语言
+        cpu_threads: 单个OCR引擎使用的CPU线程数
+
+    Returns:
+        每页一项：{'page_num', 'text', 'images', 'timing'}
+    """
+    from pdf2image import convert_from_path
+    import numpy as np
+
+    engine = _get_engine(lang, cpu_threads)
+
+    started = time.perf_counter()
+    try:
+        page_images = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            fmt='jpeg',
+            first_page=first_page,
+            last_page=last_page
+        )
+    except Exception as e:
+        logger.warning(f"栅格化第 {first_page}-{last_page} 页时出错: {str(e)}")
+        page_images = [None] * (last_page - first_page + 1)
+    rasterize_ms = (time.perf_counter() - started) * 1000 / max(1, len(page_images))
+
+    pages = []
+    for offset, image in enumerate(page_images):
+        page_num = first_page - 1 + offset
+        page_text = ''
+        ocr_started = time.perf_counter()
+        try:
+            if image is None:
+                raise ValueError('页面栅格化失败')
+            result = engine.ocr(np.asarray(image), cls=True)
+            if result and result[0]:
+                page_text = '\n'.join([line[1][0] for line in result[0] if line[1]])
+        except Exception as e:
+            logger.warning(f"OCR识别第 {page_num + 1} 页时出错: {str(e)}")
+        ocr_ms = (time.perf_counter() - ocr_started) * 1000
+
+        pages.append({
+            'page_num': page_num,
+            'text': page_text,
+            'images': [],
+            'timing': {
+                'page': page_num + 1,
+                'rasterize_ms': round(rasterize_ms, 1),
+                'ocr_ms': round(ocr_ms, 1)
+            }
+        })
+        # 识别完立即释放位图
+        page_images[offset] = None
+
+    return pages
+
+
+class OCRPipeline:
+    """扫描版PDF的OCR管线
+
+    按 pages_per_window 页为一个窗口调用 pdf2image（first_page/last_page），
+    任意时刻只有在途窗口的位图在内存中；传入 ParserExecutor 时各窗口分发到
+    解析进程，每个进程持有自己的PaddleOCR引擎，结果按页序合并。
+    """
+
+    def __init__(
+        self,
+        dpi: int = 200,
+        pages_per_window: int = 4,
+        lang: str = 'ch',
+        cpu_threads: int = 2
+    ):
+        """初始化OCR管线
+
+        Args:
+            dpi: 栅格化分辨率
+            pages_per_window: 每个栅格化/识别窗口的页数
+            lang: OCR语言
+            cpu_threads: 单个OCR引擎使用的CPU线程数（多进程时避免线程超订）
+        """
+        self.dpi = dpi
+        self.pages_per_window = max(1, pages_per_window)
+        self.lang = lang
+        self.cpu_threads = cpu_threads
+
+    def warmup(self) -> None:
+        """在当前进程预先创建OCR引擎（加载模型耗时较长）"""
+        try:
+            _get_engine(self.lang, self.cpu_threads)
+        except ImportError:
+            pass
+
+    def iter_pages(
+        self,
+        pdf_bytes: bytes,
+        page_count: int,
+        executor=None
+    ) -> Iterator[Dict[str, Any]]:
+        """按页序逐页产出OCR结果
+
+        Args:
+            pdf_bytes: PDF字节数据
+            page_count: 总页数
+            executor: ParserExecutor实例，传入时各窗口在解析进程中并行识别
+
+        Returns:
+            页面迭代器，每项为 {'page_num', 'text', 'images', 'timing'}
+        """
+        started = time.perf_counter()
+        recognized = 0
+        # PDF只写一次临时文件，各窗口按路径栅格化（pdf2image 本身也需要文件）
+        with shared_temp_file(pdf_bytes, '.pdf') as pdf_path:
+            windows = (
+                (
+                    pdf_path,
+                    first_page,
+                    min(first_page + self.pages_per_window - 1, page_count),
+                    self.dpi,
+                    self.lang,
+                    self.cpu_threads
+                )
+                for first_page in range(1, page_count + 1, self.pages_per_window)
+            )
+            if executor is not None:
+                results = executor.imap(_ocr_page_window, windows)
+            else:
+                results = (_ocr_page_window(*args) for args in windows)
+
+            for window_pages in results:
+                for page in window_pages:
+                    recognized += 1
+                    yield page
+
+        total_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"OCR完成: {recognized} 页，总耗时 {total_ms:.0f}ms，平均每页 {total_ms / max(1, recognized):.0f}ms")
+
+    def run(
+        self,
+        pdf_bytes: bytes,
+        page_count: int,
+        executor=None
+    ) -> Dict[str, Any]:
+        """识别全部页面并返回合并结果
+
+        Args:
+            pdf_bytes: PDF字节数据
+            page_count: 总页数
+            executor: ParserExecutor实例
+
+        Returns:
+            {'pages': 按页序的页面列表, 'timings': 每页耗时, 'total_ms': 总耗时}
+        """
+        started = time.perf_counter()
+        pages = list(self.iter_pages(pdf_bytes, page_count, executor))
+        return {
+            'pages': pages,
+            'timings': [page['timing'] for page in pages],
+            'total_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
@@ -0,0 +1,352 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: parser_executor
+    @date: 2026/2/15
+    @desc: 文档解析进程池（CPU密集的解析放到独立进程执行，绕开GIL）
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional, List, Tuple, Iterable, Iterator
+
+from .base_parser import BaseDocumentParser
+from .image_sink import ImageSink
+
+
+# 解析进程内的解析器实例（由 _init_worker 在每个进程中创建一次）
+_worker_parsers: Dict[str, BaseDocumentParser] = {}
+
+
+def _current_address_space() -> int:
+    """读取当前进程的虚拟内存大小（字节），不支持时返回0"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[0])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _init_worker(parser_factory: Callable[[], Dict[str, BaseDocumentParser]], memory_limit_mb: int):
+    """解析进程初始化：设置内存上限并预热解析器
+
+    Args:
+        parser_factory: 创建解析器字典的函数
+        memory_limit_mb: 单个解析进程可额外使用的内存（MB），0表示不限制
+    """
+    global _worker_parsers
+
+    if memory_limit_mb > 0:
+        try:
+            import resource
+            # 子进程已继承父进程（fork）或 forkserver 的地址空间，上限在当前大小基础上叠加
+            limit = _current_address_space() + memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"设置解析进程内存上限失败: {str(e)}")
+
+    _worker_parsers = parser_factory()
+    for parser in _worker_parsers.values():
+        try:
+            parser.warmup()
+        except Exception as e:
+            print(f"解析器预热失败: {str(e)}")
+
+
+def _worker_main(conn, parser_factory: Callable[[], Dict[str, BaseDocumentParser]], memory_limit_mb: int):
+    """解析进程主循环：从管道逐个接收 (fn, args)，执行后回传 (是否成功, 结果或异常)"""
+    _init_worker(parser_factory, memory_limit_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except BaseException as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send((False, RuntimeError(f'解析结果无法序列化: {str(e)}')))
+
+
+def _ping() -> int:
+    """空任务，用于启动时提前拉起解析进程"""
+    return os.getpid()
+
+
+def _parse_in_worker(
+    parser_name: str,
+    file_content: bytes,
+    file_type: str,
+    image_sink: Optional[ImageSink] = None
+) -> Dict[str, Any]:
+    """在解析进程中执行解析"""
+    parser = _worker_parsers.get(parser_name)
+    if not parser:
+        return {
+            'content': '',
+            'metadata': {},
+            'images': [],
+            'success': False,
+            'error': f'解析器不存在: {parser_name}'
+        }
+    return parser.parse_from_bytes(file_content, file_type, image_sink=image_sink)
+
+
+class _WorkerSlot:
+    """一个解析进程及其在主进程中的调度线程
+
+    调度线程从共享队列取任务，经管道交给自己的解析进程执行并等待结果；
+    超时或进程异常退出时只终止并重建这一个进程，其他进程上的任务不受影响。
+    """
+
+    def __init__(self, executor: 'ParserExecutor', index: int):
+        self.executor = executor
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.thread = threading.Thread(target=self._run, name=f"parser-slot-{index}", daemon=True)
+
+    def ensure_process(self):
+        """解析进程不存在或已退出时创建新进程"""
+        if self.process is not None and self.process.is_alive():
+            return
+        self.kill()
+        context = self.executor.mp_context
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.executor.parser_factory, self.executor.memory_limit_mb),
+            name=f"parser-worker-{self.index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def kill(self):
+        """终止当前解析进程"""
+        process, conn = self.process, self.conn
+        self.process, self.conn = None, None
+        if conn is not None:
+            conn.close()
+        if process is not None:
+            if process.is_alive():
+                process.kill()
+            process.join(timeout=5)
+
+    def _execute(self, fn: Callable, args: Tuple) -> Any:
+        self.ensure_process()
+        try:
+            self.conn.send((fn, args))
+            ready = self.conn.poll(self.executor.timeout)
+            if ready:
+                ok, value = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise RuntimeError('解析进程异常退出（可能超出内存上限）')
+        if not ready:
+            self.kill()
+            raise TimeoutError(f'解析超时（超过{self.executor.timeout}秒）')
+        if not ok:
+            raise value
+        return value
+
+    def _run(self):
+        while True:
+            item = self.executor._tasks.get()
+            if item is None:
+                break
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._execute(fn, args))
+            except BaseException as e:
+                future.set_exception(e)
+        self.close()
+
+    def close(self):
+        """通知解析进程退出"""
+        if self.conn is not None:
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        self.kill()
+
+
+class ParserExecutor:
+    """文档解析进程池
+
+    对 BaseDocumentParser.parse_from_bytes 的封装：解析任务分发到固定数量的常驻解析进程执行，
+    支持进程数、单任务超时和单进程内存上限配置。每个解析进程由主进程中的一个调度线程管理，
+    单个任务超时或其进程异常退出（如超出内存上限）时只重建该进程，不影响其他在途任务。
+    默认以 forkserver 方式创建进程，重建时不会从多线程的应用进程 fork。
+    """
+
+    def __init__(
+        self,
+        parser_factory: Callable[[], Dict[str, BaseDocumentParser]],
+        max_workers: int = 0,
+        timeout: Optional[float] = None,
+        memory_limit_mb: int = 0,
+        start_method: Optional[str] = None
+    ):
+        """初始化解析进程池（进程在首次使用或调用 start 时创建）
+
+        Args:
+            parser_factory: 创建解析器字典的模块级函数，在每个解析进程中调用一次
+            max_workers: 进程数，0表示CPU核数
+            timeout: 单个解析任务超时时间（秒），None表示不限制
+            memory_limit_mb: 单个解析进程可额外使用的内存（MB），0表示不限制
+            start_method: 进程启动方式（forkserver/spawn/fork），None使用系统默认
+        """
+        self.parser_factory = parser_factory
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.start_method = start_method
+        self.mp_context = multiprocessing.get_context(start_method)
+        self._tasks: "queue.Queue" = queue.Queue()
+        self._slots: List[_WorkerSlot] = []
+        self._lock = threading.Lock()
+
+    def _ensure_slots(self) -> List[_WorkerSlot]:
+        with self._lock:
+            if not self._slots:
+                self._slots = [_WorkerSlot(self, i) for i in range(self.max_workers)]
+                for slot in self._slots:
+                    slot.thread.start()
+            return self._slots
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """提交任务到解析进程（fn 需为可被pickle的模块级函数）"""
+        self._ensure_slots()
+        future: Future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+
+    def start(self):
+        """创建全部解析进程并等待预热完成"""
+        slots = self._ensure_slots()
+        for slot in slots:
+            try:
+                slot.ensure_process()
+            except Exception as e:
+                print(f"解析进程启动失败: {str(e)}")
+        for future in [self.submit(_ping) for _ in slots]:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"解析进程启动失败: {str(e)}")
+
+    def shutdown(self):
+        """关闭进程池（取消排队中的任务，等待执行中的任务完成）"""
+        with self._lock:
+            slots, self._slots = self._slots, []
+        if not slots:
+            return
+        while True:
+            try:
+                item = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        for _ in slots:
+            self._tasks.put(None)
+        for slot in slots:
+            slot.thread.join()
+
+    def run_all(self, fn: Callable, args_list: List[Tuple]) -> List[Any]:
+        """把一组任务分发到解析进程并按提交顺序返回结果
+
+        Args:
+            fn: 模块级函数（需可被pickle）
+            args_list: 每个任务的参数元组
+
+        Returns:
+            与 args_list 顺序一致的结果列表
+
+        Raises:
+            TimeoutError: 某个任务超过超时时间
+            RuntimeError: 解析进程异常退出
+        """
+        futures = [self.submit(fn, *args) for args in args_list]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def imap(self, fn: Callable, args_iter: Iterable[Tuple], window: Optional[int] = None) -> Iterator[Any]:
+        """按提交顺序流式返回结果，同时在途的任务不超过 window 个
+
+        与 run_all 不同，结果被消费后才会提交后续任务，调用方内存只与窗口大小相关。
+
+        Args:
+            fn: 模块级函数（需可被pickle）
+            args_iter: 任务参数元组的迭代器
+            window: 最多在途任务数，默认等于进程数
+
+        Returns:
+            结果迭代器（单个任务超过 timeout 时抛出 TimeoutError）
+        """
+        window = max(1, window or self.max_workers)
+        pending = deque()
+        try:
+            for args in args_iter:
+                pending.append(self.submit(fn, *args))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def parse_from_bytes(
+        self,
+        parser_name: str,
+        file_content: bytes,
+        file_type: str,
+        image_sink: Optional[ImageSink] = None
+    ) -> Dict[str, Any]:
+        """在解析进程中解析字节数据
+
+        Args:
+            parser_name: 解析器名称（word/excel/pdf/unstructured）
+            file_content: 文件字节数据
+            file_type: 文件类型
+            image_sink: 图片输出（需可被pickle），图片在解析进程中直接写出
+
+        Returns:
+            与 BaseDocumentParser.parse_from_bytes 相同结构的解析结果
+        """
+        try:
+            return self.submit(_parse_in_worker, parser_name, file_content, file_type, image_sink).result()
+        except (TimeoutError, RuntimeError) as e:
+            error = str(e)
+        except MemoryError:
+            error = '解析超出内存上限'
+        except Exception as e:
+            error = f'解析任务执行失败: {str(e)}'
+
+        return {
+            'content': '',
+            'metadata': {},
+            'images': [],
+            'success': False,
+            'error': error
+        }
@@ -6,20 +6,157 @@
     @desc: PDF文档解析器（支持OCR）
 """
 
-from typing import Dict, Any, List
-import base64
-import os
-import tempfile
-from .base_parser import BaseDocumentParser
+import importlib.util
+from typing import Dict, Any, List, Optional, Iterator
+from io import BytesIO
+from .base_parser import BaseDocumentParser, shared_temp_file
+from .image_sink import ImageSink, make_image_ref
+from .ocr_pipeline import OCRPipeline
+
+
+# PDF图片流过滤器 -> 扩展名
+_IMAGE_FILTER_EXTENSIONS = {
+    '/DCTDecode': 'jpg',
+    '/JPXDecode': 'jp2',
+    '/CCITTFaxDecode': 'tiff',
+    '/JBIG2Decode': 'jbig2'
+}
+
+
+def _ocr_available() -> bool:
+    """OCR依赖是否已安装（只查找模块，不在主进程导入 paddleocr，识别在解析进程中进行）"""
+    return all(importlib.util.find_spec(name) is not None for name in ('pdf2image', 'paddleocr'))
+
+
+def _image_extension(x_object) -> str:
+    """根据图片流的过滤器推断格式"""
+    try:
+        image_filter = x_object.get('/Filter')
+        if isinstance(image_filter, list):
+            image_filter = image_filter[-1] if image_filter else None
+        return _IMAGE_FILTER_EXTENSIONS.get(str(image_filter), 'bin')
+    except Exception:
+        return 'bin'
+
+
+def _extract_page_images(page, page_num: int, image_sink: Optional[ImageSink] = None) -> List[Dict[str, Any]]:
+    """提取单页中的图片引用（index 由调用方按页序统一编号）
+    
+    Args:
+        page: PageObject对象
+        page_num: 页码（从0开始）
+        image_sink: 图片输出，传入时把图片字节写出，否则只记录页码、大小和格式
+        
+    Returns:
+        图片引用列表
+    """
+    images = []
+    try:
+        if '/Resources' in page and '/XObject' in page['/Resources']:
+            x_objects = page['/Resources']['/XObject'].get_object()
+            
+            for obj_name in x_objects:
+                if x_objects[obj_name]['/Subtype'] == '/Image':
+                    try:
+                        image_data = x_objects[obj_name]._data
+                        if image_data:
+                            images.append(make_image_ref(
+                                image_data,
+                                f"page{page_num + 1}_{len(images)}",
+                                _image_extension(x_objects[obj_name]),
+                                image_sink,
+                                page=page_num + 1
+                            ))
+                    except Exception as e:
+                        print(f"提取第 {page_num + 1} 页图片 {obj_name} 时出错: {str(e)}")
+                        continue
+    except Exception as e:
+        print(f"处理第 {page_num + 1} 页资源时出错: {str(e)}")
+    return images
+
+
+def _extract_pages(reader, start: int, end: int, image_sink: Optional[ImageSink] = None) -> List[Dict[str, Any]]:
+    """逐页提取 [start, end) 范围内的文本和图片（每页只遍历一次）
+    
+    Args:
+        reader: PdfReader对象
+        start: 起始页（从0开始，包含）
+        end: 结束页（不包含）
+        image_sink: 图片输出
+        
+    Returns:
+        每页一项：{'page_num', 'text', 'images'}
+    """
+    pages = []
+    for page_num in range(start, end):
+        page = reader.pages[page_num]
+        try:
+            page_text = page.extract_text()
+        except Exception as e:
+            print(f"提取第 {page_num + 1} 页文本时出错: {str(e)}")
+            page_text = ''
+        pages.append({
+            'page_num': page_num,
+            'text': page_text or '',
+            'images': _extract_page_images(page, page_num, image_sink)
+        })
+    return pages
+
+
+def _extract_page_range(
+    pdf_path: str,
+    start: int,
+    end: int,
+    image_sink: Optional[ImageSink] = None
+) -> List[Dict[str, Any]]:
+    """在解析进程中提取一个页段（供进程池分片调用）
+    
+    各分片共享同一个临时文件，只传路径，进程间传输量与分片数无关；
+    pypdf 按需读取对象，每个进程只解析自己页段引用的内容。
+    
+    Args:
+        pdf_path: PDF临时文件路径
+        start: 起始页（从0开始，包含）
+        end: 结束页（不包含）
+        image_sink: 图片输出
+        
+    Returns:
+        每页一项：{'page_num', 'text', 'images'}
+    """
+    import pypdf
+    reader = pypdf.PdfReader(pdf_path)
+    return _extract_pages(reader, start, end, image_sink)
 
 
 class PDFParser(BaseDocumentParser):
     """PDF文档解析器（支持OCR）"""
     
-    def __init__(self):
-        """初始化PDF解析器"""
+    def __init__(
+        self,
+        pages_per_shard: int = 50,
+        ocr_pipeline: Optional[OCRPipeline] = None,
+        warmup_ocr: bool = False
+    ):
+        """初始化PDF解析器
+        
+        Args:
+            pages_per_shard: 分片并行提取时每个分片的页数，页数不超过该值的PDF不分片
+            ocr_pipeline: 扫描版PDF使用的OCR管线，默认按默认参数创建
+            warmup_ocr: 预热时是否同时创建OCR引擎（每个解析进程都会加载一份模型）
+        """
         self.use_ocr = False
-        self.ocr_engine = None
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.ocr_pipeline = ocr_pipeline or OCRPipeline()
+        self.warmup_ocr = warmup_ocr
+    
+    def warmup(self) -> None:
+        """预加载pypdf（按需预热OCR引擎）"""
+        try:
+            import pypdf
+        except ImportError:
+            pass
+        if self.warmup_ocr:
+            self.ocr_pipeline.warmup()
     
     def parse(self, file_path: str) -> Dict[str, Any]:
         """解析PDF文档
@@ -40,7 +177,8 @@ class PDFParser(BaseDocumentParser):
             
             if is_scanned:
                 print("检测到扫描版PDF，使用OCR提取文字")
-                return self._parse_with_ocr(file_path, reader)
+                with open(file_path, 'rb') as f:
+                    return self._parse_with_ocr(f.read(), reader)
             else:
                 print("检测到普通PDF，使用pypdf提取文字")
                 return self._parse_with_pypdf(reader)
@@ -105,37 +243,56 @@ class PDFParser(BaseDocumentParser):
             print(f"检测PDF类型时出错: {str(e)}")
             return False
     
-    def _parse_with_pypdf(self, reader) -> Dict[str, Any]:
+    def _parse_with_pypdf(
+        self,
+        reader,
+        file_content: Optional[bytes] = None,
+        executor=None,
+        image_sink: Optional[ImageSink] = None
+    ) -> Dict[str, Any]:
         """使用pypdf解析普通PDF
         
         Args:
             reader: PdfReader对象
+            file_content: PDF字节数据（分片并行时传给解析进程）
+            executor: ParserExecutor实例，传入时按页段分片到多个解析进程
+            image_sink: 图片输出，传入时把图片写出，结果中只保留引用
             
         Returns:
             解析结果
         """
+        page_count = len(reader.pages)
+        
+        if executor is not None and file_content is not None and page_count > self.pages_per_shard:
+            pages = []
+            with shared_temp_file(file_content, '.pdf') as pdf_path:
+                shards = [
+                    (pdf_path, start, min(start + self.pages_per_shard, page_count), image_sink)
+                    for start in range(0, page_count, self.pages_per_shard)
+                ]
+                for shard_pages in executor.run_all(_extract_page_range, shards):
+                    pages.extend(shard_pages)
+        else:
+            pages = _extract_pages(reader, 0, page_count, image_sink)
+        
+        # 按页序重组文本和图片
         content = []
         images = []
-        
-        for page_num, page in enumerate(reader.pages):
-            try:
-                page_text = page.extract_text()
-                if page_text and page_text.strip():
-                    content.append(f"--- 第 {page_num + 1} 页 ---\n{page_text}")
-            except Exception as e:
-                print(f"提取第 {page_num + 1} 页文本时出错: {str(e)}")
-                continue
+        for page in pages:
+            if page['text'].strip():
+                content.append(f"--- 第 {page['page_num'] + 1} 页 ---\n{page['text']}")
+            for image in page['images']:
+                image['index'] = len(images)
+                images.append(image)
         
         full_text = '\n\n'.join(content)
         cleaned_text = self.clean_text(full_text)
         
-        image_count = self._extract_images(reader, images)
-        
         metadata = self.extract_metadata(cleaned_text)
         metadata.update({
-            'page_count': len(reader.pages),
-            'image_count': image_count,
-            'has_images': image_count > 0,
+            'page_count': page_count,
+            'image_count': len(images),
+            'has_images': len(images) > 0,
             'file_type': 'pdf',
             'is_encrypted': reader.is_encrypted,
             'is_scanned': False,
@@ -149,79 +306,63 @@ class PDFParser(BaseDocumentParser):
             'success': True
         }
     
-    def _parse_with_ocr(self, file_path: str, reader) -> Dict[str, Any]:
+    def _parse_with_ocr(
+        self,
+        file_content: bytes,
+        reader,
+        executor=None,
+        image_sink: Optional[ImageSink] = None
+    ) -> Dict[str, Any]:
         """使用OCR解析扫描版PDF
         
         Args:
-            file_path: PDF文件路径
+            file_content: PDF字节数据
             reader: PdfReader对象
+            executor: ParserExecutor实例，传入时按页窗口在多个解析进程中并行识别
+            image_sink: 图片输出，传入时把嵌入图片写出（栅格化的整页图像不再保留）
             
         Returns:
-            解析结果
+            解析结果（metadata 中包含每页的栅格化/识别耗时）
         """
+        if not _ocr_available():
+            return {
+                'content': '',
+                'metadata': {},
+                'images': [],
+                'success': False,
+                'error': f'OCR库未安装，请运行: pip install pdf2image paddlepaddle paddleocr Pillow'
+            }
+        
         try:
-            from pdf2image import convert_from_path
-            from paddleocr import PaddleOCR
-            
-            # 初始化OCR引擎
-            if self.ocr_engine is None:
-                self.ocr_engine = PaddleOCR(use_angle_cls=True, lang='ch')
-            
-            # 将PDF转换为图片
-            images = convert_from_path(
-                file_path,
-                dpi=200,
-                fmt='jpeg',
-                thread_count=4
+            ocr_result = self.ocr_pipeline.run(
+                file_content,
+                len(reader.pages),
+                executor=executor
             )
             
             content = []
-            extracted_images = []
-            
-            for i, image in enumerate(images):
-                try:
-                    # 使用OCR识别文字
-                    result = self.ocr_engine.ocr(image, cls=True)
-                    
-                    if result and result[0]:
-                        # 提取识别的文字
-                        page_text = '\n'.join([line[1][0] for line in result[0] if line[1]])
-                        if page_text.strip():
-                            content.append(f"--- 第 {i + 1} 页 ---\n{page_text}")
-                        
-                        # 保存图片信息
-                        image_bytes = self._image_to_bytes(image)
-                        if image_bytes:
-                            image_info = {
-                                'index': len(extracted_images),
-                                'page': i + 1,
-                                'size': len(image_bytes),
-                                'data': base64.b64encode(image_bytes).decode('utf-8')
-                            }
-                            extracted_images.append(image_info)
-                except Exception as e:
-                    print(f"OCR识别第 {i + 1} 页时出错: {str(e)}")
-                    continue
+            for page in ocr_result['pages']:
+                if page['text'].strip():
+                    content.append(f"--- 第 {page['page_num'] + 1} 页 ---\n{page['text']}")
             
             full_text = '\n\n'.join(content)
             cleaned_text = self.clean_text(full_text)
             
             # 提取嵌入的图片
-            embedded_images = []
-            self._extract_images(reader, embedded_images)
-            
-            # 合并OCR提取的图片和嵌入的图片
-            all_images = extracted_images + embedded_images
+            all_images = []
+            self._extract_images(reader, all_images, image_sink)
             
             metadata = self.extract_metadata(cleaned_text)
             metadata.update({
-                'page_count': len(images),
+                'page_count': len(ocr_result['pages']),
                 'image_count': len(all_images),
                 'has_images': len(all_images) > 0,
                 'file_type': 'pdf',
                 'is_encrypted': reader.is_encrypted,
                 'is_scanned': True,
-                'extraction_method': 'paddleocr'
+                'extraction_method': 'paddleocr',
+                'ocr_total_ms': ocr_result['total_ms'],
+                'ocr_page_timings': ocr_result['timings']
             })
             
             return {
@@ -231,14 +372,6 @@ class PDFParser(BaseDocumentParser):
                 'success': True
             }
             
-        except ImportError as e:
-            return {
-                'content': '',
-                'metadata': {},
-                'images': [],
-                'success': False,
-                'error': f'OCR库未安装，请运行: pip install pdf2image paddlepaddle paddleocr Pillow'
-            }
         except Exception as e:
             return {
                 'content': '',
@@ -248,63 +381,97 @@ class PDFParser(BaseDocumentParser):
                 'error': f'OCR解析PDF失败: {str(e)}'
             }
     
-    def _image_to_bytes(self, image) -> bytes:
-        """将PIL图像转换为bytes
+    def iter_pages_from_bytes(
+        self,
+        file_content: bytes,
+        executor=None,
+        stats: Optional[Dict[str, Any]] = None,
+        image_sink: Optional[ImageSink] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """逐页产出PDF内容（流式管线入口）
+        
+        未传executor的普通PDF直接从内存读取；传入executor或扫描版PDF时，
+        PDF字节先写入一个临时文件，各页段/页窗口只向解析进程传路径，
+        避免每个任务都序列化整份PDF（多一次磁盘写入，解析结束后删除）。
+        图片只产出引用，不保留图片数据，调用方同时持有的页面数量与文档总页数无关。
         
         Args:
-            image: PIL图像对象
+            file_content: PDF字节数据
+            executor: ParserExecutor实例，传入时普通PDF按页段、扫描版PDF按页窗口
+                在解析进程中处理（最多进程数个页段同时在途）
+            stats: 可选字典，开始产出前填入页数、是否扫描版等文档级元数据
+            image_sink: 图片输出，传入时把图片写出
             
         Returns:
-            图像的bytes数据
+            页面迭代器，每项为 {'page_num', 'text', 'images'}
         """
         try:
-            from io import BytesIO
-            buffer = BytesIO()
-            image.save(buffer, format='JPEG')
-            return buffer.getvalue()
-        except Exception as e:
-            print(f"转换图像为bytes时出错: {str(e)}")
-            return None
+            import pypdf
+        except ImportError:
+            raise RuntimeError('pypdf库未安装，请运行: pip install pypdf')
+        
+        reader = pypdf.PdfReader(BytesIO(file_content))
+        page_count = len(reader.pages)
+        is_scanned = self._detect_scanned_pdf(reader)
+        
+        if stats is not None:
+            stats.update({
+                'page_count': page_count,
+                'file_type': 'pdf',
+                'is_encrypted': reader.is_encrypted,
+                'is_scanned': is_scanned,
+                'extraction_method': 'paddleocr' if is_scanned else 'pypdf'
+            })
+        
+        if is_scanned:
+            for page in self._iter_ocr_pages(file_content, page_count, executor):
+                page['images'] = _extract_page_images(reader.pages[page['page_num']], page['page_num'], image_sink)
+                yield page
+        elif executor is not None:
+            with shared_temp_file(file_content, '.pdf') as pdf_path:
+                shards = (
+                    (pdf_path, start, min(start + self.pages_per_shard, page_count), image_sink)
+                    for start in range(0, page_count, self.pages_per_shard)
+                )
+                for shard_pages in executor.imap(_extract_page_range, shards):
+                    yield from shard_pages
+        else:
+            for page_num in range(page_count):
+                yield from _extract_pages(reader, page_num, page_num + 1, image_sink)
     
-    def _extract_images(self, reader, images: List[Dict[str, Any]]) -> int:
-        """提取PDF文档中的图片
+    def _iter_ocr_pages(self, file_content: bytes, page_count: int, executor=None) -> Iterator[Dict[str, Any]]:
+        """逐页产出扫描版PDF的OCR结果（按页窗口懒栅格化，不一次性持有全部位图）
+        
+        Args:
+            file_content: PDF字节数据
+            page_count: 总页数
+            executor: ParserExecutor实例，传入时按页窗口在多个解析进程中并行识别
+            
+        Returns:
+            页面迭代器，每项为 {'page_num', 'text', 'images', 'timing'}
+        """
+        if not _ocr_available():
+            raise RuntimeError('OCR库未安装，请运行: pip install pdf2image paddlepaddle paddleocr Pillow')
+        
+        yield from self.ocr_pipeline.iter_pages(file_content, page_count, executor=executor)
+    
+    def _extract_images(self, reader, images: List[Dict[str, Any]], image_sink: Optional[ImageSink] = None) -> int:
+        """提取PDF文档中的图片引用
         
         Args:
             reader: PdfReader对象
-            images: 图片列表
+            images: 图片引用列表
+            image_sink: 图片输出，传入时把图片写出
             
         Returns:
             图片数量
         """
         try:
-            image_count = 0
-            
             for page_num, page in enumerate(reader.pages):
-                try:
-                    if '/Resources' in page and '/XObject' in page['/Resources']:
-                        x_objects = page['/Resources']['/XObject'].get_object()
-                        
-                        for obj_name in x_objects:
-                            if x_objects[obj_name]['/Subtype'] == '/Image':
-                                try:
-                                    image_data = x_objects[obj_name]._data
-                                    if image_data:
-                                        image_info = {
-                                            'index': image_count,
-                                            'page': page_num + 1,
-                                            'size': len(image_data),
-                                            'data': base64.b64encode(image_data).decode('utf-8')
-                                        }
-                                        images.append(image_info)
-                                        image_count += 1
-                                except Exception as e:
-                                    print(f"提取第 {page_num + 1} 页图片 {image_count} 时出错: {str(e)}")
-                                    continue
-                except Exception as e:
-                    print(f"处理第 {page_num + 1} 页资源时出错: {str(e)}")
-                    continue
-            
-            return image_count
+                for image in _extract_page_images(page, page_num, image_sink):
+                    image['index'] = len(images)
+                    images.append(image)
+            return len(images)
         except Exception as e:
             print(f"提取PDF图片时出错: {str(e)}")
             return 0
@@ -313,12 +480,21 @@ class PDFParser(BaseDocumentParser):
         """获取支持的文件扩展名"""
         return ['.pdf']
     
-    def parse_from_bytes(self, file_content: bytes, file_type: str) -> Dict[str, Any]:
+    def parse_from_bytes(
+        self,
+        file_content: bytes,
+        file_type: str,
+        image_sink: Optional[ImageSink] = None,
+        executor=None
+    ) -> Dict[str, Any]:
         """从字节数据解析PDF文档
         
         Args:
             file_content: 文件字节数据
             file_type: 文件类型
+            image_sink: 图片输出，传入时把图片写出，结果中只保留引用
+            executor: ParserExecutor实例，传入时普通PDF按页段分片并行提取，
+                扫描版PDF按页窗口并行OCR，页数较少的普通PDF整体交给一个解析进程
             
         Returns:
             包含文档内容和元数据的字典
@@ -326,29 +502,23 @@ class PDFParser(BaseDocumentParser):
         try:
             import pypdf
             
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
+            # 直接从内存读取，不落临时文件
+            reader = pypdf.PdfReader(BytesIO(file_content))
             
-            try:
-                reader = pypdf.PdfReader(temp_file_path)
-                
-                # 检测PDF是否为扫描版本
-                is_scanned = self._detect_scanned_pdf(reader)
-                
-                if is_scanned:
-                    print("检测到扫描版PDF，使用OCR提取文字")
-                    result = self._parse_with_ocr(temp_file_path, reader)
-                else:
-                    print("检测到普通PDF，使用pypdf提取文字")
-                    result = self._parse_with_pypdf(reader)
-                
-                return result
-            finally:
-                # 删除临时文件
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+            # 检测PDF是否为扫描版本
+            is_scanned = self._detect_scanned_pdf(reader)
+            
+            if executor is not None and not is_scanned and len(reader.pages) <= self.pages_per_shard:
+                return executor.parse_from_bytes('pdf', file_content, file_type, image_sink=image_sink)
+            
+            if is_scanned:
+                print("检测到扫描版PDF，使用OCR提取文字")
+                return self._parse_with_ocr(file_content, reader, executor=executor, image_sink=image_sink)
+            else:
+                print("检测到普通PDF，使用pypdf提取文字")
+                return self._parse_with_pypdf(
+                    reader, file_content=file_content, executor=executor, image_sink=image_sink
+                )
                 
         except ImportError:
             return {
@@ -6,11 +6,23 @@
     @desc: 文本分段器
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
+import copy
+import math
 import re
 
 
+def _check_sizes(chunk_size: int, chunk_overlap: int) -> None:
+    """校验分段参数"""
+    if chunk_size <= 0:
+        raise ValueError(f'chunk_size 必须大于0: {chunk_size}')
+    if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+        raise ValueError(f'chunk_overlap 必须在 [0, chunk_size) 之间: {chunk_overlap}')
+
+
 class BaseTextSplitter(ABC):
     """文本分段基类"""
     
@@ -26,21 +38,83 @@ class BaseTextSplitter(ABC):
             分段后的文本列表，每个元素包含内容和元数据
         """
         pass
+    
+    def split_stream(self, texts: Iterable[str], metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """流式分段：逐段接收文本片段，逐块产出分段结果
+        
+        默认实现先拼接全部片段再调用 split_text，子类可覆盖为增量实现。
+        
+        Args:
+            texts: 文本片段迭代器（如逐页提取的文本），片段按顺序直接拼接
+            metadata: 文档元数据（每产出一块时复制）
+            
+        Returns:
+            分段结果迭代器
+        """
+        yield from self.split_text(''.join(texts), metadata)
+    
+    def with_sizes(self, chunk_size: int, chunk_overlap: int) -> 'BaseTextSplitter':
+        """返回使用指定分段大小的分段器（与当前参数相同时返回自身）
+        
+        Args:
+            chunk_size: 每段最大长度
+            chunk_overlap: 段落重叠长度
+            
+        Returns:
+            分段器实例
+        """
+        if chunk_size == self.chunk_size and chunk_overlap == self.chunk_overlap:
+            return self
+        _check_sizes(chunk_size, chunk_overlap)
+        splitter = copy.copy(self)
+        splitter.chunk_size = chunk_size
+        splitter.chunk_overlap = chunk_overlap
+        return splitter
 
 
 class RecursiveCharacterSplitter(BaseTextSplitter):
-    """递归字符分段器"""
+    """递归字符分段器
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    按分隔符优先级依次切分：段落 -> 换行 -> 中英文句末标点 -> 逗号 -> 空格 -> 单个字符。
+    只有超过 chunk_size 的片段才会用下一级分隔符继续切分，切出的小片段再贪心合并成
+    不超过 chunk_size 的分段，相邻分段以完整片段重叠（重叠不超过 chunk_overlap）。
+    分隔符保留在前一个片段末尾，分段内容与原文完全对应。
+    """
+    
+    DEFAULT_SEPARATORS = [
+        '\n\n', '\n',
+        '。', '！', '？', '；',
+        '. ', '! ', '? ', '; ',
+        '，', ', ',
+        ' ',
+        ''
+    ]
+    
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: Optional[List[str]] = None
+    ):
         """
         初始化递归字符分段器
         
         Args:
             chunk_size: 每段的最大字符数
-            chunk_overlap: 段落之间的重叠字符数
+            chunk_overlap: 段落之间的重叠字符数（需小于 chunk_size）
+            separators: 按优先级排列的分隔符，最后一个应为空字符串（按字符切分）
         """
+        _check_sizes(chunk_size, chunk_overlap)
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.separators = list(separators) if separators else list(self.DEFAULT_SEPARATORS)
+        if self.separators[-1] != '':
+            self.separators.append('')
+    
+    @property
+    def window_size(self) -> int:
+        """流式分段时缓冲区超过该长度才切出一批处理"""
+        return max(8 * self.chunk_size, 16384)
     
     def split_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """使用递归字符分段
@@ -52,30 +126,281 @@ class RecursiveCharacterSplitter(BaseTextSplitter):
         Returns:
             分段后的文本列表
         """
-        chunks = []
-        start = 0
-        text_length = len(text)
+        return list(self.split_stream([text], metadata))
+    
+    def split_stream(self, texts: Iterable[str], metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """增量递归分段：缓冲区累积到 window_size 后，在其中优先级最高的分隔符处切出一批
         
-        while start < text_length:
-            end = start + self.chunk_size
-            chunk = text[start:end]
+        切出的一批文本递归切成片段后送入合并器，合并状态（含重叠）跨批次保留，
+        因此缓冲区与文档总长度无关，整体耗时与文本长度成线性关系。
+        
+        Args:
+            texts: 文本片段迭代器
+            metadata: 文档元数据
             
-            chunk_metadata = metadata.copy() if metadata else {}
-            chunk_metadata.update({
-                'chunk_index': len(chunks),
-                'start_char': start,
-                'end_char': min(end, text_length),
-                'char_count': len(chunk)
-            })
+        Returns:
+            分段结果迭代器
+        """
+        buffer = ''
+        base = 0    # buffer[0] 在全文中的位置
+        pos = 0     # 尚未切分的起始位置（全文坐标）
+        pieces = deque()    # 当前分段内的片段 (start, end)，全文坐标
+        total = 0
+        chunk_index = 0
+        
+        def merge(piece_iter):
+            nonlocal total, chunk_index
+            for start, end in piece_iter:
+                length = end - start
+                if pieces and total + length > self.chunk_size:
+                    chunk = buffer[pieces[0][0] - base:pieces[-1][1] - base]
+                    if chunk.strip():
+                        yield self._make_chunk(chunk, pieces[0][0], chunk_index, metadata)
+                        chunk_index += 1
+                    # 保留末尾不超过 chunk_overlap 的片段作为下一段的开头
+                    while pieces and (total > self.chunk_overlap or total + length > self.chunk_size):
+                        first_start, first_end = pieces.popleft()
+                        total -= first_end - first_start
+                pieces.append((start, end))
+                total += length
+        
+        for text in texts:
+            if not text:
+                continue
+            # 丢弃已合并完、不再被引用的前缀
+            keep_from = min(pos, pieces[0][0]) if pieces else pos
+            buffer = buffer[keep_from - base:] + text
+            base = keep_from
             
-            chunks.append({
-                'content': chunk,
-                'metadata': chunk_metadata
-            })
+            while base + len(buffer) - pos > self.window_size:
+                cut = self._find_cut(buffer, pos - base, pos - base + self.window_size) + base
+                yield from merge(self._iter_pieces(buffer, pos - base, cut - base, 0, base))
+                pos = cut
+        
+        yield from merge(self._iter_pieces(buffer, pos - base, len(buffer), 0, base))
+        if pieces:
+            chunk = buffer[pieces[0][0] - base:pieces[-1][1] - base]
+            if chunk.strip():
+                yield self._make_chunk(chunk, pieces[0][0], chunk_index, metadata)
+    
+    def _find_cut(self, text: str, start: int, end: int) -> int:
+        """在 [start + chunk_size, end) 中找优先级最高的分隔符，返回其后的位置"""
+        low = start + self.chunk_size
+        for separator in self.separators[:-1]:
+            idx = text.rfind(separator, low, end)
+            if idx != -1:
+                return idx + len(separator)
+        return end
+    
+    def _iter_pieces(self, text: str, start: int, end: int, level: int, base: int = 0) -> Iterator[Tuple[int, int]]:
+        """把 text[start:end] 切成不超过 chunk_size 的连续片段
+        
+        每一级分隔符只扫描一次各自负责的区间，总耗时为 O(文本长度 x 分隔符级数)。
+        
+        Args:
+            text: 文本
+            start: 起始位置
+            end: 结束位置
+            level: 当前使用的分隔符级别
+            base: 返回坐标的偏移量
             
-            start = end - self.chunk_overlap
+        Returns:
+            片段 (start, end) 迭代器（坐标加上 base）
+        """
+        if end - start <= self.chunk_size:
+            if end > start:
+                yield start + base, end + base
+            return
         
-        return chunks
+        separator = self.separators[level]
+        if not separator:
+            # 按字符切分时片段长度取 gcd(chunk_size, chunk_overlap)：合并器按整片段重叠，
+            # 等长片段能让分段长度和重叠都精确达到设定值（最坏逐字符切分）
+            step = math.gcd(self.chunk_size, self.chunk_overlap)
+            for i in range(start, end, step):
+                yield i + base, min(i + step, end) + base
+            return
+        
+        while start < end:
+            idx = text.find(separator, start, end)
+            piece_end = end if idx == -1 else idx + len(separator)
+            yield from self._iter_pieces(text, start, piece_end, level + 1, base)
+            start = piece_end
+    
+    def _make_chunk(self, chunk: str, start: int, chunk_index: int, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        chunk_metadata = metadata.copy() if metadata else {}
+        chunk_metadata.update({
+            'chunk_index': chunk_index,
+            'start_char': start,
+            'end_char': start + len(chunk),
+            'char_count': len(chunk)
+        })
+        return {
+            'content': chunk,
+            'metadata': chunk_metadata
+        }
+
+
+class TokenTextSplitter(BaseTextSplitter):
+    """按token数分段的分段器
+    
+    chunk_size / chunk_overlap 以LLM tokenizer的token数计量。整段文本只编码一次，
+    得到每个token在原文中的字符位置，之后按token下标切分、按字符位置取原文，
+    不会对候选分段反复编码；分段末尾优先落在后半段中的段落/句末标点处。
+    """
+    
+    SEPARATORS = [
+        '\n\n', '\n',
+        '。', '！', '？', '；',
+        '. ', '! ', '? ', '; ',
+        '，', ', ',
+        ' '
+    ]
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, encoding_name: Optional[str] = None):
+        """
+        初始化token分段器
+        
+        Args:
+            chunk_size: 每段的最大token数
+            chunk_overlap: 段落之间的重叠token数（需小于 chunk_size）
+            encoding_name: tiktoken编码名称，默认使用 LLM_TOKENIZER_ENCODING
+        """
+        _check_sizes(chunk_size, chunk_overlap)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+    
+    @property
+    def window_size(self) -> int:
+        """流式分段时缓冲区超过该字符数才编码并切出一批"""
+        return max(32 * self.chunk_size, 65536)
+    
+    def _token_offsets(self, text: str) -> List[int]:
+        """一次编码整段文本，返回每个token在原文中的起始字符位置"""
+        from app.common.core.tokenizer import get_tokenizer
+        
+        encoding = get_tokenizer(self.encoding_name)
+        tokens = encoding.encode(text, disallowed_special=())
+        _, offsets = encoding.decode_with_offsets(tokens)
+        return offsets
+    
+    def split_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """按token数分段
+        
+        Args:
+            text: 待分段的文本
+            metadata: 文档元数据
+            
+        Returns:
+            分段后的文本列表
+        """
+        return list(self.split_stream([text], metadata))
+    
+    def split_stream(self, texts: Iterable[str], metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """增量token分段：缓冲区达到 window_size 后编码一次并产出其中的完整分段
+        
+        不足一段的尾部（含重叠部分）留在缓冲区与后续文本一起编码。
+        
+        Args:
+            texts: 文本片段迭代器
+            metadata: 文档元数据
+            
+        Returns:
+            分段结果迭代器
+        """
+        buffer = ''
+        base = 0
+        chunk_index = 0
+        
+        for text in texts:
+            buffer += text
+            if len(buffer) < self.window_size:
+                continue
+            spans, consumed = self._split_spans(buffer, final=False)
+            for start, end, token_count in spans:
+                chunk = buffer[start:end]
+                if chunk.strip():
+                    yield self._make_chunk(chunk, base + start, token_count, chunk_index, metadata)
+                    chunk_index += 1
+            buffer = buffer[consumed:]
+            base += consumed
+        
+        spans, _ = self._split_spans(buffer, final=True)
+        for start, end, token_count in spans:
+            chunk = buffer[start:end]
+            if chunk.strip():
+                yield self._make_chunk(chunk, base + start, token_count, chunk_index, metadata)
+                chunk_index += 1
+    
+    def _split_spans(self, text: str, final: bool) -> Tuple[List[Tuple[int, int, int]], int]:
+        """按token下标切分文本
+        
+        Args:
+            text: 文本
+            final: 是否为最后一批；否则不足 chunk_size 的尾部留待下一批
+            
+        Returns:
+            ([(起始字符, 结束字符, token数)], 已处理完的字符数)
+        """
+        if not text:
+            return [], 0
+        offsets = self._token_offsets(text)
+        token_total = len(offsets)
+        spans = []
+        start = 0
+        
+        while start < token_total:
+            end = start + self.chunk_size
+            if end >= token_total:
+                if not final:
+                    break
+                spans.append((offsets[start], len(text), token_total - start))
+                start = token_total
+                break
+            end = self._snap_end(text, offsets, start, end)
+            spans.append((offsets[start], offsets[end], end - start))
+            # 结束位置前移后分段可能只有 chunk_size 的一半，重叠不超过本段的一半，
+            # 步长不小于 chunk_size - chunk_overlap（但不越过本段结尾），分段数与文本长度成线性
+            overlap = min(self.chunk_overlap, (end - start) // 2)
+            start = max(start + 1, end - overlap, min(end, start + self.chunk_size - self.chunk_overlap))
+        
+        consumed = offsets[start] if start < token_total else len(text)
+        return spans, consumed
+    
+    def _snap_end(self, text: str, offsets: List[int], start: int, end: int) -> int:
+        """把分段结束位置前移到后半段中优先级最高的分隔符之后（找不到时不变）"""
+        low = offsets[start + self.chunk_size // 2]
+        high = offsets[end]
+        for separator in self.SEPARATORS:
+            idx = text.rfind(separator, low, high)
+            if idx != -1:
+                snapped = bisect_left(offsets, idx + len(separator), start + 1, end + 1)
+                if start < snapped <= end:
+                    return snapped
+        return end
+    
+    def _make_chunk(
+        self,
+        chunk: str,
+        start: int,
+        token_count: int,
+        chunk_index: int,
+        metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        chunk_metadata = metadata.copy() if metadata else {}
+        chunk_metadata.update({
+            'chunk_index': chunk_index,
+            'start_char': start,
+            'end_char': start + len(chunk),
+            'char_count': len(chunk),
+            'token_count': token_count,
+            'split_method': 'token'
+        })
+        return {
+            'content': chunk,
+            'metadata': chunk_metadata
+        }
 
 
 class MarkdownHeaderSplitter(BaseTextSplitter):
@@ -27,6 +27,13 @@ class UnstructuredParser(BaseDocumentParser):
             '.xlsx', '.xls', '.csv', '.txt', '.md', '.html'
         ]
     
+    def warmup(self) -> None:
+        """预加载unstructured分区模块（导入耗时较长）"""
+        try:
+            from unstructured.partition.auto import partition
+        except ImportError:
+            pass
+    
     def parse(self, file_path: str) -> Dict[str, Any]:
         """使用Unstructured解析文档
         
@@ -89,12 +96,13 @@ class UnstructuredParser(BaseDocumentParser):
                 'error': f'Unstructured解析失败: {str(e)}'
             }
     
-    def parse_from_bytes(self, file_content: bytes, file_type: str) -> Dict[str, Any]:
+    def parse_from_bytes(self, file_content: bytes, file_type: str, image_sink=None) -> Dict[str, Any]:
         """从字节数据解析文档
         
         Args:
             file_content: 文件字节数据
             file_type: 文件类型
+            image_sink: 图片输出（Unstructured 解析不提取图片，忽略）
             
         Returns:
             包含文档内容和元数据的字典
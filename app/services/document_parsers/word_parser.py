@@ -6,17 +6,23 @@
     @desc: Word文档解析器
 """
 
-from typing import Dict, Any, List
-import os
-import base64
-import tempfile
+from typing import Dict, Any, List, Optional
+from io import BytesIO
 from pathlib import Path
 from .base_parser import BaseDocumentParser
+from .image_sink import ImageSink, make_image_ref
 
 
 class WordParser(BaseDocumentParser):
     """Word文档解析器"""
     
+    def warmup(self) -> None:
+        """预加载python-docx"""
+        try:
+            import docx
+        except ImportError:
+            pass
+    
     def parse(self, file_path: str) -> Dict[str, Any]:
         """解析Word文档
         
@@ -30,33 +36,7 @@ class WordParser(BaseDocumentParser):
             from docx import Document
             
             doc = Document(file_path)
-            content = []
-            images = []
-            
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    content.append(paragraph.text)
-            
-            full_text = '\n'.join(content)
-            cleaned_text = self.clean_text(full_text)
-            
-            image_count = self._extract_images(doc, file_path, images)
-            
-            metadata = self.extract_metadata(cleaned_text)
-            metadata.update({
-                'paragraph_count': len(doc.paragraphs),
-                'table_count': len(doc.tables),
-                'image_count': image_count,
-                'has_images': image_count > 0,
-                'file_type': 'word'
-            })
-            
-            return {
-                'content': cleaned_text,
-                'metadata': metadata,
-                'images': images,
-                'success': True
-            }
+            return self._parse_doc(doc)
             
         except ImportError:
             return {
@@ -75,13 +55,51 @@ class WordParser(BaseDocumentParser):
                 'error': f'解析Word文档失败: {str(e)}'
             }
     
-    def _extract_images(self, doc, file_path: str, images: List[Dict[str, Any]]) -> int:
-        """提取Word文档中的图片
+    def _parse_doc(self, doc, image_sink: Optional[ImageSink] = None) -> Dict[str, Any]:
+        """从已打开的Document对象提取内容、图片引用和元数据
+        
+        Args:
+            doc: Document对象
+            image_sink: 图片输出，传入时把图片写出
+            
+        Returns:
+            包含文档内容和元数据的字典
+        """
+        content = []
+        images = []
+        
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                content.append(paragraph.text)
+        
+        full_text = '\n'.join(content)
+        cleaned_text = self.clean_text(full_text)
+        
+        image_count = self._extract_images(doc, images, image_sink)
+        
+        metadata = self.extract_metadata(cleaned_text)
+        metadata.update({
+            'paragraph_count': len(doc.paragraphs),
+            'table_count': len(doc.tables),
+            'image_count': image_count,
+            'has_images': image_count > 0,
+            'file_type': 'word'
+        })
+        
+        return {
+            'content': cleaned_text,
+            'metadata': metadata,
+            'images': images,
+            'success': True
+        }
+    
+    def _extract_images(self, doc, images: List[Dict[str, Any]], image_sink: Optional[ImageSink] = None) -> int:
+        """提取Word文档中的图片引用
         
         Args:
             doc: Document对象
-            file_path: 文件路径
-            images: 图片列表
+            images: 图片引用列表
+            image_sink: 图片输出，传入时把图片写出
             
         Returns:
             图片数量
@@ -94,12 +112,8 @@ class WordParser(BaseDocumentParser):
                     image_data = rel.target_part.blob
                     image_ext = rel.target_ref.split('.')[-1]
                     
-                    image_info = {
-                        'index': image_count,
-                        'extension': image_ext,
-                        'size': len(image_data),
-                        'data': base64.b64encode(image_data).decode('utf-8')
-                    }
+                    image_info = make_image_ref(image_data, f"image_{image_count}", image_ext, image_sink)
+                    image_info['index'] = image_count
                     
                     images.append(image_info)
                     image_count += 1
@@ -109,12 +123,18 @@ class WordParser(BaseDocumentParser):
             print(f"提取图片时出错: {str(e)}")
             return 0
     
-    def parse_from_bytes(self, file_content: bytes, file_type: str) -> Dict[str, Any]:
+    def parse_from_bytes(
+        self,
+        file_content: bytes,
+        file_type: str,
+        image_sink: Optional[ImageSink] = None
+    ) -> Dict[str, Any]:
         """从字节数据解析Word文档
         
         Args:
             file_content: 文件字节数据
             file_type: 文件类型
+            image_sink: 图片输出，传入时把图片写出
             
         Returns:
             包含文档内容和元数据的字典
@@ -122,44 +142,9 @@ class WordParser(BaseDocumentParser):
         try:
             from docx import Document
             
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
-            try:
-                doc = Document(temp_file_path)
-                content = []
-                images = []
-                
-                for paragraph in doc.paragraphs:
-                    if paragraph.text.strip():
-                        content.append(paragraph.text)
-                
-                full_text = '\n'.join(content)
-                cleaned_text = self.clean_text(full_text)
-                
-                image_count = self._extract_images(doc, temp_file_path, images)
-                
-                metadata = self.extract_metadata(cleaned_text)
-                metadata.update({
-                    'paragraph_count': len(doc.paragraphs),
-                    'table_count': len(doc.tables),
-                    'image_count': image_count,
-                    'has_images': image_count > 0,
-                    'file_type': 'word'
-                })
-                
-                return {
-                    'content': cleaned_text,
-                    'metadata': metadata,
-                    'images': images,
-                    'success': True
-                }
-            finally:
-                # 删除临时文件
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+            # 直接从内存读取，不落临时文件
+            doc = Document(BytesIO(file_content))
+            return self._parse_doc(doc, image_sink)
             
         except ImportError:
             return {
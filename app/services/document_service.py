@@ -6,17 +6,74 @@
     @desc: Document and Paragraph CRUD operations
 """
 
+import asyncio
+import logging
 import os
 import uuid
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, select, delete, insert, update, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.common.core.pagination import Keyset
+from app.common.core.segmenter import segment_for_index, segment_query, highlight
 from app.models.document import Document, Paragraph
 from app.schemas.document import (
     DocumentCreate, DocumentUpdate, ParagraphCreate, ParagraphUpdate,
     DocumentResponse, DocumentListResponse, ParagraphResponse, DocumentDetailResponse
 )
 from app.services.document_parser_service import document_parser_service
+from app.services.document_cache_service import document_cache
+from app.services.minio_service import MinIOImageSink
+from app.services.embedding_service import embedding_service
+from app.services.vector_store_service import vector_store
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 分词已由jieba完成，tsvector 使用 simple 配置（只做小写化，不做词干/停用词处理）
+FULLTEXT_CONFIG = 'simple'
+
+# 游标分页：文档按 (created_at, id) 倒序，段落按 paragraph_index 正序（文档内唯一）；
+# 搜索结果按相关度排序，只支持 skip/limit
+DOCUMENT_KEYSET = Keyset((Document.created_at, Document.id), key=lambda document: (document.created_at, document.id))
+PARAGRAPH_KEYSET = Keyset(
+    (Paragraph.paragraph_index,), key=lambda paragraph: (paragraph.paragraph_index,), descending=False
+)
+
+
+def paragraph_vector_id(paragraph_id: str) -> int:
+    """由段落UUID派生向量索引ID（前64位去掉符号位，FAISS使用int64）"""
+    return int(uuid.UUID(paragraph_id).hex[:16], 16) & 0x7FFFFFFFFFFFFFFF
+
+
+def remove_document_vectors(user_id: str, document_id: str) -> None:
+    """从用户的向量索引中删除文档向量（失败只记录日志，不影响文档删除）"""
+    try:
+        vector_store.remove_document(user_id, document_id)
+    except Exception as e:
+        logger.warning(f"删除文档向量失败: {document_id}，{str(e)}")
+
+
+def search_vector_expr(content: str):
+    """段落内容 -> tsvector 表达式（写入 Paragraph.search_vector）"""
+    return func.to_tsvector(FULLTEXT_CONFIG, segment_for_index(content))
+
+
+def fulltext_condition(search: str) -> Optional[Tuple[Any, Any, List[str]]]:
+    """
+    构造段落全文检索条件
+    :param search: 查询文本
+    :return: (命中条件, 相关度表达式, 查询词)；查询中没有可检索的词时返回 None
+    """
+    terms = segment_query(search)
+    if not terms:
+        return None
+    tsquery = func.plainto_tsquery(FULLTEXT_CONFIG, ' '.join(terms))
+    # 归一化方式32：rank/(rank+1)，相关度落在 [0, 1)
+    rank = func.ts_rank_cd(Paragraph.search_vector, tsquery, 32)
+    return Paragraph.search_vector.op('@@')(tsquery), rank, terms
 
 
 class DocumentService:
@@ -35,7 +92,8 @@ class DocumentService:
         content_type: Optional[str] = None,
         chunk_size: Optional[int] = None,
         chunk_overlap: Optional[int] = None,
-        splitter_type: Optional[str] = None
+        splitter_type: Optional[str] = None,
+        content_hash: Optional[str] = None
     ) -> Document:
         """创建文档记录"""
         document = Document(
@@ -49,6 +107,7 @@ class DocumentService:
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             splitter_type=splitter_type,
+            content_hash=content_hash,
             status="processing"
         )
         self.db.add(document)
@@ -69,9 +128,10 @@ class DocumentService:
         limit: int = 100,
         status: Optional[str] = None,
         file_type: Optional[str] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Document]:
-        """获取文档列表（支持多种筛选）"""
+        """获取文档列表（支持多种筛选；不搜索时可传上一页的游标代替 skip）"""
         query = self.db.query(Document).filter(Document.user_id == user_id)
         
         if status:
@@ -81,9 +141,14 @@ class DocumentService:
             query = query.filter(Document.file_type == file_type)
         
         if search:
-            query = query.filter(Document.filename.contains(search))
+            # ILIKE 走 pg_trgm 索引，结果按文件名相似度排序
+            query = query.filter(Document.filename.icontains(search, autoescape=True))
+            query = query.order_by(desc(func.similarity(Document.filename, search)))
+        elif cursor:
+            query = query.filter(DOCUMENT_KEYSET.after(cursor))
+            skip = 0
         
-        return query.order_by(desc(Document.created_at)).offset(skip).limit(limit).all()
+        return query.order_by(*DOCUMENT_KEYSET.order_by()).offset(skip).limit(limit).all()
 
     def update_document(
         self,
@@ -105,13 +170,14 @@ class DocumentService:
         return document
 
     def delete_document(self, document_id: str, user_id: str) -> bool:
-        """删除文档"""
+        """删除文档（同时删除向量索引中的段落向量）"""
         document = self.get_document(document_id, user_id)
         if not document:
             return False
 
         self.db.delete(document)
         self.db.commit()
+        remove_document_vectors(user_id, document_id)
         return True
 
     def update_document_status(
@@ -119,7 +185,8 @@ class DocumentService:
         document_id: str,
         status: str,
         total_paragraphs: Optional[int] = None,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        progress: Optional[int] = None
     ) -> Optional[Document]:
         """更新文档状态"""
         document = self.db.query(Document).filter(Document.id == document_id).first()
@@ -131,6 +198,8 @@ class DocumentService:
             document.total_paragraphs = total_paragraphs
         if error_message is not None:
             document.error_message = error_message
+        if progress is not None:
+            document.progress = progress
 
         self.db.commit()
         self.db.refresh(document)
@@ -144,33 +213,133 @@ class DocumentService:
         para_metadata: Optional[Dict[str, Any]] = None
     ) -> Paragraph:
         """创建段落"""
+        paragraph_id = str(uuid.uuid4())
         paragraph = Paragraph(
-            id=str(uuid.uuid4()),
+            id=paragraph_id,
             document_id=document_id,
             paragraph_index=paragraph_index,
             content=content,
             character_count=len(content),
-            para_metadata=para_metadata or {}
+            para_metadata=para_metadata or {},
+            vector_id=paragraph_vector_id(paragraph_id),
+            search_vector=search_vector_expr(content)
         )
         self.db.add(paragraph)
         self.db.commit()
         self.db.refresh(paragraph)
         return paragraph
 
+    def create_paragraphs_bulk(
+        self,
+        document_id: str,
+        paragraphs: List[Dict[str, Any]],
+        start_index: int = 0,
+        commit: bool = True
+    ) -> int:
+        """批量创建段落（按批 executemany，整体一个事务）
+
+        Args:
+            document_id: 文档ID
+            paragraphs: 分段结果列表，每项包含 content 和 metadata
+            start_index: 第一个段落的 paragraph_index
+            commit: 是否提交事务，为 False 时由调用方统一提交
+
+        Returns:
+            写入的段落数
+        """
+        batch_size = max(1, settings.PARAGRAPH_INSERT_BATCH_SIZE)
+        written = 0
+        # 每行的分词结果通过 search_text 参数传入，由数据库生成 tsvector
+        stmt = insert(Paragraph.__table__).values(
+            search_vector=func.to_tsvector(FULLTEXT_CONFIG, bindparam("search_text"))
+        )
+        batch: List[Dict[str, Any]] = []
+
+        for offset, para in enumerate(paragraphs):
+            content = para.get("content", "")
+            paragraph_id = str(uuid.uuid4())
+            batch.append({
+                "id": paragraph_id,
+                "document_id": document_id,
+                "paragraph_index": start_index + offset,
+                "content": content,
+                "character_count": len(content),
+                "para_metadata": para.get("metadata", {}) or {},
+                "vector_id": paragraph_vector_id(paragraph_id),
+                "search_text": segment_for_index(content)
+            })
+            if len(batch) >= batch_size:
+                self.db.execute(stmt, batch)
+                written += len(batch)
+                batch = []
+
+        if batch:
+            self.db.execute(stmt, batch)
+            written += len(batch)
+
+        if commit:
+            self.db.commit()
+        return written
+
+    def update_document_progress(self, document_id: str, progress: int) -> None:
+        """更新文档处理进度（0-100）"""
+        self.db.query(Document).filter(Document.id == document_id).update(
+            {Document.progress: progress}, synchronize_session=False
+        )
+        self.db.commit()
+
+    def _update_stream_progress(self, document_id: str, stream_metadata: Dict[str, Any], last_progress: int) -> int:
+        """按已解析页数更新流式处理进度（5-95）
+
+        主会话中有尚未提交的段落，进度在独立连接的短事务中提交；进度没有变化时不写库。
+
+        Returns:
+            当前进度
+        """
+        page_count = stream_metadata.get("page_count")
+        if not page_count:
+            return last_progress
+        progress = 5 + 90 * min(stream_metadata.get("pages_done", 0), page_count) // page_count
+        if progress <= last_progress:
+            return last_progress
+        try:
+            with self.db.get_bind().begin() as conn:
+                conn.execute(update(Document).where(Document.id == document_id).values(progress=progress))
+        except Exception as e:
+            logger.warning(f"更新文档处理进度失败: {document_id}，{str(e)}")
+            return last_progress
+        return progress
+
+    def delete_paragraphs(self, document_id: str) -> int:
+        """删除文档的全部段落（重试处理前清理上次残留）"""
+        count = self.db.query(Paragraph).filter(Paragraph.document_id == document_id).delete(
+            synchronize_session=False
+        )
+        self.db.commit()
+        return count
+
     def get_paragraphs(
         self,
         document_id: str,
         skip: int = 0,
         limit: int = 100,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Paragraph]:
-        """获取文档的所有段落（支持分页和搜索）"""
+        """获取文档的所有段落（支持分页和搜索，搜索时按相关度排序；不搜索时可传上一页的游标代替 skip）"""
         query = self.db.query(Paragraph).filter(Paragraph.document_id == document_id)
         
         if search:
-            query = query.filter(Paragraph.content.contains(search))
+            condition = fulltext_condition(search)
+            if condition is None:
+                return []
+            match, rank, _ = condition
+            query = query.filter(match).order_by(desc(rank))
+        elif cursor:
+            query = query.filter(PARAGRAPH_KEYSET.after(cursor))
+            skip = 0
         
-        return query.order_by(Paragraph.paragraph_index).offset(skip).limit(limit).all()
+        return query.order_by(*PARAGRAPH_KEYSET.order_by()).offset(skip).limit(limit).all()
 
     def get_paragraph(self, paragraph_id: str) -> Optional[Paragraph]:
         """获取单个段落"""
@@ -192,6 +361,7 @@ class DocumentService:
 
         if paragraph_update.content:
             paragraph.character_count = len(paragraph_update.content)
+            paragraph.search_vector = search_vector_expr(paragraph_update.content)
 
         self.db.commit()
         self.db.refresh(paragraph)
@@ -207,56 +377,470 @@ class DocumentService:
         self.db.commit()
         return True
 
+    def index_document_vectors(self, document_id: str) -> int:
+        """为文档段落生成向量并写入用户的向量索引（先删除该文档旧的向量）
+
+        段落按 EMBEDDING_INDEX_BATCH_SIZE 分批读取、编码、写入索引，整篇文档写完后落盘一次。
+
+        Returns:
+            写入的向量数
+        """
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            return 0
+
+        vector_store.remove_document(document.user_id, document_id, save=False)
+
+        query = self.db.query(Paragraph.vector_id, Paragraph.content).filter(
+            Paragraph.document_id == document_id,
+            Paragraph.vector_id.isnot(None)
+        ).order_by(Paragraph.paragraph_index)
+
+        batch_size = max(1, settings.EMBEDDING_INDEX_BATCH_SIZE)
+        indexed = 0
+        vector_ids: List[int] = []
+        texts: List[str] = []
+        for vector_id, content in query.yield_per(batch_size):
+            vector_ids.append(vector_id)
+            texts.append(content)
+            if len(texts) >= batch_size:
+                vector_store.add_vectors(
+                    document.user_id, document_id, np.array(vector_ids), embedding_service.encode(texts)
+                )
+                indexed += len(texts)
+                vector_ids, texts = [], []
+
+        if texts:
+            vector_store.add_vectors(
+                document.user_id, document_id, np.array(vector_ids), embedding_service.encode(texts)
+            )
+            indexed += len(texts)
+
+        vector_store.save(document.user_id)
+        return indexed
+
+    @staticmethod
+    def _split_params(document: Document) -> Dict[str, Any]:
+        """文档实际使用的分段参数（未指定时使用默认值）"""
+        return {
+            "splitter_type": document.splitter_type or "recursive_char",
+            "chunk_size": document.chunk_size or 1000,
+            "chunk_overlap": document.chunk_overlap if document.chunk_overlap is not None else 200
+        }
+
+    def process_document_from_cache(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """相同内容、相同分段参数的文档已处理过时，直接复用缓存的分段结果
+
+        段落写入后不提交，由调用方与文档状态一起提交；文档状态由调用方（任务队列）负责更新。
+        开启图片提取时不使用缓存：缓存只有分段结果，图片需要重新解析并写入本文档的前缀下。
+
+        Returns:
+            处理结果；文档没有内容哈希、开启了图片提取或缓存未命中时返回None（需要下载并解析）
+        """
+        if settings.DOCUMENT_EXTRACT_IMAGES:
+            return None
+
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document or not document.content_hash:
+            return None
+
+        split_params = self._split_params(document)
+        cached = document_cache.get_chunks(document.content_hash, document.file_type, **split_params)
+        if not cached or not cached.get("chunks"):
+            return None
+
+        try:
+            self.delete_paragraphs(document_id)
+            written = self.create_paragraphs_bulk(document_id, cached["chunks"], commit=False)
+            return {
+                "success": True,
+                "total_paragraphs": written,
+                "total_characters": cached.get("total_characters", 0),
+                "from_cache": True
+            }
+        except Exception as e:
+            self.db.rollback()
+            return {"success": False, "error": str(e)}
+
     def process_document(
         self,
         document_id: str,
         file_content: bytes
     ) -> Dict[str, Any]:
-        """处理文档：解析、分段、存储"""
+        """处理文档：解析、分段、存储（处理进度写入 Document.progress，分段结果写入去重缓存）
+
+        段落写入后不提交，由调用方与文档状态一起提交；失败时回滚并返回错误，
+        是否重试、文档状态如何变化都由调用方（任务队列）决定。
+        """
         try:
             document = self.db.query(Document).filter(Document.id == document_id).first()
             if not document:
                 return {"success": False, "error": "文档不存在"}
 
+            split_params = self._split_params(document)
+            # 图片提取为可选阶段：开启时图片字节直接写入MinIO文档前缀下，解析结果只保留引用
+            image_sink = (
+                MinIOImageSink(f"documents/{document_id}/images")
+                if settings.DOCUMENT_EXTRACT_IMAGES else None
+            )
+            content_hash = document.content_hash or document_cache.compute_hash(file_content)
+            file_type = document.file_type
+
+            # 清理上次失败遗留的段落，保证重试幂等
+            self.delete_paragraphs(document_id)
+            self.update_document_progress(document_id, 5)
+
+            # 支持流式处理的类型（PDF）：逐页提取、逐块分段、按批写入，峰值内存只与少量页面相关
+            stream_metadata: Dict[str, Any] = {}
+            chunk_stream = document_parser_service.stream_split_document(
+                file_content, file_type,
+                split_method=split_params["splitter_type"],
+                chunk_size=split_params["chunk_size"],
+                chunk_overlap=split_params["chunk_overlap"],
+                metadata=stream_metadata,
+                image_sink=image_sink
+            )
+            if chunk_stream is not None:
+                result, cached_chunks = self._store_chunk_stream(document_id, chunk_stream, stream_metadata)
+                if result.get("success") and cached_chunks is not None:
+                    document_cache.set_chunks(
+                        content_hash, file_type, **split_params,
+                        chunks=cached_chunks,
+                        total_characters=result["total_characters"],
+                        metadata=stream_metadata
+                    )
+                return result
+
             # 解析文档（从字节数据）
-            parse_result = document_parser_service.parse_document_from_bytes(file_content, document.file_type)
+            parse_result = document_parser_service.parse_document_from_bytes(
+                file_content, file_type, image_sink=image_sink
+            )
             
             if not parse_result.get("success"):
-                self.update_document_status(document_id, "failed", error_message=parse_result.get("error", "解析失败"))
                 return {"success": False, "error": parse_result.get("error", "解析失败")}
 
+            self.update_document_progress(document_id, 50)
+
             # 分段
             paragraphs = document_parser_service.split_document(
                 parse_result["content"],
-                parse_result.get("metadata", {})
+                parse_result.get("metadata", {}),
+                split_method=split_params["splitter_type"],
+                chunk_size=split_params["chunk_size"],
+                chunk_overlap=split_params["chunk_overlap"]
             )
             
             if not paragraphs:
-                self.update_document_status(document_id, "failed", error_message="分段失败")
                 return {"success": False, "error": "分段失败"}
 
-            # 存储段落
-            for idx, para in enumerate(paragraphs):
-                self.create_paragraph(
-                    document_id=document_id,
-                    paragraph_index=idx,
-                    content=para.get("content", ""),
-                    para_metadata=para.get("metadata", {})
-                )
+            self.update_document_progress(document_id, 60)
 
-            # 更新文档状态
-            self.update_document_status(
-                document_id,
-                "completed",
-                total_paragraphs=len(paragraphs)
+            # 批量存储段落，由调用方与文档状态更新在同一事务中提交
+            written = self.create_paragraphs_bulk(document_id, paragraphs, commit=False)
+
+            total_characters = len(parse_result.get("content", ""))
+            document_cache.set_chunks(
+                content_hash, file_type, **split_params,
+                chunks=paragraphs,
+                total_characters=total_characters,
+                metadata=parse_result.get("metadata", {})
             )
 
             return {
                 "success": True,
-                "total_paragraphs": len(paragraphs),
-                "total_characters": len(parse_result.get("content", ""))
+                "total_paragraphs": written,
+                "total_characters": total_characters,
+                "images": parse_result.get("images", [])
             }
 
         except Exception as e:
-            self.update_document_status(document_id, "failed", error_message=str(e))
+            self.db.rollback()
             return {"success": False, "error": str(e)}
+
+    def _store_chunk_stream(
+        self,
+        document_id: str,
+        chunk_stream: Iterator[Dict[str, Any]],
+        stream_metadata: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+        """消费分段迭代器，按批写入段落（不提交，由调用方与文档状态一起提交）
+
+        Returns:
+            (处理结果, 供去重缓存使用的分段列表)；文档超过 DOCUMENT_CACHE_MAX_ENTRY_MB 时
+            不再保留分段，第二项为None，保证流式处理的内存上限
+        """
+        batch_size = max(1, settings.PARAGRAPH_INSERT_BATCH_SIZE)
+        cache_limit = settings.DOCUMENT_CACHE_MAX_ENTRY_MB * 1024 * 1024
+        written = 0
+        batch: List[Dict[str, Any]] = []
+        cached_chunks: Optional[List[Dict[str, Any]]] = []
+        cached_size = 0
+        progress = 5
+
+        for chunk in chunk_stream:
+            batch.append(chunk)
+            if cached_chunks is not None:
+                cached_size += len(chunk.get("content", ""))
+                cached_chunks.append(chunk)
+                if cached_size > cache_limit:
+                    cached_chunks = None
+            if len(batch) >= batch_size:
+                written += self.create_paragraphs_bulk(document_id, batch, start_index=written, commit=False)
+                batch = []
+                progress = self._update_stream_progress(document_id, stream_metadata, progress)
+
+        if batch:
+            written += self.create_paragraphs_bulk(document_id, batch, start_index=written, commit=False)
+
+        if not written:
+            self.db.rollback()
+            return {"success": False, "error": "分段失败"}, None
+
+        return {
+            "success": True,
+            "total_paragraphs": written,
+            "total_characters": stream_metadata.get("char_count", 0)
+        }, cached_chunks
+
+
+class AsyncDocumentService:
+    """文档服务类（AsyncSession 版本，供 async 路由使用）"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_document(
+        self,
+        user_id: str,
+        filename: str,
+        file_path: str,
+        file_type: str,
+        file_size: int,
+        content_type: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        splitter_type: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> Document:
+        """创建文档记录"""
+        document = Document(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            file_type=file_type,
+            file_size=file_size,
+            content_type=content_type,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            splitter_type=splitter_type,
+            content_hash=content_hash,
+            status="processing"
+        )
+        self.db.add(document)
+        await self.db.commit()
+        await self.db.refresh(document)
+        return document
+
+    async def get_document(self, document_id: str, user_id: str) -> Optional[Document]:
+        """获取单个文档"""
+        result = await self.db.execute(
+            select(Document).where(and_(Document.id == document_id, Document.user_id == user_id))
+        )
+        return result.scalars().first()
+
+    async def get_documents(
+        self,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        file_type: Optional[str] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[Document]:
+        """获取文档列表（支持多种筛选；不搜索时可传上一页的游标代替 skip）"""
+        stmt = select(Document).where(Document.user_id == user_id)
+
+        if status:
+            stmt = stmt.where(Document.status == status)
+
+        if file_type:
+            stmt = stmt.where(Document.file_type == file_type)
+
+        if search:
+            # ILIKE 走 pg_trgm 索引，结果按文件名相似度排序
+            stmt = stmt.where(Document.filename.icontains(search, autoescape=True))
+            stmt = stmt.order_by(desc(func.similarity(Document.filename, search)))
+        elif cursor:
+            stmt = stmt.where(DOCUMENT_KEYSET.after(cursor))
+            skip = 0
+
+        result = await self.db.execute(stmt.order_by(*DOCUMENT_KEYSET.order_by()).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def update_document(
+        self,
+        document_id: str,
+        user_id: str,
+        document_update: DocumentUpdate
+    ) -> Optional[Document]:
+        """更新文档"""
+        document = await self.get_document(document_id, user_id)
+        if not document:
+            return None
+
+        update_data = document_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(document, field, value)
+
+        await self.db.commit()
+        await self.db.refresh(document)
+        return document
+
+    async def delete_document(self, document_id: str, user_id: str) -> bool:
+        """删除文档（用批量DELETE删除，避免异步会话中懒加载级联集合）"""
+        document = await self.get_document(document_id, user_id)
+        if not document:
+            return False
+
+        await self.db.execute(delete(Paragraph).where(Paragraph.document_id == document_id))
+        await self.db.execute(delete(Document).where(Document.id == document_id))
+        await self.db.commit()
+        await asyncio.to_thread(remove_document_vectors, user_id, document_id)
+        return True
+
+    async def get_paragraphs(
+        self,
+        document_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[Paragraph]:
+        """获取文档的所有段落（支持分页和搜索，搜索时按相关度排序；不搜索时可传上一页的游标代替 skip）"""
+        stmt = select(Paragraph).where(Paragraph.document_id == document_id)
+
+        if search:
+            condition = fulltext_condition(search)
+            if condition is None:
+                return []
+            match, rank, _ = condition
+            stmt = stmt.where(match).order_by(desc(rank))
+        elif cursor:
+            stmt = stmt.where(PARAGRAPH_KEYSET.after(cursor))
+            skip = 0
+
+        result = await self.db.execute(stmt.order_by(*PARAGRAPH_KEYSET.order_by()).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def get_paragraph(self, paragraph_id: str) -> Optional[Paragraph]:
+        """获取单个段落"""
+        result = await self.db.execute(select(Paragraph).where(Paragraph.id == paragraph_id))
+        return result.scalars().first()
+
+    async def semantic_search(
+        self,
+        user_id: str,
+        query: str,
+        top_k: int = 10,
+        document_ids: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """语义检索用户文档中的段落（向量编码与FAISS检索在线程池中执行）
+
+        Args:
+            user_id: 用户ID
+            query: 查询文本
+            top_k: 返回数量
+            document_ids: 只在这些文档中检索
+            timeout: 向量检索超时时间（秒），超时抛出 asyncio.TimeoutError；
+                只作用于线程池中的检索，不会中断数据库查询
+
+        Returns:
+            按相似度降序的结果列表，每项包含段落、所属文档和相似度
+        """
+        def search():
+            query_vector = embedding_service.encode_query(query)
+            return vector_store.search(user_id, query_vector, top_k=top_k, document_ids=document_ids)
+
+        hits = await asyncio.wait_for(asyncio.to_thread(search), timeout=timeout)
+        if not hits:
+            return []
+
+        scores = dict(hits)
+        result = await self.db.execute(
+            select(Paragraph, Document.filename)
+            .join(Document, Document.id == Paragraph.document_id)
+            .where(
+                Paragraph.vector_id.in_(list(scores)),
+                Document.user_id == user_id,
+                Document.is_active.is_(True)
+            )
+        )
+        results = [
+            {
+                "paragraph_id": paragraph.id,
+                "document_id": paragraph.document_id,
+                "filename": filename,
+                "paragraph_index": paragraph.paragraph_index,
+                "content": paragraph.content,
+                "score": scores[paragraph.vector_id]
+            }
+            for paragraph, filename in result.all()
+        ]
+        results.sort(key=lambda item: item["score"], reverse=True)
+        return results
+
+    async def fulltext_search(
+        self,
+        user_id: str,
+        query: str,
+        document_ids: Optional[List[str]] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """全文检索用户文档中的段落（GIN索引命中，按 ts_rank_cd 排序并高亮）
+
+        相关度对全部命中段落计算，不在排序前截断，结果与命中集合的读取顺序无关；
+        相关度相同时按文档、段落序号排序，分页稳定。
+
+        Args:
+            user_id: 用户ID
+            query: 查询文本
+            document_ids: 只在这些文档中检索
+            skip: 跳过记录数
+            limit: 返回记录数
+
+        Returns:
+            按相关度降序的结果列表，每项包含段落、所属文档、相关度和高亮片段
+        """
+        condition = fulltext_condition(query)
+        if condition is None:
+            return []
+        match, rank, terms = condition
+
+        score = rank.label("score")
+        stmt = (
+            select(Paragraph, Document.filename, score)
+            .join(Document, Document.id == Paragraph.document_id)
+            .where(match, Document.user_id == user_id, Document.is_active.is_(True))
+        )
+        if document_ids:
+            stmt = stmt.where(Paragraph.document_id.in_(document_ids))
+        result = await self.db.execute(
+            stmt.order_by(desc(score), Paragraph.document_id, Paragraph.paragraph_index)
+            .offset(skip)
+            .limit(limit)
+        )
+        return [
+            {
+                "paragraph_id": paragraph.id,
+                "document_id": paragraph.document_id,
+                "filename": filename,
+                "paragraph_index": paragraph.paragraph_index,
+                "highlight": highlight(paragraph.content, terms),
+                "score": float(score)
+            }
+            for paragraph, filename, score in result.all()
+        ]
@@ -0,0 +1,91 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: embedding_service
+    @date: 2026/2/21
+    @desc: 文本向量化服务（本地 sentence-transformers 模型，CPU 批量编码）
+"""
+
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """
+    文本向量化服务
+
+    模型在首次使用时加载（进程内只加载一次），输出L2归一化的 float32 向量，
+    内积即余弦相似度。
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        device: Optional[str] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.model_name = model_name or settings.EMBEDDING_MODEL_NAME
+        self.device = device or settings.EMBEDDING_DEVICE
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """首次使用时加载模型"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    logger.info(f"加载向量模型: {self.model_name} ({self.device})")
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        """向量维度"""
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        批量编码文本
+        :param texts: 文本列表
+        :param batch_size: 模型前向的批大小，默认 EMBEDDING_BATCH_SIZE
+        :return: (len(texts), dimension) 的 float32 数组
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+        vectors = self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.ascontiguousarray(vectors, dtype='float32')
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        编码检索查询（按模型要求加查询指令前缀）
+        :param query: 查询文本
+        :return: (1, dimension) 的 float32 数组
+        """
+        return self.encode([f"{settings.EMBEDDING_QUERY_INSTRUCTION}{query}"], batch_size=1)
+
+    def warmup(self):
+        """预加载模型（避免第一次检索时加载模型的耗时）"""
+        try:
+            self.encode_query("warmup")
+        except Exception as e:
+            logger.warning(f"向量模型预热失败: {str(e)}")
+
+
+# 全局向量化服务实例
+embedding_service = EmbeddingService()
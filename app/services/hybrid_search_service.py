@@ -0,0 +1,530 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: hybrid_search_service
+    @date: 2026/2/24
+    @desc: 段落混合检索（BM25 + 向量相似度融合，可选交叉编码器重排）
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Text, and_, desc, func, or_, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.core.cache import LRUCache
+from app.common.core.segmenter import segment_query
+from app.models.document import Document, Paragraph
+from app.services.document_service import FULLTEXT_CONFIG
+from app.services.embedding_service import embedding_service
+from app.services.vector_store_service import vector_store
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# tsvector 文本形式中的词项：'lexeme' 或 'lexeme':1,5A（词项内的单引号和反斜杠会被双写）
+_LEXEME_RE = re.compile(r"'((?:[^']|'')+)'")
+
+
+# ---------------- 打分（NumPy 向量化，对候选集整体计算） ----------------
+
+def bm25_scores(
+    tf: np.ndarray,
+    doc_len: np.ndarray,
+    df: np.ndarray,
+    total_docs: int,
+    k1: float = 1.2,
+    b: float = 0.75,
+    avgdl: Optional[float] = None
+) -> np.ndarray:
+    """
+    BM25 打分
+    :param tf: (候选数, 词数) 词频矩阵
+    :param doc_len: (候选数,) 段落长度
+    :param df: (词数,) 文档频率
+    :param total_docs: 语料段落总数
+    :param k1: 词频饱和参数
+    :param b: 长度归一化参数
+    :param avgdl: 平均段落长度，默认取候选集均值
+    :return: (候选数,) BM25 分数
+    """
+    if tf.size == 0:
+        return np.zeros(tf.shape[0], dtype='float32')
+    doc_len = doc_len.astype('float32')
+    avgdl = avgdl or float(doc_len.mean()) or 1.0
+    df = df.astype('float32')
+    # 段落总数取自文档统计，处理中的文档可能使其小于文档频率
+    total_docs = max(total_docs, float(df.max()), 1.0)
+    idf = np.log1p((total_docs - df + 0.5) / (df + 0.5))
+    norm = k1 * (1.0 - b + b * doc_len / avgdl)
+    return ((tf * (k1 + 1.0)) / (tf + norm[:, None])) @ idf
+
+
+def split_recall_terms(df: np.ndarray, budget: int, max_df: int) -> Tuple[List[int], List[int]]:
+    """
+    词法召回按文档频率分层
+    按文档频率从低到高累加，累计命中数不超过 budget 的稀有词（如条款编号）的命中全部进入候选，
+    不会因为同一查询中的常见词命中过多而被截掉；其余为常见词，其命中按相关度排序后只取前若干个。
+    文档频率达到 max_df 的词（计数已封顶，接近停用词）不参与召回、只参与打分，查询只有这类词时取其中最少见的一个。
+    :param df: (词数,) 文档频率
+    :param budget: 稀有词一层的命中数上限
+    :param max_df: 文档频率计数上限
+    :return: (稀有词下标, 常见词下标)
+    """
+    order = np.argsort(df, kind='stable')
+    rare: List[int] = []
+    common: List[int] = []
+    used = 0.0
+    for i in order:
+        if not common and used + df[i] <= budget:
+            rare.append(int(i))
+            used += df[i]
+        elif df[i] < max_df:
+            common.append(int(i))
+    if not rare and not common and order.size:
+        common.append(int(order[0]))
+    return rare, common
+
+
+def rank_positions(scores: np.ndarray) -> np.ndarray:
+    """
+    分数 -> 名次（从1开始，分数为 NaN 的候选名次为 inf）
+    :param scores: (候选数,) 分数
+    :return: (候选数,) 名次
+    """
+    ranks = np.full(scores.shape[0], np.inf)
+    valid = np.flatnonzero(~np.isnan(scores))
+    order = valid[np.argsort(-scores[valid], kind='stable')]
+    ranks[order] = np.arange(1, order.shape[0] + 1)
+    return ranks
+
+
+def reciprocal_rank_fusion(rank_lists: Sequence[np.ndarray], k: int = 60) -> np.ndarray:
+    """
+    倒数排名融合：score = Σ 1 / (k + rank)，某一路未召回的候选该路贡献为0
+    :param rank_lists: 每路召回的名次数组
+    :param k: 平滑常数
+    :return: (候选数,) 融合分数
+    """
+    return np.sum([1.0 / (k + ranks) for ranks in rank_lists], axis=0)
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    """归一化到 [0, 1]，NaN 记为0"""
+    valid = ~np.isnan(scores)
+    normalized = np.zeros(scores.shape[0], dtype='float32')
+    if not valid.any():
+        return normalized
+    low, high = scores[valid].min(), scores[valid].max()
+    normalized[valid] = (scores[valid] - low) / (high - low) if high > low else 1.0
+    return normalized
+
+
+def weighted_fusion(lexical: np.ndarray, vector: np.ndarray, vector_weight: float = 0.5) -> np.ndarray:
+    """
+    加权融合：两路分数各自 min-max 归一化后加权求和
+    :param lexical: (候选数,) BM25 分数，未命中为 NaN
+    :param vector: (候选数,) 向量相似度，未召回为 NaN
+    :param vector_weight: 向量相似度的权重
+    :return: (候选数,) 融合分数
+    """
+    return (1.0 - vector_weight) * _min_max(lexical) + vector_weight * _min_max(vector)
+
+
+def fuse(
+    lexical: np.ndarray,
+    vector: np.ndarray,
+    method: str = 'rrf',
+    rrf_k: Optional[int] = None,
+    vector_weight: Optional[float] = None
+) -> np.ndarray:
+    """
+    按指定方法融合两路分数
+    :param lexical: (候选数,) BM25 分数，未命中为 NaN
+    :param vector: (候选数,) 向量相似度，未召回为 NaN
+    :param method: rrf / weighted
+    :param rrf_k: RRF 平滑常数，默认 HYBRID_RRF_K
+    :param vector_weight: 加权融合的向量权重，默认 HYBRID_VECTOR_WEIGHT
+    :return: (候选数,) 融合分数
+    """
+    if method == 'weighted':
+        weight = settings.HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight
+        return weighted_fusion(lexical, vector, weight)
+    return reciprocal_rank_fusion(
+        [rank_positions(lexical), rank_positions(vector)],
+        k=rrf_k or settings.HYBRID_RRF_K
+    )
+
+
+# ---------------- tsvector 解析 ----------------
+
+def _quote_lexeme(lexeme: str) -> str:
+    return lexeme.replace('\\', '\\\\').replace("'", "''")
+
+
+def parse_lexemes(tsvector_text: str) -> List[str]:
+    """解析 tsvector 文本形式中的全部词项"""
+    return [
+        match.group(1).replace("''", "'").replace('\\\\', '\\')
+        for match in _LEXEME_RE.finditer(tsvector_text or '')
+    ]
+
+
+def term_frequency_matrix(tsvector_texts: Sequence[str], lexemes: List[str]) -> np.ndarray:
+    """
+    从段落的 tsvector 文本中取出查询词的词频（位置个数）
+    :param tsvector_texts: 候选段落的 search_vector::text
+    :param lexemes: 查询词项
+    :return: (候选数, 词数) 词频矩阵
+    """
+    tf = np.zeros((len(tsvector_texts), len(lexemes)), dtype='float32')
+    if not lexemes:
+        return tf
+    columns = {_quote_lexeme(lexeme): column for column, lexeme in enumerate(lexemes)}
+    pattern = re.compile(
+        r"(?:^| )'(" + '|'.join(re.escape(quoted) for quoted in columns) + r")'(?::([0-9A-D,]+))?(?= |$)"
+    )
+    for row, text in enumerate(tsvector_texts):
+        for match in pattern.finditer(text or ''):
+            positions = match.group(2)
+            tf[row, columns[match.group(1)]] = positions.count(',') + 1 if positions else 1
+    return tf
+
+
+def _or_tsquery(lexemes: List[str]):
+    """任一词项命中的 tsquery"""
+    return func.to_tsquery(FULLTEXT_CONFIG, ' | '.join(f"'{_quote_lexeme(lexeme)}'" for lexeme in lexemes))
+
+
+# ---------------- 交叉编码器重排 ----------------
+
+class Reranker:
+    """
+    交叉编码器重排（本地模型，CPU推理）
+
+    模型在首次使用时加载；对 (查询, 段落) 逐对打分，只用于融合后的前若干条结果。
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        device: Optional[str] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.model_name = model_name or settings.RERANK_MODEL_NAME
+        self.device = device or settings.RERANK_DEVICE
+        self.batch_size = batch_size or settings.RERANK_BATCH_SIZE
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """首次使用时加载模型"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    logger.info(f"加载重排模型: {self.model_name} ({self.device})")
+                    self._model = CrossEncoder(
+                        self.model_name,
+                        device=self.device,
+                        max_length=settings.RERANK_MAX_LENGTH
+                    )
+        return self._model
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        """
+        对 (查询, 段落) 打分
+        :param query: 查询文本
+        :param passages: 段落列表
+        :return: (len(passages),) 相关度分数
+        """
+        if not passages:
+            return np.zeros(0, dtype='float32')
+        scores = self.model.predict(
+            [(query, passage) for passage in passages],
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.asarray(scores, dtype='float32')
+
+
+# 全局重排实例
+reranker = Reranker()
+
+
+# ---------------- AsyncSession 版本（供 async 路由使用） ----------------
+
+# (user_id, 文档范围, 词项) -> 文档频率；段落只在文档处理完成时批量变化，短时间缓存足够准确
+_df_cache = LRUCache(maxsize=10000, ttl=settings.HYBRID_DF_CACHE_TTL)
+
+async def _query_lexemes_async(db: AsyncSession, terms: List[str]) -> List[str]:
+    """用数据库同样的解析方式把查询词转成词项，保证与段落 tsvector 中的词项一致"""
+    if not terms:
+        return []
+    tsvector_text = await db.scalar(
+        select(func.cast(func.to_tsvector(FULLTEXT_CONFIG, ' '.join(terms)), Text))
+    )
+    return list(dict.fromkeys(parse_lexemes(tsvector_text)))
+
+
+async def _document_frequencies_async(
+    db: AsyncSession,
+    user_id: str,
+    lexemes: List[str],
+    document_ids: Optional[List[str]] = None
+) -> np.ndarray:
+    """
+    查询词项的文档频率（BM25 的 IDF）
+    每个词项最多计数 HYBRID_DF_MAX_COUNT 个命中段落，结果短时间缓存，
+    常见词的统计耗时不随段落表增长。
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param lexemes: 词项列表
+    :param document_ids: 只统计这些文档
+    :return: (词数,) 文档频率
+    """
+    scope_key = tuple(sorted(document_ids)) if document_ids else None
+    df = np.zeros(len(lexemes), dtype='float32')
+    missing = []
+    for i, lexeme in enumerate(lexemes):
+        cached = _df_cache.get((user_id, scope_key, lexeme))
+        if cached is None:
+            missing.append(i)
+        else:
+            df[i] = cached
+    if not missing:
+        return df
+
+    scope = [Document.user_id == user_id, Document.is_active.is_(True)]
+    if document_ids:
+        scope.append(Paragraph.document_id.in_(document_ids))
+    counts = []
+    for i in missing:
+        matched = (
+            select(Paragraph.id)
+            .join(Document, Document.id == Paragraph.document_id)
+            .where(Paragraph.search_vector.op('@@')(_or_tsquery([lexemes[i]])), *scope)
+            .limit(settings.HYBRID_DF_MAX_COUNT)
+            .subquery()
+        )
+        counts.append(select(func.count()).select_from(matched).scalar_subquery())
+    row = (await db.execute(select(*counts))).one()
+    for i, count in zip(missing, row):
+        df[i] = count
+        _df_cache.set((user_id, scope_key, lexemes[i]), int(count))
+    return df
+
+
+async def _lexical_recall_async(
+    db: AsyncSession,
+    user_id: str,
+    query: str,
+    candidates: int,
+    document_ids: Optional[List[str]] = None
+):
+    """
+    词法一路召回
+    按文档频率分层取候选（见 split_recall_terms）：稀有词的命中全部保留，常见词的命中按 ts_rank_cd
+    取前若干个；再对候选并集计算 BM25，取前 candidates 个。候选数与常见词的命中数无关，
+    条款编号这类罕见词在与常见词混合查询时也不会在打分前被截掉。
+    :return: (词项, 候选段落ID, 文档频率, 段落总数)
+    """
+    lexemes = await _query_lexemes_async(db, segment_query(query))
+    if not lexemes:
+        return lexemes, [], np.zeros(0, dtype='float32'), 0
+
+    # 段落总数取自文档统计（每个文档一行）
+    doc_scope = [Document.user_id == user_id, Document.is_active.is_(True)]
+    if document_ids:
+        doc_scope.append(Document.id.in_(document_ids))
+    total_docs = int(await db.scalar(
+        select(func.coalesce(func.sum(Document.total_paragraphs), 0)).where(*doc_scope)
+    ))
+    df = await _document_frequencies_async(db, user_id, lexemes, document_ids)
+
+    budget = settings.HYBRID_LEXICAL_MAX_CANDIDATES
+    rare, common = split_recall_terms(df, budget, settings.HYBRID_DF_MAX_COUNT)
+    scope = [Document.user_id == user_id, Document.is_active.is_(True)]
+    if document_ids:
+        scope.append(Paragraph.document_id.in_(document_ids))
+
+    tiers = []
+    if rare:
+        tiers.append(
+            select(Paragraph.id)
+            .join(Document, Document.id == Paragraph.document_id)
+            .where(Paragraph.search_vector.op('@@')(_or_tsquery([lexemes[i] for i in rare])), *scope)
+        )
+    if common:
+        common_query = _or_tsquery([lexemes[i] for i in common])
+        tiers.append(
+            select(Paragraph.id)
+            .join(Document, Document.id == Paragraph.document_id)
+            .where(Paragraph.search_vector.op('@@')(common_query), *scope)
+            .order_by(desc(func.ts_rank_cd(Paragraph.search_vector, common_query)), Paragraph.id)
+            .limit(max(candidates, budget - int(df[rare].sum())))
+        )
+    matched = (tiers[0] if len(tiers) == 1 else union(*[tier.subquery().select() for tier in tiers])).subquery()
+
+    # 对候选并集计算 BM25（只读取词项，不读取段落内容）
+    result = await db.execute(
+        select(
+            Paragraph.id,
+            func.coalesce(Paragraph.character_count, func.char_length(Paragraph.content)),
+            func.cast(Paragraph.search_vector, Text)
+        )
+        .join(matched, matched.c.id == Paragraph.id)
+    )
+    rows = result.all()
+    if not rows:
+        return lexemes, [], df, total_docs
+    tf = term_frequency_matrix([row[2] for row in rows], lexemes)
+    doc_len = np.asarray([row[1] or 1 for row in rows], dtype='float32')
+    scores = bm25_scores(tf, doc_len, df, total_docs, k1=settings.BM25_K1, b=settings.BM25_B)
+    # 分数相同时按段落ID排序，结果与读取顺序无关
+    order = sorted(range(len(rows)), key=lambda i: (-scores[i], rows[i][0]))[:candidates]
+    return lexemes, [rows[i][0] for i in order], df, total_docs
+
+
+async def hybrid_search_async(
+    db: AsyncSession,
+    user_id: str,
+    query: str,
+    top_k: int = 10,
+    document_ids: Optional[List[str]] = None,
+    fusion: str = 'rrf',
+    vector_weight: Optional[float] = None,
+    rerank: bool = False
+) -> Dict[str, Any]:
+    """
+    混合检索用户文档中的段落
+
+    两路各召回 HYBRID_CANDIDATES 个候选：词法一路用GIN索引按文档频率分层取候选并按BM25排序，
+    向量一路用FAISS检索（在线程池中与数据库查询并行）；对候选并集用NumPy计算BM25
+    （IDF 取用户全部有效文档的统计），与向量相似度按 RRF 或加权方式融合，
+    需要时再用交叉编码器对前 RERANK_TOP_N 条重排。
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param query: 查询文本
+    :param top_k: 返回数量
+    :param document_ids: 只在这些文档中检索
+    :param fusion: 融合方式（rrf / weighted）
+    :param vector_weight: 加权融合时向量相似度的权重
+    :param rerank: 是否用交叉编码器重排
+    :return: {"results": 结果列表, "timings": 各阶段耗时(ms)}
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    def lap(stage: str):
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = round((now - started) * 1000, 1)
+        started = now
+    candidates = settings.HYBRID_CANDIDATES
+
+    vector_task = None
+    if settings.EMBEDDING_ENABLED:
+        def vector_search():
+            query_vector = embedding_service.encode_query(query)
+            return vector_store.search(user_id, query_vector, top_k=candidates, document_ids=document_ids)
+        vector_task = asyncio.create_task(asyncio.to_thread(vector_search))
+
+    try:
+        lexemes, lexical_ids, df, total_docs = await _lexical_recall_async(
+            db, user_id, query, candidates, document_ids
+        )
+        lap('lexical_ms')
+
+        vector_hits: Dict[int, float] = {}
+        if vector_task is not None:
+            try:
+                vector_hits = dict(await vector_task)
+            except Exception as e:
+                logger.error(f"混合检索的向量召回失败: {str(e)}")
+        lap('vector_ms')
+    finally:
+        # 词法召回出错时不再等待向量一路，取消任务避免其结果和异常无人处理
+        if vector_task is not None:
+            vector_task.cancel()
+
+    scope = [Document.user_id == user_id, Document.is_active.is_(True)]
+    if document_ids:
+        scope.append(Paragraph.document_id.in_(document_ids))
+
+    if not lexical_ids and not vector_hits:
+        return {"results": [], "timings": timings}
+
+    # 加载候选并集
+    recall = []
+    if lexical_ids:
+        recall.append(Paragraph.id.in_(lexical_ids))
+    if vector_hits:
+        recall.append(Paragraph.vector_id.in_(list(vector_hits)))
+    result = await db.execute(
+        select(
+            Paragraph.id,
+            Paragraph.vector_id,
+            Paragraph.document_id,
+            Paragraph.paragraph_index,
+            Paragraph.content,
+            Paragraph.character_count,
+            func.cast(Paragraph.search_vector, Text),
+            Document.filename
+        )
+        .join(Document, Document.id == Paragraph.document_id)
+        .where(and_(or_(*recall), *scope))
+    )
+    rows = result.all()
+    lap('load_ms')
+    if not rows:
+        return {"results": [], "timings": timings}
+
+    # 融合打分
+    tf = term_frequency_matrix([row[6] for row in rows], lexemes)
+    doc_len = np.asarray([row.character_count or len(row.content) for row in rows], dtype='float32')
+    # 没有命中任何查询词的候选（仅由向量召回）不参与词法一路的排名
+    lexical = np.full(len(rows), np.nan, dtype='float32')
+    if lexemes:
+        matched = tf.sum(axis=1) > 0
+        lexical[matched] = bm25_scores(
+            tf, doc_len, df, total_docs, k1=settings.BM25_K1, b=settings.BM25_B
+        )[matched]
+    vector = np.asarray([vector_hits.get(row.vector_id, np.nan) for row in rows], dtype='float32')
+    fused = fuse(lexical, vector, method=fusion, vector_weight=vector_weight)
+
+    limit = max(top_k, settings.RERANK_TOP_N) if rerank else top_k
+    order = np.argsort(-fused, kind='stable')[:limit]
+    lap('fusion_ms')
+
+    rerank_scores = None
+    if rerank and order.size:
+        rerank_scores = await asyncio.to_thread(
+            reranker.score, query, [rows[i].content for i in order]
+        )
+        reranked = np.argsort(-rerank_scores, kind='stable')
+        order, rerank_scores = order[reranked], rerank_scores[reranked]
+        lap('rerank_ms')
+
+    results = []
+    for position, i in enumerate(order[:top_k]):
+        row = rows[i]
+        results.append({
+            "paragraph_id": row.id,
+            "document_id": row.document_id,
+            "filename": row.filename,
+            "paragraph_index": row.paragraph_index,
+            "content": row.content,
+            "score": float(fused[i]),
+            "bm25": None if np.isnan(lexical[i]) else float(lexical[i]),
+            "vector_score": None if np.isnan(vector[i]) else float(vector[i]),
+            "rerank_score": None if rerank_scores is None else float(rerank_scores[position])
+        })
+    return {"results": results, "timings": timings}
@@ -6,11 +6,12 @@
     @desc: LangChain集成服务，实现对话历史学习
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
+from app.services.context_builder import ContextWindowBuilder, SUMMARY_PROMPT, KNOWLEDGE_PROMPT
 from config import settings
 
 
@@ -24,6 +25,7 @@ class LangChainService:
         初始化LangChain服务
         """
         self.llm = None
+        self.context_builder = ContextWindowBuilder()
         
         # 如果配置了DeepSeek API密钥，则初始化LLM
         if hasattr(settings, 'DEEPSEEK_API_KEY') and settings.DEEPSEEK_API_KEY:
@@ -38,7 +40,9 @@ class LangChainService:
                 openai_api_key=settings.DEEPSEEK_API_KEY,
                 base_url=settings.DEEPSEEK_BASE_URL,
                 model=settings.DEEPSEEK_MODEL,
-                temperature=0.7
+                temperature=0.7,
+                # 流式响应的最后一块带上本次调用的token用量
+                stream_usage=True
             )
             print("DeepSeek LLM初始化成功")
         except Exception as e:
@@ -47,13 +51,15 @@ class LangChainService:
     async def generate_response(
         self,
         user_message: str,
-        conversation_history: List[Dict[str, Any]] = None
+        conversation_history: List[Dict[str, Any]] = None,
+        summary: str = None
     ) -> Dict[str, Any]:
         """
-        基于对话历史生成AI回复
+        基于对话历史生成AI回复（历史按token预算裁剪）
         
         :param user_message: 用户消息
-        :param conversation_history: 对话历史
+        :param conversation_history: 总结检查点之后的对话历史
+        :param summary: 早期对话的滚动总结
         :return: 包含AI回复和元数据的字典
         """
         try:
@@ -61,21 +67,14 @@ class LangChainService:
                 return {
                     "success": False,
                     "response": None,
-                    "memory_used": len(conversation_history) if conversation_history else 0,
+                    "memory_used": 0,
+                    "context_tokens": 0,
                     "error": "LLM未初始化，请配置DEEPSEEK_API_KEY"
                 }
             
-            # 构建消息列表
-            messages = []
-            
-            if conversation_history:
-                for msg in conversation_history:
-                    if msg.get('role') == 'user':
-                        messages.append(HumanMessage(content=msg.get('content', '')))
-                    elif msg.get('role') == 'assistant':
-                        messages.append(AIMessage(content=msg.get('content', '')))
-            
-            messages.append(HumanMessage(content=user_message))
+            # 按token预算选取历史并构建消息列表
+            context_window = self.build_context(user_message, conversation_history, summary)
+            messages = self._build_messages(user_message, context_window["messages"], summary)
             
             # 生成回复
             response = await self.llm.ainvoke(messages)
@@ -83,7 +82,8 @@ class LangChainService:
             return {
                 "success": True,
                 "response": response.content,
-                "memory_used": len(conversation_history) if conversation_history else 0,
+                "memory_used": context_window["message_count"],
+                "context_tokens": context_window["token_count"],
                 "error": None
             }
             
@@ -91,39 +91,126 @@ class LangChainService:
             return {
                 "success": False,
                 "response": None,
-                "memory_used": len(conversation_history) if conversation_history else 0,
+                "memory_used": 0,
+                "context_tokens": 0,
                 "error": str(e)
             }
     
-    async def summarize_conversation(
+    async def stream_response(
         self,
-        conversation_history: List[Dict[str, Any]]
+        user_message: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        context_window: Dict[str, Any] = None,
+        usage: Dict[str, Any] = None
+    ) -> AsyncIterator[str]:
+        """
+        基于对话历史流式生成AI回复，模型每产出一段增量就立即返回
+        
+        :param user_message: 用户消息
+        :param conversation_history: 对话历史
+        :param context_window: 已构建的上下文窗口（为空时按对话历史构建）
+        :param usage: 可选字典，流结束后写入模型返回的token用量（input_tokens/output_tokens/total_tokens）
+        :return: 回复文本增量的异步迭代器
+        """
+        if not self.llm:
+            raise RuntimeError("LLM未初始化，请配置DEEPSEEK_API_KEY")
+        
+        if context_window is None:
+            context_window = self.build_context(user_message, conversation_history)
+        messages = self._build_messages(
+            user_message,
+            context_window["messages"],
+            context_window.get("summary"),
+            context_window.get("knowledge")
+        )
+        
+        async for chunk in self.llm.astream(messages):
+            if usage is not None and chunk.usage_metadata:
+                usage.update(chunk.usage_metadata)
+            if chunk.content:
+                yield chunk.content
+    
+    def build_context(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        summary: str = None,
+        knowledge: str = None
     ) -> Dict[str, Any]:
         """
-        对话总结
+        按token预算从最新消息开始选取对话历史
         
+        :param user_message: 用户消息
         :param conversation_history: 对话历史
-        :return: 包含总结和元数据的字典
+        :param summary: 早期对话的滚动总结
+        :param knowledge: 从用户文档检索到的参考资料
+        :return: 上下文窗口（summary/knowledge/messages/message_count/token_count/max_tokens）
+        """
+        return self.context_builder.build(user_message, conversation_history, summary=summary, knowledge=knowledge)
+    
+    def _build_messages(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        summary: str = None,
+        knowledge: str = None
+    ) -> List[Any]:
+        """
+        将对话历史和当前用户消息转换为LangChain消息列表
+        
+        :param user_message: 用户消息
+        :param conversation_history: 对话历史
+        :param summary: 早期对话的滚动总结
+        :param knowledge: 从用户文档检索到的参考资料（带 [编号]）
+        :return: LangChain消息列表
+        """
+        messages = []
+        
+        if summary:
+            messages.append(SystemMessage(content=SUMMARY_PROMPT + summary))
+        
+        if knowledge:
+            messages.append(SystemMessage(content=KNOWLEDGE_PROMPT + knowledge))
+        
+        if conversation_history:
+            for msg in conversation_history:
+                if msg.get('role') == 'user':
+                    messages.append(HumanMessage(content=msg.get('content', '')))
+                elif msg.get('role') == 'assistant':
+                    messages.append(AIMessage(content=msg.get('content', '')))
+        
+        messages.append(HumanMessage(content=user_message))
+        return messages
+    
+    async def fold_summary(
+        self,
+        existing_summary: str,
+        new_messages: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        增量总结：只把新增消息合并进已有总结
+        
+        :param existing_summary: 已有总结（可为空）
+        :param new_messages: 上次检查点之后新增的消息
+        :return: 包含更新后总结和元数据的字典
         """
         try:
             if not self.llm:
                 return {
                     "success": False,
-                    "summary": None,
-                    "message_count": len(conversation_history),
+                    "summary": existing_summary,
                     "error": "LLM未初始化，请配置DEEPSEEK_API_KEY"
                 }
             
-            # 构建对话文本
             conversation_text = "\n".join([
                 f"{msg.get('role', 'user')}: {msg.get('content', '')}"
-                for msg in conversation_history
+                for msg in new_messages
             ])
             
-            # 生成总结
             messages = [
-                SystemMessage(content="你是一个对话总结专家。请用中文总结以下对话的主要内容。"),
-                HumanMessage(content=f"请总结以下对话：\n\n{conversation_text}")
+                SystemMessage(content="你是一个对话总结专家。请在已有总结的基础上合并新增的对话内容，"
+                                      "输出更新后的完整总结，保留关键事实、用户需求和结论，使用中文，不超过500字。"),
+                HumanMessage(content=f"已有总结：\n{existing_summary or '（无）'}\n\n新增对话：\n{conversation_text}")
             ]
             
             response = await self.llm.ainvoke(messages)
@@ -131,15 +218,13 @@ class LangChainService:
             return {
                 "success": True,
                 "summary": response.content,
-                "message_count": len(conversation_history),
                 "error": None
             }
             
         except Exception as e:
             return {
                 "success": False,
-                "summary": None,
-                "message_count": len(conversation_history),
+                "summary": existing_summary,
                 "error": str(e)
             }
     
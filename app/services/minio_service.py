@@ -13,8 +13,11 @@ from pathlib import Path
 from typing import Optional
 from datetime import timedelta
 import logging
+import mimetypes
+import os
 
 from config import settings
+from app.services.document_parsers.image_sink import ImageSink
 
 logger = logging.getLogger(__name__)
 
@@ -258,4 +261,47 @@ class MinIOService:
             raise
 
 
+class MinIOImageSink(ImageSink):
+    """把解析出的图片直接写入MinIO的文档前缀下（如 documents/<id>/images/）
+
+    会随解析任务pickle到解析进程，每个进程按需创建自己的MinIO客户端，
+    不复用父进程fork过来的连接池。
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix.rstrip('/')
+        self.bucket_name = settings.MINIO_BUCKET_NAME
+        self._client = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_client'] = None
+        state['_pid'] = None
+        return state
+
+    def _get_client(self) -> Minio:
+        if self._client is None or self._pid != os.getpid():
+            self._client = Minio(
+                endpoint=settings.MINIO_ENDPOINT_URL,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_SECURE
+            )
+            self._pid = os.getpid()
+        return self._client
+
+    def put(self, data: bytes, name: str, extension: str) -> str:
+        object_name = f"{self.prefix}/{name}.{extension}"
+        content_type = mimetypes.guess_type(object_name)[0] or "application/octet-stream"
+        self._get_client().put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_name,
+            data=BytesIO(data),
+            length=len(data),
+            content_type=content_type
+        )
+        return object_name
+
+
 minio_service = MinIOService()
\ No newline at end of file
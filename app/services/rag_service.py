@@ -0,0 +1,109 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: rag_service
+    @date: 2026/2/22
+    @desc: 基于用户文档的检索增强（在延迟预算内检索段落，按token上限拼接参考资料）
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.core.tokenizer import count_tokens, truncate_tokens
+from app.services.document_service import AsyncDocumentService
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 参考资料截断后至少保留的token数，少于该值的片段不再加入
+MIN_PASSAGE_TOKENS = 32
+
+
+def _format_passage(index: int, hit: Dict[str, Any]) -> str:
+    return f"[{index}] 《{hit['filename']}》第{hit['paragraph_index'] + 1}段：\n{hit['content']}"
+
+
+def build_knowledge(hits: List[Dict[str, Any]], max_tokens: int) -> Dict[str, Any]:
+    """
+    按相似度顺序拼接参考资料，总token数不超过上限
+    :param hits: 检索结果（按相似度降序）
+    :param max_tokens: 参考资料token上限
+    :return: {"knowledge": 参考资料文本或None, "citations": 引用列表, "knowledge_tokens": token数}
+    """
+    passages = []
+    citations = []
+    used = 0
+
+    for hit in hits:
+        remaining = max_tokens - used
+        if remaining < MIN_PASSAGE_TOKENS:
+            break
+        passage = _format_passage(len(citations) + 1, hit)
+        tokens = count_tokens(passage)
+        if tokens > remaining:
+            passage = truncate_tokens(passage, remaining)
+            tokens = count_tokens(passage)
+        passages.append(passage)
+        used += tokens
+        citations.append({
+            "index": len(citations) + 1,
+            "document_id": hit["document_id"],
+            "filename": hit["filename"],
+            "paragraph_id": hit["paragraph_id"],
+            "paragraph_index": hit["paragraph_index"],
+            "score": round(hit["score"], 4)
+        })
+
+    return {
+        "knowledge": "\n\n".join(passages) if passages else None,
+        "citations": citations,
+        "knowledge_tokens": used
+    }
+
+
+async def retrieve_document_context_async(
+    db: AsyncSession,
+    user_id: str,
+    query: str,
+    top_k: Optional[int] = None,
+    document_ids: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    从用户文档中检索与问题相关的段落（AsyncSession 版本）
+
+    检索超过 RAG_RETRIEVAL_TIMEOUT_MS 时放弃检索，本次回答不带参考资料。
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param query: 用户问题
+    :param top_k: 检索段落数，默认 RAG_TOP_K
+    :param document_ids: 只在这些文档中检索
+    :return: {"knowledge", "citations", "knowledge_tokens", "retrieval_ms", "timed_out"}
+    """
+    started = time.perf_counter()
+    timed_out = False
+    hits: List[Dict[str, Any]] = []
+
+    if settings.EMBEDDING_ENABLED:
+        try:
+            hits = await AsyncDocumentService(db).semantic_search(
+                user_id,
+                query,
+                top_k=top_k or settings.RAG_TOP_K,
+                document_ids=document_ids,
+                timeout=settings.RAG_RETRIEVAL_TIMEOUT_MS / 1000
+            )
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.warning(f"文档检索超时（{settings.RAG_RETRIEVAL_TIMEOUT_MS}ms），本次回答不使用参考资料")
+        except Exception as e:
+            logger.error(f"文档检索失败: {str(e)}")
+
+    hits = [hit for hit in hits if hit["score"] >= settings.RAG_MIN_SCORE]
+    context = build_knowledge(hits, settings.RAG_MAX_CONTEXT_TOKENS)
+    context["retrieval_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    context["timed_out"] = timed_out
+    return context
@@ -0,0 +1,136 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: refresh_session_service
+    @date: 2026/2/26
+    @desc: 刷新令牌会话存储（diskcache，多进程共享；按jti校验/撤销，按用户批量撤销）
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshSessionStore:
+    """
+    刷新令牌会话存储
+
+    每个刷新令牌带一个 jti：
+    - session:<jti> -> {user_id, email, is_superuser, created_at}，过期时间与令牌一致，tag 为用户ID
+    - rotated:<jti> -> user_id，已轮换掉的旧令牌，保留到原令牌过期
+
+    刷新时按 jti 原子地取出并删除会话（一次 O(1) 读写，不查 users 表），再签发新的 jti；
+    已轮换的旧令牌再次被使用说明令牌可能泄露，撤销该用户全部会话。
+    退出登录删除单个会话，禁用用户或修改密码时按 tag 批量撤销；过期条目由 sweep 批量清理。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.REFRESH_SESSION_DIR
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        """首次使用时打开存储目录"""
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    import diskcache
+                    # 按用户批量撤销依赖 tag 索引
+                    self._cache = diskcache.Cache(self.directory, tag_index=True)
+        return self._cache
+
+    def create(self, user_id: str, email: str, is_superuser: bool, ttl_seconds: float) -> str:
+        """
+        登记新的刷新令牌会话
+        :param user_id: 用户ID
+        :param email: 邮箱（刷新时签发 access_token 使用）
+        :param is_superuser: 是否超级管理员
+        :param ttl_seconds: 有效期（秒），与刷新令牌的 exp 一致
+        :return: jti
+        """
+        jti = uuid.uuid4().hex
+        self.cache.set(
+            f"session:{jti}",
+            {
+                'user_id': user_id,
+                'email': email,
+                'is_superuser': bool(is_superuser),
+                'created_at': time.time()
+            },
+            expire=ttl_seconds,
+            tag=user_id
+        )
+        return jti
+
+    def rotate(self, jti: str, ttl_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        取出并作废会话（每个刷新令牌只能使用一次）
+        :param jti: 刷新令牌的 jti
+        :param ttl_seconds: 旧令牌剩余有效期，在此期间记住它以识别重复使用
+        :return: 会话信息，令牌已失效时返回None
+        """
+        session = self.cache.pop(f"session:{jti}")
+        if session is not None:
+            if ttl_seconds and ttl_seconds > 0:
+                self.cache.set(f"rotated:{jti}", session['user_id'], expire=ttl_seconds, tag=session['user_id'])
+            return session
+
+        user_id = self.cache.get(f"rotated:{jti}")
+        if user_id is not None:
+            revoked = self.revoke_user(user_id)
+            logger.warning(f"已轮换的刷新令牌被重复使用，撤销用户 {user_id} 的 {revoked} 个会话")
+        return None
+
+    def revoke(self, jti: str) -> bool:
+        """
+        撤销单个会话（退出登录）
+        :param jti: 刷新令牌的 jti
+        :return: 会话是否存在
+        """
+        return self.cache.pop(f"session:{jti}") is not None
+
+    def revoke_user(self, user_id: str) -> int:
+        """
+        撤销用户的全部会话
+        :param user_id: 用户ID
+        :return: 删除的条目数
+        """
+        return self.cache.evict(user_id)
+
+    def sweep(self) -> int:
+        """
+        批量删除已过期的会话
+        :return: 删除的条目数
+        """
+        return self.cache.expire()
+
+    async def run_sweeper(self, interval: Optional[float] = None):
+        """后台定期清理过期会话（在应用生命周期中作为任务运行）"""
+        interval = interval or settings.REFRESH_SESSION_SWEEP_INTERVAL_SECONDS
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.sweep)
+                if removed:
+                    logger.info(f"清理过期刷新令牌会话: {removed} 条")
+            except Exception as e:
+                logger.warning(f"清理刷新令牌会话失败: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取会话存储的条目数和占用空间"""
+        return {
+            'entries': len(self.cache),
+            'size_bytes': self.cache.volume()
+        }
+
+
+# 全局刷新令牌会话存储实例
+refresh_session_store = RefreshSessionStore()
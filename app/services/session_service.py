@@ -7,13 +7,20 @@
 """
 
 import uuid
+from typing import Optional
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.common.core.pagination import Keyset
 from app.common.core.result import AppApiException
 from app.models import Session
 from app.schemas.session import SessionCreate
 
+# 会话列表按 (created_at, id) 倒序，游标分页与索引 ix_sessions_user_created_id 一致
+SESSION_KEYSET = Keyset((Session.created_at, Session.id), key=lambda session: (session.created_at, session.id))
+
 
 def get_session(db: Session, session_id: str):
     """
@@ -25,19 +32,25 @@ def get_session(db: Session, session_id: str):
     return db.query(Session).filter(Session.id == session_id).first()
 
 
-def get_sessions(db: Session, user_id: str, skip: int = 0, limit: int = 100):
+def get_sessions(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """
     获取用户的会话历史
     :param db: 数据库会话
     :param user_id: 用户ID
     :param skip: 跳过记录数
     :param limit: 限制返回记录数
+    :param cursor: 上一页返回的游标（传入时忽略 skip）
     :return: 会话列表
     """
-    return db.query(Session).filter(
+    query = db.query(Session).filter(
         Session.user_id == user_id,
         Session.is_active == True
-    ).order_by(Session.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    if cursor:
+        query = query.filter(SESSION_KEYSET.after(cursor))
+    else:
+        query = query.offset(skip)
+    return query.order_by(*SESSION_KEYSET.order_by()).limit(limit).all()
 
 
 def create_session(db: Session, user_id: str, session_create: SessionCreate):
@@ -79,3 +92,85 @@ def delete_session(db: Session, session_id: str, user_id: str):
     db.commit()
     db.refresh(db_session)
     return db_session
+
+
+# ---------------- AsyncSession 版本（供 async 路由使用） ----------------
+
+async def get_session_async(db: AsyncSession, session_id: str):
+    """
+    获取指定会话
+    :param db: 异步数据库会话
+    :param session_id: 会话ID
+    :return: 会话对象或None
+    """
+    result = await db.execute(select(Session).where(Session.id == session_id))
+    return result.scalars().first()
+
+
+async def get_sessions_async(
+    db: AsyncSession,
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """
+    获取用户的会话历史
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param skip: 跳过记录数
+    :param limit: 限制返回记录数
+    :param cursor: 上一页返回的游标（传入时忽略 skip）
+    :return: 会话列表
+    """
+    stmt = select(Session).where(
+        Session.user_id == user_id,
+        Session.is_active == True
+    )
+    if cursor:
+        stmt = stmt.where(SESSION_KEYSET.after(cursor))
+    else:
+        stmt = stmt.offset(skip)
+    result = await db.execute(stmt.order_by(*SESSION_KEYSET.order_by()).limit(limit))
+    return result.scalars().all()
+
+
+async def create_session_async(db: AsyncSession, user_id: str, session_create: SessionCreate):
+    """
+    创建新会话
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param session_create: 会话创建数据
+    :return: 创建的会话对象
+    """
+    db_session = Session(
+        id=str(uuid.uuid1()),
+        user_id=user_id,
+        session_name=session_create.session_name,
+        is_active=True
+    )
+    db.add(db_session)
+    await db.commit()
+    await db.refresh(db_session)
+    return db_session
+
+
+async def delete_session_async(db: AsyncSession, session_id: str, user_id: str):
+    """
+    删除会话
+    :param db: 异步数据库会话
+    :param session_id: 会话ID
+    :param user_id: 用户ID
+    :return: 删除的会话对象
+    """
+    db_session = await get_session_async(db, session_id)
+    if not db_session:
+        raise AppApiException(404, "会话不存在")
+    
+    if db_session.user_id != user_id:
+        raise AppApiException(403, "没有权限删除其他用户的会话")
+    
+    db_session.is_active = False
+    await db.commit()
+    await db.refresh(db_session)
+    return db_session
@@ -5,15 +5,20 @@
     @date: 2026/2/4
     @desc:
 """
+import asyncio
 import base64
 import uuid
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
 from app.common.core.result import AppApiException
-from app.common.core.security import get_password_hash, verify_password
+from app.common.core.security import get_password_hash, verify_password, password_hasher
 from app.models import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.auth_cache_service import invalidate_user
+from app.services.refresh_session_service import refresh_session_store
 
 
 def get_user(db: Session, user_id: str):
@@ -66,4 +71,113 @@ def update_user(db: Session, user_id: str, user_update: UserUpdate):
 
     db.commit()
     db.refresh(db_user)
+    invalidate_user(db_user.email)
+    if user_update.password is not None:
+        # 修改密码后已签发的刷新令牌全部失效
+        refresh_session_store.revoke_user(db_user.id)
+    return db_user
+
+
+def set_user_active(db: Session, user_id: str, is_active: bool):
+    """
+    启用/禁用用户（禁用后撤销全部刷新令牌，访问令牌在当前进程立即失效）
+    :param db: 数据库会话
+    :param user_id: 用户ID
+    :param is_active: 是否启用
+    :return: 用户对象
+    """
+    db_user = get_user(db, user_id)
+    if not db_user:
+        raise AppApiException(404, "用户不存在")
+
+    db_user.is_active = is_active
+    db.commit()
+    db.refresh(db_user)
+    invalidate_user(db_user.email)
+    if not is_active:
+        refresh_session_store.revoke_user(db_user.id)
+    return db_user
+
+
+# ---------------- AsyncSession 版本（供 async 路由使用） ----------------
+
+async def get_user_async(db: AsyncSession, user_id: str):
+    result = await db.execute(select(User).where(User.id == user_id))
+    return result.scalars().first()
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+async def get_user_by_username_async(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def get_users_async(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(User).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+async def create_user_async(db: AsyncSession, user: UserCreate):
+    if await get_user_by_email_async(db, user.email):
+        raise AppApiException(500, "邮箱已被注册")
+
+    if await get_user_by_username_async(db, user.username):
+        raise AppApiException(500, "用户名已被注册")
+
+    hashed_password = await password_hasher.hash(user.password)
+    db_user = User(
+        id=str(uuid.uuid1()),
+        email=user.email,
+        username=user.username,
+        hashed_password=hashed_password,
+        full_name=user.full_name
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def update_user_async(db: AsyncSession, user_id: str, user_update: UserUpdate):
+    db_user = await get_user_async(db, user_id)
+    if not db_user:
+        raise AppApiException(404, "用户不存在")
+
+    if user_update.full_name is not None:
+        db_user.full_name = user_update.full_name
+
+    if user_update.password is not None:
+        db_user.hashed_password = await password_hasher.hash(user_update.password)
+
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_user(db_user.email)
+    if user_update.password is not None:
+        # 修改密码后已签发的刷新令牌全部失效
+        await asyncio.to_thread(refresh_session_store.revoke_user, db_user.id)
+    return db_user
+
+
+async def set_user_active_async(db: AsyncSession, user_id: str, is_active: bool):
+    """
+    启用/禁用用户（AsyncSession 版本）
+    :param db: 异步数据库会话
+    :param user_id: 用户ID
+    :param is_active: 是否启用
+    :return: 用户对象
+    """
+    db_user = await get_user_async(db, user_id)
+    if not db_user:
+        raise AppApiException(404, "用户不存在")
+
+    db_user.is_active = is_active
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_user(db_user.email)
+    if not is_active:
+        await asyncio.to_thread(refresh_session_store.revoke_user, db_user.id)
     return db_user
@@ -0,0 +1,250 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: vector_store_service
+    @date: 2026/2/21
+    @desc: 段落向量索引（每个用户一个FAISS索引，持久化到磁盘）
+"""
+
+import logging
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.common.core.cache import LRUCache
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserVectorIndex:
+    """单个用户的FAISS索引及 文档ID -> 向量ID 映射"""
+
+    def __init__(self, index, doc_ids: Dict[str, np.ndarray], mtime: float = 0.0):
+        self.index = index
+        self.doc_ids = doc_ids
+        self.mtime = mtime
+        # 有未落盘的修改（分批写入文档向量期间），此时不能被换出或从磁盘重新加载
+        self.dirty = False
+        self.lock = threading.RLock()
+
+
+class VectorStore:
+    """
+    段落向量存储
+
+    每个用户一个索引文件（<user_id>.faiss）和一个文档映射文件（<user_id>.docs.pkl），
+    向量ID为 Paragraph.vector_id。向量数较少时使用精确的 IndexIDMap2(IndexFlatIP)，
+    超过 VECTOR_IVF_MIN_VECTORS 后转为 IndexIVFFlat（nlist≈4√N，按 VECTOR_INDEX_NPROBE
+    个倒排桶检索），百万级段落下单次检索仍在毫秒级。已加载的索引按LRU缓存在内存中，
+    其他进程更新了索引文件时会重新加载；有未落盘修改的索引固定在内存中，直到 save。
+    """
+
+    def __init__(self, directory: Optional[str] = None, cache_size: Optional[int] = None):
+        self.directory = directory or settings.VECTOR_INDEX_DIR
+        self._indexes = LRUCache(maxsize=cache_size or settings.VECTOR_INDEX_CACHE_SIZE)
+        # user_id -> 有未落盘修改的索引（不受LRU容量限制）
+        self._pinned: Dict[str, UserVectorIndex] = {}
+        self._load_lock = threading.Lock()
+        self._faiss = None
+
+    @property
+    def faiss(self):
+        """首次使用时导入faiss并设置检索线程数"""
+        if self._faiss is None:
+            import faiss
+            if settings.VECTOR_INDEX_OMP_THREADS > 0:
+                faiss.omp_set_num_threads(settings.VECTOR_INDEX_OMP_THREADS)
+            self._faiss = faiss
+        return self._faiss
+
+    def _paths(self, user_id: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.directory, f"{user_id}.faiss"),
+            os.path.join(self.directory, f"{user_id}.docs.pkl")
+        )
+
+    def _get(self, user_id: str, create: bool = False, dimension: Optional[int] = None) -> Optional[UserVectorIndex]:
+        """获取用户索引（未落盘的索引 -> 内存缓存 -> 磁盘 -> 新建）"""
+        entry = self._pinned.get(user_id)
+        if entry is not None:
+            return entry
+
+        index_path, docs_path = self._paths(user_id)
+        mtime = os.path.getmtime(index_path) if os.path.exists(index_path) else 0.0
+
+        entry = self._indexes.get(user_id)
+        if entry is not None and entry.mtime >= mtime:
+            return entry
+
+        with self._load_lock:
+            entry = self._pinned.get(user_id) or self._indexes.get(user_id)
+            if entry is not None and (entry.dirty or entry.mtime >= mtime):
+                return entry
+
+            if mtime:
+                index = self.faiss.read_index(index_path)
+                self._set_nprobe(index)
+                with open(docs_path, 'rb') as f:
+                    doc_ids = pickle.load(f)
+            elif create and dimension:
+                index = self.faiss.IndexIDMap2(self.faiss.IndexFlatIP(dimension))
+                doc_ids = {}
+            else:
+                return None
+
+            entry = UserVectorIndex(index, doc_ids, mtime)
+            self._indexes.set(user_id, entry)
+            return entry
+
+    def _mark_dirty(self, user_id: str, entry: UserVectorIndex):
+        """调用方需持有 entry.lock"""
+        entry.dirty = True
+        with self._load_lock:
+            self._pinned[user_id] = entry
+
+    def _set_nprobe(self, index):
+        try:
+            self.faiss.extract_index_ivf(index).nprobe = settings.VECTOR_INDEX_NPROBE
+        except RuntimeError:
+            pass
+
+    def _save(self, user_id: str, entry: UserVectorIndex):
+        """写临时文件后原子替换，避免其他进程读到写了一半的索引"""
+        os.makedirs(self.directory, exist_ok=True)
+        index_path, docs_path = self._paths(user_id)
+        self.faiss.write_index(entry.index, f"{index_path}.tmp")
+        with open(f"{docs_path}.tmp", 'wb') as f:
+            pickle.dump(entry.doc_ids, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{docs_path}.tmp", docs_path)
+        os.replace(f"{index_path}.tmp", index_path)
+        entry.mtime = os.path.getmtime(index_path)
+        entry.dirty = False
+        with self._load_lock:
+            if self._pinned.get(user_id) is entry:
+                del self._pinned[user_id]
+            self._indexes.set(user_id, entry)
+
+    def _maybe_convert_to_ivf(self, entry: UserVectorIndex):
+        """精确索引超过阈值后转为IVF索引"""
+        faiss = self.faiss
+        index = entry.index
+        if not isinstance(index, faiss.IndexIDMap2) or index.ntotal < settings.VECTOR_IVF_MIN_VECTORS:
+            return
+
+        ntotal = index.ntotal
+        vectors = faiss.downcast_index(index.index).reconstruct_n(0, ntotal)
+        ids = faiss.vector_to_array(index.id_map).astype('int64')
+
+        nlist = max(1, int(4 * np.sqrt(ntotal)))
+        quantizer = faiss.IndexFlatIP(index.d)
+        ivf = faiss.IndexIVFFlat(quantizer, index.d, nlist, faiss.METRIC_INNER_PRODUCT)
+        # 训练样本取每个桶约64个向量即可
+        sample_size = min(ntotal, nlist * 64)
+        sample = vectors[np.random.default_rng(0).choice(ntotal, sample_size, replace=False)]
+        ivf.train(sample)
+        ivf.add_with_ids(vectors, ids)
+        ivf.nprobe = settings.VECTOR_INDEX_NPROBE
+        entry.index = ivf
+        logger.info(f"向量索引转为IVF: {ntotal} 个向量，{nlist} 个倒排桶")
+
+    def add_vectors(self, user_id: str, document_id: str, vector_ids: np.ndarray, vectors: np.ndarray):
+        """
+        向用户索引追加一批文档向量（不落盘，写完整个文档后调用 save；在此之前索引固定在内存中）
+        :param user_id: 用户ID
+        :param document_id: 文档ID
+        :param vector_ids: 段落向量ID（int64）
+        :param vectors: 归一化后的向量（float32）
+        """
+        if len(vector_ids) == 0:
+            return
+        vector_ids = np.ascontiguousarray(vector_ids, dtype='int64')
+        entry = self._get(user_id, create=True, dimension=vectors.shape[1])
+        with entry.lock:
+            self._mark_dirty(user_id, entry)
+            entry.index.add_with_ids(vectors, vector_ids)
+            existing = entry.doc_ids.get(document_id)
+            entry.doc_ids[document_id] = (
+                vector_ids if existing is None else np.concatenate([existing, vector_ids])
+            )
+
+    def remove_document(self, user_id: str, document_id: str, save: bool = True) -> int:
+        """
+        从用户索引删除文档的全部向量
+        :param user_id: 用户ID
+        :param document_id: 文档ID
+        :param save: 是否立即落盘
+        :return: 删除的向量数
+        """
+        entry = self._get(user_id)
+        if entry is None:
+            return 0
+        with entry.lock:
+            vector_ids = entry.doc_ids.pop(document_id, None)
+            if vector_ids is None:
+                return 0
+            removed = entry.index.remove_ids(self.faiss.IDSelectorBatch(vector_ids))
+            if save:
+                self._save(user_id, entry)
+            else:
+                self._mark_dirty(user_id, entry)
+            return removed
+
+    def save(self, user_id: str):
+        """检查是否需要转为IVF索引，然后落盘"""
+        entry = self._get(user_id)
+        if entry is None:
+            return
+        with entry.lock:
+            self._maybe_convert_to_ivf(entry)
+            self._save(user_id, entry)
+
+    def search(
+        self,
+        user_id: str,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        相似度检索
+        :param user_id: 用户ID
+        :param query_vector: (1, dimension) 查询向量
+        :param top_k: 返回数量
+        :param document_ids: 只在这些文档中检索
+        :return: [(向量ID, 相似度)]，按相似度降序
+        """
+        entry = self._get(user_id)
+        if entry is None:
+            return []
+
+        with entry.lock:
+            if entry.index.ntotal == 0:
+                return []
+            params = None
+            if document_ids is not None:
+                selected = [entry.doc_ids[doc_id] for doc_id in document_ids if doc_id in entry.doc_ids]
+                if not selected:
+                    return []
+                selector = self.faiss.IDSelectorBatch(np.concatenate(selected))
+                if isinstance(entry.index, self.faiss.IndexIVF):
+                    params = self.faiss.SearchParametersIVF(sel=selector, nprobe=settings.VECTOR_INDEX_NPROBE)
+                else:
+                    params = self.faiss.SearchParameters(sel=selector)
+            scores, ids = entry.index.search(query_vector, min(top_k, entry.index.ntotal), params=params)
+
+        return [(int(vector_id), float(score)) for vector_id, score in zip(ids[0], scores[0]) if vector_id != -1]
+
+    def get_stats(self, user_id: str) -> Dict[str, int]:
+        """获取用户索引的向量数和文档数"""
+        entry = self._get(user_id)
+        if entry is None:
+            return {'vectors': 0, 'documents': 0}
+        return {'vectors': int(entry.index.ntotal), 'documents': len(entry.doc_ids)}
+
+
+# 全局向量存储实例
+vector_store = VectorStore()
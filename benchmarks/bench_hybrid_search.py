@@ -0,0 +1,220 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: bench_hybrid_search
+    @date: 2026/2/24
+    @desc: 混合检索基准：不同语料规模下 BM25 / 向量 / 融合检索的召回率与延迟
+
+    运行：python benchmarks/bench_hybrid_search.py [--sizes 1000,10000,100000] [--queries 200] [--top-k 10]
+         [--max-candidates 2000] [--df-max-count 20000]
+
+    语料与查询为合成数据（不依赖数据库和向量模型），打分与融合直接调用
+    hybrid_search_service 中的函数。每条查询有唯一的目标段落，分两类：
+      exact      取目标段落中最罕见的两个词（类似条款编号）并混入一个常见词，查询向量与目标只弱相关
+      paraphrase 用常见词改写（词法上几乎不命中目标），查询向量与目标强相关
+    召回率 = 目标段落出现在前 top-k 的查询占比。
+
+    bm25 与混合检索的词法一路按检索接口的方式截断候选（split_recall_terms：稀有词命中全部保留，
+    常见词命中按相关度取前若干个，文档频率计数封顶）；bm25_full 对全部命中打分，作为截断的对照。
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.hybrid_search_service import bm25_scores, fuse, split_recall_terms
+
+
+class SyntheticCorpus:
+    """合成语料：Zipf 分布的词序列 + 随机单位向量，附带倒排表"""
+
+    def __init__(self, size: int, vocab_size: int, length: int, dimension: int, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        self.size = size
+        self.vocab_size = vocab_size
+        # 词ID按Zipf分布抽样，小ID为常见词
+        self.tokens = np.minimum(rng.zipf(1.3, size=(size, length)) - 1, vocab_size - 1).astype('int64')
+        self.doc_len = np.full(size, length, dtype='float32')
+        self.avgdl = float(length)
+
+        vectors = rng.standard_normal((size, dimension)).astype('float32')
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        # (词, 段落) 去重计数 -> 按词排序的倒排表
+        keys, counts = np.unique(self.tokens * size + np.arange(size)[:, None], return_counts=True)
+        self.posting_terms = keys // size
+        self.posting_docs = keys % size
+        self.posting_tf = counts.astype('float32')
+        self.offsets = np.searchsorted(self.posting_terms, np.arange(vocab_size + 1))
+        self.df = np.diff(self.offsets).astype('float32')
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.offsets[term], self.offsets[term + 1]
+        return self.posting_docs[start:end], self.posting_tf[start:end]
+
+
+def make_queries(corpus: SyntheticCorpus, count: int, seed: int = 7) -> List[Dict]:
+    """生成 exact / paraphrase 两类查询，各占一半"""
+    rng = np.random.default_rng(seed)
+    dimension = corpus.vectors.shape[1]
+    queries = []
+    for i, target in enumerate(rng.choice(corpus.size, size=count, replace=False)):
+        noise = rng.standard_normal(dimension).astype('float32')
+        noise /= np.linalg.norm(noise)
+        terms = np.unique(corpus.tokens[target])
+        if i % 2 == 0:
+            kind = 'exact'
+            terms = np.concatenate([terms[np.argsort(corpus.df[terms])[:2]], rng.choice(20, size=1)])
+            weight = 0.2
+        else:
+            kind = 'paraphrase'
+            terms = np.concatenate([rng.choice(20, size=2, replace=False), terms[np.argsort(-corpus.df[terms])[:1]]])
+            weight = 0.6
+        vector = weight * corpus.vectors[target] + (1 - weight) * noise
+        queries.append({
+            'kind': kind,
+            'target': int(target),
+            'terms': np.unique(terms),
+            'vector': (vector / np.linalg.norm(vector)).reshape(1, -1).astype('float32')
+        })
+    return queries
+
+
+def lexical_search(
+    corpus: SyntheticCorpus,
+    terms: np.ndarray,
+    limit: int,
+    budget: Optional[int] = None,
+    max_df: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """倒排表取候选，向量化计算 BM25，返回前 limit 个 (段落, 分数)
+
+    传入 budget 时与检索接口一样截断候选：文档频率计数封顶为 max_df，按 split_recall_terms 分层，
+    稀有词的命中全部保留，常见词的命中按命中次数（近似 ts_rank_cd）取前若干个；不传时对全部命中打分。
+    """
+    postings = [corpus.postings(term) for term in terms]
+    df = corpus.df[terms]
+    if budget is None:
+        candidates = np.unique(np.concatenate([docs for docs, _ in postings]))
+    else:
+        df = np.minimum(df, max_df)
+        rare, common = split_recall_terms(df, budget, max_df)
+        tiers = [postings[i][0] for i in rare]
+        if common:
+            common_docs, inverse = np.unique(
+                np.concatenate([postings[i][0] for i in common]), return_inverse=True
+            )
+            coverage = np.bincount(inverse, weights=np.concatenate([postings[i][1] for i in common]))
+            keep = max(limit, budget - int(df[rare].sum()))
+            tiers.append(common_docs[np.lexsort((common_docs, -coverage))[:keep]])
+        candidates = np.unique(np.concatenate(tiers)) if tiers else np.zeros(0, dtype='int64')
+    tf = np.zeros((candidates.shape[0], len(terms)), dtype='float32')
+    for column, (docs, counts) in enumerate(postings):
+        kept = np.isin(docs, candidates)
+        tf[np.searchsorted(candidates, docs[kept]), column] = counts[kept]
+    scores = bm25_scores(tf, corpus.doc_len[candidates], df, corpus.size, avgdl=corpus.avgdl)
+    top = np.argsort(-scores, kind='stable')[:limit]
+    return candidates[top], scores[top]
+
+
+def vector_search(index, query_vector: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores, ids = index.search(query_vector, limit)
+    keep = ids[0] != -1
+    return ids[0][keep], scores[0][keep]
+
+
+def hybrid(lexical: Tuple[np.ndarray, np.ndarray], vector: Tuple[np.ndarray, np.ndarray], method: str) -> np.ndarray:
+    """两路候选取并集，缺失的一路记为 NaN，融合后按分数排序"""
+    candidates = np.union1d(lexical[0], vector[0])
+    lexical_scores = np.full(candidates.shape[0], np.nan, dtype='float32')
+    vector_scores = np.full(candidates.shape[0], np.nan, dtype='float32')
+    lexical_scores[np.searchsorted(candidates, lexical[0])] = lexical[1]
+    vector_scores[np.searchsorted(candidates, vector[0])] = vector[1]
+    fused = fuse(lexical_scores, vector_scores, method=method, rrf_k=60, vector_weight=0.5)
+    return candidates[np.argsort(-fused, kind='stable')]
+
+
+def run(size: int, args) -> List[Tuple[str, str, float, float, float]]:
+    import faiss
+
+    corpus = SyntheticCorpus(size, args.vocab_size, args.length, args.dimension)
+    index = faiss.IndexFlatIP(args.dimension)
+    index.add(corpus.vectors)
+    queries = make_queries(corpus, min(args.queries, size))
+
+    methods = ('bm25_full', 'bm25', 'vector', 'hybrid_rrf', 'hybrid_weighted')
+    hits = {(method, kind): [] for method in methods for kind in ('exact', 'paraphrase')}
+    latencies = {method: [] for method in methods}
+
+    for query in queries:
+        started = time.perf_counter()
+        full = lexical_search(corpus, query['terms'], args.candidates)
+        full_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        lexical = lexical_search(
+            corpus, query['terms'], args.candidates, budget=args.max_candidates, max_df=args.df_max_count
+        )
+        lexical_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        vector = vector_search(index, query['vector'], args.candidates)
+        vector_ms = (time.perf_counter() - started) * 1000
+
+        rankings = {'bm25_full': full[0], 'bm25': lexical[0], 'vector': vector[0]}
+        latencies['bm25_full'].append(full_ms)
+        latencies['bm25'].append(lexical_ms)
+        latencies['vector'].append(vector_ms)
+        for method in ('rrf', 'weighted'):
+            started = time.perf_counter()
+            rankings[f'hybrid_{method}'] = hybrid(lexical, vector, method)
+            # 混合检索的延迟 = 两路召回 + 融合
+            latencies[f'hybrid_{method}'].append(lexical_ms + vector_ms + (time.perf_counter() - started) * 1000)
+
+        for method, ranking in rankings.items():
+            hits[(method, query['kind'])].append(query['target'] in ranking[:args.top_k])
+
+    rows = []
+    for method in methods:
+        exact, paraphrase = hits[(method, 'exact')], hits[(method, 'paraphrase')]
+        rows.append((
+            method,
+            f"{np.mean(exact + paraphrase):.1%}",
+            f"{np.mean(exact):.1%} / {np.mean(paraphrase):.1%}",
+            float(np.percentile(latencies[method], 50)),
+            float(np.percentile(latencies[method], 95))
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hybrid search benchmark')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='语料段落数，逗号分隔')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--candidates', type=int, default=100, help='每路召回的候选数')
+    parser.add_argument('--max-candidates', type=int, default=2000, help='词法一路参与打分的候选上限（HYBRID_LEXICAL_MAX_CANDIDATES）')
+    parser.add_argument('--df-max-count', type=int, default=20000, help='文档频率计数上限（HYBRID_DF_MAX_COUNT）')
+    parser.add_argument('--vocab-size', type=int, default=50000)
+    parser.add_argument('--length', type=int, default=80, help='每个段落的词数')
+    parser.add_argument('--dimension', type=int, default=128)
+    args = parser.parse_args()
+
+    print(
+        f"top_k={args.top_k} candidates={args.candidates} max_candidates={args.max_candidates} "
+        f"df_max_count={args.df_max_count} queries={args.queries} dimension={args.dimension}"
+    )
+    print(f"{'paragraphs':>10} {'method':<16} {'recall@k':>9} {'exact / paraphrase':>20} {'p50_ms':>8} {'p95_ms':>8}")
+    for size in [int(size) for size in args.sizes.split(',') if size]:
+        for method, recall, by_kind, p50, p95 in run(size, args):
+            print(f"{size:>10} {method:<16} {recall:>9} {by_kind:>20} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+    @project: aihub
+    @Author: jiangkuanli
+    @file: bench_password_hashing
+    @date: 2026/2/25
+    @desc: 登录吞吐基准：bcrypt 在事件循环中直接校验 vs 在 PasswordHasher 线程池中校验
+
+    运行：python benchmarks/bench_password_hashing.py [--logins 64] [--concurrency 16,64,256] [--workers 4] [--max-queue 64]
+
+    每轮并发发起 N 次密码校验，同时用一个每10ms醒来一次的协程测量事件循环延迟
+    （相当于流式回复中每个分片的额外卡顿）。输出吞吐、登录延迟、事件循环最大延迟和被拒绝（503）的次数。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.common.core.result import AppApiException
+from app.common.core.security import PasswordHasher, pwd_context
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: List[float], interval: float = 0.01):
+    """记录每次 sleep(interval) 比预期多等的时间"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_round(mode: str, concurrency: int, logins: int, hashed: str, hasher: PasswordHasher):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if mode == 'inline':
+                    pwd_context.verify('strongpassword123', hashed)
+                else:
+                    await hasher.verify('strongpassword123', hashed)
+            except AppApiException:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    return {
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000) if latencies else 0.0,
+        'p95_ms': float(np.percentile(latencies, 95) * 1000) if latencies else 0.0,
+        'max_lag_ms': max(lags) * 1000 if lags else 0.0,
+        'rejected': rejected
+    }
+
+
+async def main_async(args):
+    hashed = pwd_context.hash('strongpassword123')
+    started = time.perf_counter()
+    pwd_context.verify('strongpassword123', hashed)
+    print(f"single bcrypt verify: {(time.perf_counter() - started) * 1000:.0f}ms")
+    print(f"workers={args.workers} max_queue={args.max_queue} logins={args.logins}")
+    print(f"{'concurrency':>11} {'mode':<8} {'logins/s':>9} {'p50_ms':>8} {'p95_ms':>8} {'loop_lag_ms':>12} {'rejected':>9}")
+
+    for concurrency in [int(value) for value in args.concurrency.split(',') if value]:
+        for mode in ('inline', 'pool'):
+            hasher = PasswordHasher(max_workers=args.workers, max_queue=args.max_queue)
+            result = await run_round(mode, concurrency, args.logins, hashed, hasher)
+            hasher.shutdown()
+            print(
+                f"{concurrency:>11} {mode:<8} {result['throughput']:>9.1f} {result['p50_ms']:>8.0f} "
+                f"{result['p95_ms']:>8.0f} {result['max_lag_ms']:>12.0f} {result['rejected']:>9}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password hashing / login throughput benchmark')
+    parser.add_argument('--logins', type=int, default=64, help='每轮校验次数')
+    parser.add_argument('--concurrency', default='16,64,256', help='并发登录数，逗号分隔')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-queue', type=int, default=64)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -38,17 +38,50 @@ class Settings(BaseSettings):
         encoded_password = quote_plus(self.PG_PASSWORD)
         return f"postgresql://{self.PG_USER}:{encoded_password}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
 
+    ASYNC_DB_POOL_SIZE: int = 50
+    ASYNC_DB_MAX_OVERFLOW: int = 50
+
+    @property
+    def ASYNC_DB_URL(self) -> str:
+        encoded_password = quote_plus(self.PG_PASSWORD)
+        return f"postgresql+asyncpg://{self.PG_USER}:{encoded_password}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
+
     # JWT 配置
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 300
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 7
 
+    # 密码哈希线程池（bcrypt 不在事件循环中执行）
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # 排队超过该数量的登录/注册请求直接返回503
+
+    # 刷新令牌会话（diskcache，多进程共享）
+    REFRESH_SESSION_DIR: str = "./cache/refresh_sessions"
+    REFRESH_SESSION_SWEEP_INTERVAL_SECONDS: int = 600  # 批量清理过期会话的间隔
+
+    # 认证缓存（令牌解码结果和用户快照，进程内TTL LRU）
+    AUTH_CACHE_TTL_SECONDS: int = 60  # 用户信息在其他进程中被修改后最多延迟这么久生效
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_SIZE: int = 10000
+
     # DeepSeek API 配置
     DEEPSEEK_API_KEY: str = Field(..., env="DEEPSEEK_API_KEY")
     DEEPSEEK_BASE_URL: str = "https://api.deepseek.com/v1"
     DEEPSEEK_MODEL: str = "deepseek-chat"
 
+    # 上下文窗口配置
+    LLM_TOKENIZER_ENCODING: str = "cl100k_base"
+    LLM_CONTEXT_MAX_TOKENS: int = 6000
+    LLM_TOKEN_CACHE_SIZE: int = 50000
+
+    # 滚动总结配置：未总结消息达到阈值时折叠，最近若干条保留原文
+    SUMMARY_TRIGGER_MESSAGES: int = 20
+    SUMMARY_KEEP_RECENT: int = 6
+
+    # 对话列表：最后一条消息的预览长度（写入消息时截断存入 ai_conversations）
+    CONVERSATION_PREVIEW_CHARS: int = 100
+
     # MinIO 配置
     MINIO_ENDPOINT: str = Field("localhost", env="MINIO_ENDPOINT")
     MINIO_API_PORT: int = Field(9000, env="MINIO_API_PORT")
@@ -61,6 +94,80 @@ class Settings(BaseSettings):
     def MINIO_ENDPOINT_URL(self) -> str:
         return f"{self.MINIO_ENDPOINT}:{self.MINIO_API_PORT}"
 
+    # 文档后台处理任务配置
+    DOCUMENT_JOB_WORKERS: int = 2
+    DOCUMENT_JOB_MAX_ATTEMPTS: int = 3
+    DOCUMENT_JOB_RETRY_DELAY_SECONDS: int = 30
+    DOCUMENT_JOB_POLL_INTERVAL: float = 2.0
+    # 任务租约：执行中每隔 HEARTBEAT 秒续约，租约过期（进程崩溃/重新部署）的 running 任务重新排队
+    DOCUMENT_JOB_LEASE_SECONDS: int = 120
+    DOCUMENT_JOB_HEARTBEAT_SECONDS: int = 30
+
+    # 文档解析进程池配置（任务队列线程数不小于进程数时才能用满全部解析进程）
+    PARSER_USE_PROCESS_POOL: bool = True
+    PARSER_MAX_WORKERS: int = 0  # 0 表示 CPU 核数
+    PARSER_TIMEOUT_SECONDS: int = 300  # 0 表示不限制
+    PARSER_MEMORY_LIMIT_MB: int = 2048  # 单个解析进程可额外使用的内存，0 表示不限制
+    PARSER_MP_START_METHOD: str = "forkserver"  # 解析进程从单线程的 forkserver 创建；Windows 需改为 spawn
+    PDF_PAGES_PER_SHARD: int = 50  # PDF按页段分片并行提取时每片页数
+
+    # 扫描版PDF OCR配置
+    OCR_DPI: int = 200
+    OCR_PAGES_PER_WINDOW: int = 4  # 每次栅格化/识别的页数
+    OCR_LANG: str = "ch"
+    OCR_CPU_THREADS: int = 2  # 单个OCR引擎线程数，乘以解析进程数不宜超过CPU核数
+    OCR_WARMUP: bool = False  # 解析进程启动时是否预先加载OCR模型
+
+    # 文档内容去重缓存配置
+    DOCUMENT_CACHE_DIR: str = "./cache/documents"
+    DOCUMENT_CACHE_SIZE_LIMIT_MB: int = 2048
+    DOCUMENT_CACHE_MAX_ENTRY_MB: int = 64  # 单个文档分段结果超过该大小时不缓存
+    DOCUMENT_CACHE_VERSION: int = 2  # 解析/分段逻辑变化时递增，使旧缓存失效
+
+    # 段落批量写入每批行数
+    PARAGRAPH_INSERT_BATCH_SIZE: int = 1000
+
+    # 段落向量检索（本地 sentence-transformers 模型 + 每用户一个FAISS索引）
+    EMBEDDING_ENABLED: bool = True
+    EMBEDDING_MODEL_NAME: str = "BAAI/bge-small-zh-v1.5"
+    EMBEDDING_DEVICE: str = "cpu"
+    EMBEDDING_BATCH_SIZE: int = 32  # 模型前向批大小
+    EMBEDDING_INDEX_BATCH_SIZE: int = 512  # 入库时每批读取/编码的段落数
+    EMBEDDING_QUERY_INSTRUCTION: str = "为这个句子生成表示以用于检索相关文章："
+    VECTOR_INDEX_DIR: str = "./cache/vectors"
+    VECTOR_INDEX_CACHE_SIZE: int = 32  # 内存中保留的用户索引数
+    VECTOR_IVF_MIN_VECTORS: int = 100000  # 超过该向量数后由精确索引转为IVF索引
+    VECTOR_INDEX_NPROBE: int = 16
+    VECTOR_INDEX_OMP_THREADS: int = 1  # 单次检索使用的线程数，0表示FAISS默认
+
+    # 检索增强问答（流式问答开启 use_documents 时生效）
+    RAG_TOP_K: int = 5
+    RAG_MIN_SCORE: float = 0.3  # 相似度低于该值的段落不作为参考资料
+    RAG_MAX_CONTEXT_TOKENS: int = 1500  # 参考资料token上限（从上下文预算中扣除）
+    RAG_RETRIEVAL_TIMEOUT_MS: int = 300  # 检索超时后本次回答不带参考资料
+
+    # 段落全文检索（jieba分词写入tsvector + GIN索引）
+    FULLTEXT_HIGHLIGHT_CHARS: int = 160  # 高亮片段长度（字符）
+
+    # 混合检索（BM25 + 向量相似度，RRF/加权融合，可选交叉编码器重排）
+    HYBRID_CANDIDATES: int = 100  # 词法/向量每路召回的候选数
+    HYBRID_LEXICAL_MAX_CANDIDATES: int = 2000  # 词法一路参与BM25打分的候选上限：稀有词命中全部保留，常见词按相关度取前若干个
+    HYBRID_RRF_K: int = 60
+    HYBRID_VECTOR_WEIGHT: float = 0.5  # 加权融合时向量相似度的权重
+    HYBRID_DF_MAX_COUNT: int = 20000  # 单个词项文档频率的计数上限，更常见的词按上限计（IDF 已接近下限）
+    HYBRID_DF_CACHE_TTL: int = 300  # 文档频率缓存时间（秒），按 用户+文档范围+词项 缓存
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    RERANK_MODEL_NAME: str = "BAAI/bge-reranker-base"
+    RERANK_DEVICE: str = "cpu"
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_TOP_N: int = 20  # 参与重排的融合结果数
+
+    # 文档图片提取（开启后图片写入MinIO的 documents/<id>/images/ 前缀下，解析结果只保留引用；
+    # 分段去重缓存不含图片，开启时每个文档都重新解析）
+    DOCUMENT_EXTRACT_IMAGES: bool = False
+
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
 
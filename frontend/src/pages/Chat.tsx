@@ -24,7 +24,7 @@ import {
 import { useNavigate } from 'react-router-dom'
 import { conversationApi } from '../services/api'
 import { useAuth } from '../hooks/useAuth'
-import type { Conversation, Message } from '../types'
+import type { ConversationSummary, Message } from '../types'
 import ReactMarkdown from 'react-markdown'
 import { Prism as SyntaxHighlighter } from 'react-syntax-highlighter'
 import { vscDarkPlus } from 'react-syntax-highlighter/dist/esm/styles/prism'
@@ -35,8 +35,8 @@ const { TextArea } = Input
 const { Title, Text, Paragraph } = Typography
 
 function Chat() {
-  const [conversations, setConversations] = useState<Conversation[]>([])
-  const [currentConversation, setCurrentConversation] = useState<Conversation | null>(null)
+  const [conversations, setConversations] = useState<ConversationSummary[]>([])
+  const [currentConversation, setCurrentConversation] = useState<ConversationSummary | null>(null)
   const [messages, setMessages] = useState<Message[]>([])
   const [inputValue, setInputValue] = useState('')
   const [loading, setLoading] = useState(false)
@@ -52,7 +52,7 @@ function Chat() {
   const [fontSize, setFontSize] = useState(14)
   const [searchText, setSearchText] = useState('')
   const [editModalVisible, setEditModalVisible] = useState(false)
-  const [editingConversation, setEditingConversation] = useState<Conversation | null>(null)
+  const [editingConversation, setEditingConversation] = useState<ConversationSummary | null>(null)
   const [newTitle, setNewTitle] = useState('')
   const [eventSource, setEventSource] = useState<any>(null)
   const [emojiPickerVisible, setEmojiPickerVisible] = useState(false)
@@ -102,7 +102,7 @@ function Chat() {
     }
   }
 
-  const selectConversation = async (conversation: Conversation) => {
+  const selectConversation = async (conversation: ConversationSummary) => {
     setCurrentConversation(conversation)
     try {
       const msgs = await conversationApi.getMessages(conversation.id)
@@ -112,6 +112,22 @@ function Chat() {
     }
   }
 
+  // 回复完成后用 done 事件中服务端返回的消息数和预览刷新侧边栏，无需重新拉取列表
+  const touchConversation = (id: string, done: Partial<ConversationSummary>) => {
+    const now = new Date().toISOString()
+    setConversations(prev => prev.map(c =>
+      c.id === id
+        ? {
+            ...c,
+            message_count: done.message_count ?? c.message_count,
+            last_message_preview: done.last_message_preview ?? c.last_message_preview,
+            last_message_at: done.last_message_at ?? now,
+            updated_at: done.last_message_at ?? now
+          }
+        : c
+    ))
+  }
+
   const createNewConversation = async () => {
     try {
       const newConv = await conversationApi.createConversation({
@@ -196,7 +212,7 @@ function Chat() {
         currentConversation.id,
         userMessage.content,
         (data) => {
-          if (data.type === 'message') {
+          if (data.type === 'message' && data.data.role === 'assistant') {
             fullResponse += data.data.content
             setStreamResponse(fullResponse)
           } else if (data.type === 'done') {
@@ -208,9 +224,9 @@ function Chat() {
               timestamp: new Date().toISOString()
             }
             
-            conversationApi.saveStreamMessage(currentConversation.id, assistantMessage)
             setMessages(prev => [...prev, assistantMessage])
             setStreamResponse('')
+            touchConversation(currentConversation.id, data.data)
             showNotification('AI回复', 'AI已生成回复')
           } else if (data.type === 'error') {
             setStreaming(false)
@@ -319,7 +335,7 @@ function Chat() {
         currentConversation.id,
         userMessage.content,
         (data) => {
-          if (data.type === 'message') {
+          if (data.type === 'message' && data.data.role === 'assistant') {
             fullResponse += data.data.content
             setStreamResponse(fullResponse)
           } else if (data.type === 'done') {
@@ -331,9 +347,9 @@ function Chat() {
               timestamp: new Date().toISOString()
             }
             
-            conversationApi.saveStreamMessage(currentConversation.id, assistantMessage)
             setMessages([...messages, userMessage, assistantMessage])
             setStreamResponse('')
+            touchConversation(currentConversation.id, data.data)
           } else if (data.type === 'error') {
             setStreaming(false)
             message.error(data.data.message || '发送消息失败')
@@ -381,7 +397,7 @@ function Chat() {
     message.success('导出成功')
   }
 
-  const openEditModal = (conversation: Conversation, e: React.MouseEvent) => {
+  const openEditModal = (conversation: ConversationSummary, e: React.MouseEvent) => {
     e.stopPropagation()
     setEditingConversation(conversation)
     setNewTitle(conversation.title)
@@ -406,7 +422,7 @@ function Chat() {
     }
   }
 
-  const togglePin = async (conversation: Conversation, e: React.MouseEvent) => {
+  const togglePin = async (conversation: ConversationSummary, e: React.MouseEvent) => {
     e.stopPropagation()
     try {
       const updated = await conversationApi.updateConversation(conversation.id, { 
@@ -558,7 +574,11 @@ function Chat() {
                       {item.title}
                     </Space>
                   }
-                  description={`${item.content?.length || 0} 条消息`}
+                  description={
+                    <Text type="secondary" ellipsis style={{ fontSize: '12px' }}>
+                      {item.last_message_preview || `${item.message_count || 0} 条消息`}
+                    </Text>
+                  }
                 />
               </List.Item>
             )}
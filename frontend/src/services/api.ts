@@ -4,6 +4,7 @@ import type {
   RegisterRequest, 
   TokenResponse,
   Conversation,
+  ConversationSummary,
   CreateConversationRequest,
   CreateMessageRequest,
   Message,
@@ -79,8 +80,8 @@ export const authApi = {
 }
 
 export const conversationApi = {
-  getConversations: async (skip = 0, limit = 100): Promise<Conversation[]> => {
-    const response = await api.get<ApiResponse<Conversation[]>>('/conversations/', {
+  getConversations: async (skip = 0, limit = 100): Promise<ConversationSummary[]> => {
+    const response = await api.get<ApiResponse<ConversationSummary[]>>('/conversations/', {
       params: { skip, limit }
     })
     return response.data.data
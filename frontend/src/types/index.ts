@@ -30,17 +30,24 @@ export interface Message {
   timestamp: string
 }
 
-export interface Conversation {
+// 对话列表项（侧边栏，不包含消息内容）
+export interface ConversationSummary {
   id: string
-  user_id: string
   title: string
   model: string
-  content: Message[]
-  total_tokens: number
-  is_active: boolean
   is_pinned?: boolean
+  total_tokens: number
+  message_count: number
+  last_message_preview?: string | null
+  last_message_at?: string | null
   created_at: string
-  updated_at: string
+  updated_at: string | null
+}
+
+// 对话详情（消息通过 /messages 接口分页获取）
+export interface Conversation extends ConversationSummary {
+  user_id: string
+  is_active: boolean
 }
 
 export interface CreateConversationRequest {
@@ -6,6 +6,7 @@
     @desc:
 """
 
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -21,10 +22,17 @@ from contextlib import asynccontextmanager
 import diskcache
 from sqlalchemy.orm import Session
 
+from app.common.core.pagination import NEXT_CURSOR_HEADER
 from app.common.core.result import AppApiException, Result
+from app.common.core.security import password_hasher
+from app.common.core.segmenter import get_segmenter
 from app.database.base import get_db
 from app.models import User
 from app.services.auth_service import auth_token
+from app.services.document_job_service import document_job_queue
+from app.services.document_parser_service import document_parser_service
+from app.services.embedding_service import embedding_service
+from app.services.refresh_session_service import refresh_session_store
 from config import settings
 from app.routers import api_v1
 
@@ -77,6 +85,25 @@ def init_logger():
 init_logger()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动/停止文档解析进程池和后台处理任务队列"""
+    # 先拉起解析进程，保证 fork 发生在任务线程启动、向量模型加载之前
+    document_parser_service.start()
+    document_job_queue.start()
+    if settings.EMBEDDING_ENABLED:
+        await asyncio.to_thread(embedding_service.warmup)
+    # 预加载jieba词典，避免第一次全文检索时在事件循环中加载
+    await asyncio.to_thread(get_segmenter)
+    await asyncio.to_thread(password_hasher.warmup)
+    session_sweeper = asyncio.create_task(refresh_session_store.run_sweeper())
+    yield
+    session_sweeper.cancel()
+    password_hasher.shutdown()
+    document_job_queue.stop()
+    document_parser_service.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
@@ -84,6 +111,7 @@ app = FastAPI(
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # 处理API异常
@@ -97,6 +125,8 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # 游标分页的下一页游标放在响应头中，需要对前端可见
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
 # 包含路由